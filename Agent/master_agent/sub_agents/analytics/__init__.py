@@ -0,0 +1 @@
+# Deterministic financial analytics engines
@@ -0,0 +1,555 @@
+"""Capital-gains engine: realized gains and tax per financial year, holding periods of open lots, tax harvesting.
+
+Mutual fund schemes and stocks go through one `fifo_lots` pass (see
+stock_holdings), so every sale is a range [start, end) on the acquisition axis
+and every open position is [matched_end, group_total). Whether a unit is long-
+or short-term only depends on its acquisition date, and lots are in date order,
+so each range splits at a single position: the end of the last lot acquired
+before sale date - holding period (`FifoLots.position_at`). Gains on either
+side are differences of the cost curve, which makes a what-if sale a handful of
+array lookups; `capital_gains` keeps the built object per payload content so
+repeated what-ifs cost milliseconds.
+
+Tax rules (resident individual, Income-tax Act; rates before surcharge, plus 4% cess):
+- equity (listed stocks, equity funds and equity-taxed hybrids): long-term after
+  12 months; STCG 15% and LTCG 10% on sales before 2024-07-23, 20% and 12.5%
+  from then on; LTCG up to 1 lakh a year (1.25 lakh from FY2024-25) is exempt
+- debt (debt and liquid funds): units bought from 2023-04-01 are short-term
+  whatever the holding period; older units are long-term after 36 months
+  (24 for sales from 2024-07-23) at 20% (12.5%)
+- other (gold, international and other hybrid funds, unknown schemes): long-term
+  after 36 months (24 for sales from 2024-07-23) at 20% (12.5%)
+Short-term gains outside equity are taxed at the slab rate FI_TAX_SLAB_RATE.
+Simplifications: no indexation on long-term debt gains before 2024-07-23, no
+31 Jan 2018 grandfathering for older equity, no surcharge, and losses of
+earlier years are not carried forward (the unabsorbed loss is reported instead).
+"""
+
+import os
+from dataclasses import dataclass, fields
+from datetime import date
+
+import numpy as np
+
+from ..fetchData.cache import TTLCache
+from ..fetchData.client import CACHE_TTL
+from ..fetchData.columnar import load_columns, recent_digest
+from ..fetchData.compaction import money_to_float
+from .recurring import add_months
+from .stock_holdings import BUY, SELL, FifoLots, equity_prices, fifo_lots
+
+SLAB_RATE = float(os.getenv("FI_TAX_SLAB_RATE", "0.3"))
+CESS = 0.04
+
+EQUITY, DEBT, OTHER = 0, 1, 2
+TAX_CLASSES = ("equity", "debt", "other")
+SHORT, LONG = 0, 1
+# mfSchemeAnalytics categories taxed as equity although their assetClass is HYBRID
+EQUITY_HYBRIDS = {
+    "AGGRESSIVE_HYBRID_FUND", "BALANCED_ADVANTAGE_FUND", "DYNAMIC_ASSET_ALLOCATION", "ARBITRAGE_FUND",
+    "EQUITY_SAVINGS",
+}
+# Scheme name keywords for schemes missing from mfSchemeAnalytics, tried in this order
+NAME_KEYWORDS = [
+    (OTHER, ("GOLD", "SILVER", "INTERNATIONAL", "GLOBAL", "OVERSEAS", "NASDAQ", "S&P 500", "US ")),
+    (DEBT, ("DEBT", "LIQUID", "OVERNIGHT", "GILT", "BOND", "MONEY MARKET", "DURATION", "CREDIT RISK", "FLOATER",
+            "BANKING AND PSU", "BANKING & PSU")),
+    (EQUITY, ("EQUITY", "ARBITRAGE", "NIFTY", "SENSEX", "INDEX", " CAP", "ELSS", "TAX SAVER", "FLEXI", "FOCUSED",
+              "BLUECHIP", "VALUE", "CONTRA", "BALANCED ADVANTAGE", "MULTICAP", "MULTI CAP")),
+]
+NEW_REGIME = np.datetime64("2024-07-23")  # Finance (No. 2) Act 2024 rates and holding periods
+DEBT_LAST_LONG = np.datetime64("2023-03-31")  # later debt fund units are always short-term
+# [tax class][sold before / from NEW_REGIME]
+HOLDING_MONTHS = np.array([[12, 12], [36, 24], [36, 24]])
+LONG_TERM_RATES = np.array([[0.10, 0.125], [0.20, 0.125], [0.20, 0.125]])
+EQUITY_SHORT_TERM_RATES = np.array([0.15, 0.20])
+
+
+def ltcg_exemption(fy: int) -> float:
+    """Yearly exemption on equity LTCG for the financial year starting in April of `fy`."""
+    return 125000.0 if fy >= 2024 else 100000.0
+
+
+REALIZED_COLUMNS = [
+    "fy", "tax_class", "sales", "proceeds", "cost", "short_term_gain", "long_term_gain", "incomplete_sales",
+]
+FY_TAX_COLUMNS = [
+    "fy", "short_term_gain", "long_term_gain", "taxable_short_term", "taxable_long_term", "exemption_used",
+    "unabsorbed_loss", "tax",
+]
+OPEN_COLUMNS = [
+    "asset", "isin", "name", "tax_class", "quantity", "price", "current_value", "short_term_qty",
+    "short_term_gain", "long_term_qty", "long_term_gain", "next_long_term", "unknown_cost_qty",
+]
+HARVEST_COLUMNS = ["asset", "isin", "name", "sell_qty", "proceeds", "long_term_gain"]
+LOSS_COLUMNS = ["asset", "isin", "name", "tax_class", "sell_qty", "proceeds", "gain", "tax_saved"]
+WHAT_IF_COLUMNS = ["asset", "isin", "name", "sell_qty", "proceeds", "short_term_gain", "long_term_gain"]
+
+
+def _round(value, digits: int = 2):
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def fy_label(fy: int) -> str:
+    return f"FY{fy}-{(fy + 1) % 100:02d}"
+
+
+def financial_year(dates) -> np.ndarray:
+    """Start year of the April-March financial year of each date."""
+    months = np.asarray(dates, dtype="datetime64[D]").astype("datetime64[M]") - 3
+    return months.astype("datetime64[Y]").astype(np.int64) + 1970
+
+
+def _rate(term: int, tax_class: int, regime: int) -> float:
+    if term == LONG:
+        return float(LONG_TERM_RATES[tax_class, regime])
+    return float(EQUITY_SHORT_TERM_RATES[regime]) if tax_class == EQUITY else SLAB_RATE
+
+
+def fy_tax(fy: int, gains: dict) -> dict:
+    """Tax on one financial year's net gains, keyed by (term, tax class, regime).
+
+    Losses are set off where the law allows (long-term losses only against
+    long-term gains, short-term losses against either) and against the highest
+    taxed gains first; the equity LTCG exemption applies to what is left.
+    """
+    taxable = {key: gain for key, gain in gains.items() if gain > 0}
+    losses = {term: -sum(gain for key, gain in gains.items() if key[0] == term and gain < 0) for term in (SHORT, LONG)}
+    # At equal rates non-equity goes first, since equity LTCG still has the exemption
+    ranked = sorted(taxable, key=lambda key: (_rate(*key), key[1] != EQUITY), reverse=True)
+    for loss_term, gain_term in ((LONG, LONG), (SHORT, SHORT), (SHORT, LONG)):
+        for key in ranked:
+            if key[0] == gain_term and losses[loss_term] > 0:
+                used = min(taxable[key], losses[loss_term])
+                taxable[key] -= used
+                losses[loss_term] -= used
+    exemption = ltcg_exemption(fy)
+    left = exemption
+    for key in ranked:
+        if key[0] == LONG and key[1] == EQUITY:
+            used = min(taxable[key], left)
+            taxable[key] -= used
+            left -= used
+    return {
+        "short_term_gain": sum(gain for key, gain in gains.items() if key[0] == SHORT),
+        "long_term_gain": sum(gain for key, gain in gains.items() if key[0] == LONG),
+        "taxable_short_term": sum(value for key, value in taxable.items() if key[0] == SHORT),
+        "taxable_long_term": sum(value for key, value in taxable.items() if key[0] == LONG),
+        "exemption_used": exemption - left,
+        "exemption_left": left,
+        "unabsorbed_loss": losses[SHORT] + losses[LONG],
+        "tax": sum(_rate(*key) * value for key, value in taxable.items()) * (1 + CESS),
+    }
+
+
+def _buckets(fy, term, tax_class, regime, gain) -> dict:
+    """{fy: {(term, tax class, regime): gain}} summed over pieces of sales."""
+    key = ((fy.astype(np.int64) * 2 + term) * 3 + tax_class) * 2 + regime
+    keys, codes = np.unique(key, return_inverse=True)
+    sums = np.bincount(codes.ravel(), weights=np.nan_to_num(gain), minlength=len(keys))
+    buckets = {}
+    for k, value in zip(keys.tolist(), sums.tolist()):
+        rest, regime_ = divmod(k, 2)
+        rest, class_ = divmod(rest, 3)
+        fy_, term_ = divmod(rest, 2)
+        buckets.setdefault(fy_, {})[(term_, class_, regime_)] = value
+    return buckets
+
+
+def scheme_tax_classes(net_worth) -> dict:
+    """isin -> tax class from the assetClass and categoryName in mfSchemeAnalytics."""
+    analytics = ((net_worth or {}).get("mfSchemeAnalytics") or {}).get("schemeAnalytics") or []
+    classes = {}
+    for scheme in analytics:
+        detail = scheme.get("schemeDetail", {})
+        asset_class, category = detail.get("assetClass", ""), detail.get("categoryName", "")
+        if asset_class == "EQUITY" and category != "INTERNATIONAL_FUNDS" or category in EQUITY_HYBRIDS:
+            classes[detail.get("isinNumber")] = EQUITY
+        elif asset_class in ("DEBT", "CASH"):
+            classes[detail.get("isinNumber")] = DEBT
+        else:
+            classes[detail.get("isinNumber")] = OTHER
+    return classes
+
+
+def name_tax_class(scheme_name: str) -> int:
+    """Best guess of a scheme's tax class from its name; OTHER when nothing matches."""
+    name = f" {scheme_name.upper()} "
+    for tax_class, keywords in NAME_KEYWORDS:
+        if any(keyword in name for keyword in keywords):
+            return tax_class
+    return OTHER
+
+
+@dataclass
+class _Sold:
+    """Short- and long-term parts of selling position ranges, per sale."""
+
+    short_qty: np.ndarray  # base units
+    long_qty: np.ndarray
+    short_gain: np.ndarray  # NaN when the sale price is unknown
+    long_gain: np.ndarray
+    unknown_qty: np.ndarray  # base units with unknown cost (left out of the gains)
+    boundary: np.ndarray  # first short-term position
+    regime: np.ndarray
+
+    def take(self, index) -> "_Sold":
+        return _Sold(**{field.name: getattr(self, field.name)[index] for field in fields(self)})
+
+
+def split_sales(fifo: FifoLots, tax_class, groups, start, end, dates, unit_price) -> _Sold:
+    """Split sales of the ranges [start, end) on `dates` at `unit_price` per base unit by holding period."""
+    tax_class = tax_class[groups]
+    regime = (dates >= NEW_REGIME).astype(np.intp)
+    last_long = add_months(dates, -HOLDING_MONTHS[tax_class, regime]) - np.timedelta64(1, "D")
+    last_long = np.where(tax_class == DEBT, np.minimum(last_long, DEBT_LAST_LONG), last_long)
+    boundary = np.clip(fifo.position_at(groups, last_long), start, end)
+    parts = []
+    for lo, hi in ((boundary, end), (start, boundary)):
+        unknown = fifo.unknown(lo, hi)
+        parts.append((hi - lo, unknown, (hi - lo - unknown) * unit_price - fifo.cost(lo, hi)))
+    (short_qty, short_unknown, short_gain), (long_qty, long_unknown, long_gain) = parts
+    return _Sold(short_qty, long_qty, short_gain, long_gain, short_unknown + long_unknown, boundary, regime)
+
+
+class CapitalGains:
+    """Lots of one user's MF schemes and stocks with their realized gains; see `capital_gains`."""
+
+    def __init__(self, fifo: FifoLots, assets, isins, names, tax_class, price, as_of, sales: dict):
+        self.fifo = fifo
+        self.assets, self.isins, self.names = assets, isins, names
+        self.tax_class = tax_class  # per group
+        self.price = price  # current price per unit held today, NaN when unknown
+        self.as_of = as_of
+        self.fy = int(financial_year(as_of))
+        self._sales = sales
+        self._realized = _buckets(sales["fy"], SHORT, sales["tax_class"], sales["regime"], sales["short_gain"])
+        for fy, gains in _buckets(sales["fy"], LONG, sales["tax_class"], sales["regime"], sales["long_gain"]).items():
+            self._realized.setdefault(fy, {}).update(gains)
+        groups = {}
+        for g in np.flatnonzero(fifo.held > 0).tolist():
+            groups.setdefault(isins[g], []).append(g)
+        self._held_groups = groups  # isin -> groups (one per folio) still held
+
+    def realized_gains(self, fy: int) -> dict:
+        """Net realized gains of a financial year by (term, tax class, regime)."""
+        return dict(self._realized.get(fy, {}))
+
+    def realized(self) -> list:
+        """REALIZED_COLUMNS per financial year and tax class, oldest year first."""
+        sales = self._sales
+        key = sales["fy"] * 3 + sales["tax_class"]
+        keys, codes = np.unique(key, return_inverse=True)
+        codes = codes.ravel()
+
+        def total(values):
+            return np.bincount(codes, weights=np.nan_to_num(values), minlength=len(keys))
+
+        columns = [
+            np.bincount(codes, minlength=len(keys)), total(sales["proceeds"]), total(sales["cost"]),
+            total(sales["short_gain"]), total(sales["long_gain"]), total(sales["incomplete"]),
+        ]
+        return [
+            [fy_label(k // 3), TAX_CLASSES[k % 3], int(columns[0][i])]
+            + [_round(column[i]) for column in columns[1:5]] + [int(columns[5][i])]
+            for i, k in enumerate(keys.tolist())
+        ]
+
+    def fy_taxes(self) -> list:
+        """FY_TAX_COLUMNS for every financial year with sales."""
+        rows = []
+        for fy in sorted(self._realized):
+            tax = fy_tax(fy, self._realized[fy])
+            rows.append([fy_label(fy)] + [_round(tax[column]) for column in FY_TAX_COLUMNS[1:]])
+        return rows
+
+    def _open(self):
+        groups = np.flatnonzero(self.fifo.held > 0)
+        fifo = self.fifo
+        dates = np.full(len(groups), self.as_of)
+        unit_price = self.price[groups] * fifo.final_factor[groups]
+        sold = split_sales(fifo, self.tax_class, groups, fifo.matched_end[groups], fifo.group_total[groups], dates,
+                           unit_price)
+        return groups, sold
+
+    def open_positions(self) -> list:
+        """OPEN_COLUMNS for every position still held, as of `as_of`."""
+        fifo = self.fifo
+        groups, sold = self._open()
+        factor = fifo.final_factor[groups]
+        # The oldest short-term lot turns long-term one day after the holding period (never for new debt units)
+        oldest = fifo.lot_date(sold.boundary, "right")
+        months = HOLDING_MONTHS[self.tax_class[groups], 1]
+        next_long = add_months(oldest, months) + np.timedelta64(1, "D")
+        never = (sold.short_qty <= fifo.tolerance) | ((self.tax_class[groups] == DEBT) & (oldest > DEBT_LAST_LONG))
+        quantity = (sold.short_qty + sold.long_qty) * factor
+        return [
+            [
+                self.assets[g], self.isins[g], self.names[g], TAX_CLASSES[self.tax_class[g]], _round(quantity[i], 4),
+                _round(self.price[g], 4), _round(quantity[i] * self.price[g]), _round(sold.short_qty[i] * factor[i], 4),
+                _round(sold.short_gain[i]), _round(sold.long_qty[i] * factor[i], 4), _round(sold.long_gain[i]),
+                "" if never[i] else str(next_long[i]), _round(sold.unknown_qty[i] * factor[i], 4),
+            ]
+            for i, g in enumerate(groups.tolist())
+        ]
+
+    def _sell(self, groups, quantity):
+        """Sell `quantity` units held today (oldest lots first) of each group, clipped to the holding."""
+        fifo = self.fifo
+        groups = np.asarray(groups, dtype=np.intp)
+        start = fifo.matched_end[groups]
+        end = np.minimum(start + np.asarray(quantity, dtype=np.float64) / fifo.final_factor[groups],
+                         fifo.group_total[groups])
+        unit_price = self.price[groups] * fifo.final_factor[groups]
+        return split_sales(fifo, self.tax_class, groups, start, end, np.full(len(groups), self.as_of), unit_price)
+
+    def sale_tax(self, groups, quantity) -> np.ndarray:
+        """Tax on each sale on its own: `quantity` units held today of each group, oldest lots first.
+
+        Gains are taxed at their own rates plus cess, losses count as zero and the
+        LTCG exemption is left out, so sales can be compared and added up; what_if
+        has the exact tax of a set of sales.
+        """
+        groups = np.asarray(groups, dtype=np.intp)
+        sold = self._sell(groups, quantity)
+        tax_class = self.tax_class[groups]
+        short_rate = np.where(tax_class == EQUITY, EQUITY_SHORT_TERM_RATES[sold.regime], SLAB_RATE)
+        tax = (np.nan_to_num(sold.short_gain) * short_rate
+               + np.nan_to_num(sold.long_gain) * LONG_TERM_RATES[tax_class, sold.regime])
+        return np.maximum(tax, 0.0) * (1 + CESS)
+
+    def extra_tax(self, groups, quantity) -> float:
+        """This financial year's extra tax if `quantity` units held today of each group were sold together.
+
+        Unlike what_if, which sells an ISIN from its first folios, the sales come from the given groups.
+        """
+        groups = np.asarray(groups, dtype=np.intp)
+        after = self._tax_with(groups, self._sell(groups, quantity))
+        return after["tax"] - fy_tax(self.fy, self.realized_gains(self.fy))["tax"]
+
+    def _tax_with(self, groups, sold: _Sold) -> dict:
+        """This financial year's tax if the given sales happened today."""
+        gains = self.realized_gains(self.fy)
+        for term, values in ((SHORT, sold.short_gain), (LONG, sold.long_gain)):
+            for g, regime, value in zip(groups.tolist(), sold.regime.tolist(), np.nan_to_num(values).tolist()):
+                key = (term, int(self.tax_class[g]), regime)
+                gains[key] = gains.get(key, 0.0) + value
+        return fy_tax(self.fy, gains)
+
+    def what_if(self, isins: list, quantities: list) -> dict:
+        """Gains and this year's extra tax if the given units of each ISIN were sold today (FIFO per folio)."""
+        groups, amounts, missing = [], [], []
+        for isin, quantity in zip(isins, quantities):
+            if isin not in self._held_groups:
+                missing.append(isin)
+            for g in self._held_groups.get(isin, []):
+                available = float(self.fifo.held[g] * self.fifo.final_factor[g])
+                take = min(float(quantity), available)
+                if take > 0:
+                    groups.append(g)
+                    amounts.append(take)
+                    quantity -= take
+        groups = np.array(groups, dtype=np.intp)
+        sold = self._sell(groups, np.array(amounts))
+        factor = self.fifo.final_factor[groups]
+        quantity = (sold.short_qty + sold.long_qty) * factor
+        before = fy_tax(self.fy, self.realized_gains(self.fy))
+        after = self._tax_with(groups, sold)
+        return {
+            "fy": fy_label(self.fy),
+            "sales": [
+                [
+                    self.assets[g], self.isins[g], self.names[g], _round(quantity[i], 4),
+                    _round(quantity[i] * self.price[g]), _round(sold.short_gain[i]), _round(sold.long_gain[i]),
+                ]
+                for i, g in enumerate(groups.tolist())
+            ],
+            "tax_before": _round(before["tax"]),
+            "tax_after": _round(after["tax"]),
+            "extra_tax": _round(after["tax"] - before["tax"]),
+            "exemption_left_after": _round(after["exemption_left"]),
+            "isins_not_held": missing,
+        }
+
+    def harvest_plan(self) -> dict:
+        """Long-term equity gains to book this year within the exemption and unabsorbed losses (sell and buy back).
+
+        Positions with the highest long-term gain per rupee sold go first; the last
+        one is sold partly, up to the remaining budget (whole shares for stocks).
+        """
+        fifo = self.fifo
+        current = fy_tax(self.fy, self.realized_gains(self.fy))
+        budget = current["exemption_left"] + current["unabsorbed_loss"]
+        groups, sold = self._open()
+        value = sold.long_qty * fifo.final_factor[groups] * self.price[groups]
+        candidates = np.flatnonzero(
+            (self.tax_class[groups] == EQUITY) & (sold.long_gain > 0) & (sold.unknown_qty <= fifo.tolerance)
+        )
+        candidates = candidates[np.argsort(-sold.long_gain[candidates] / value[candidates], kind="stable")]
+        plan, left = [], budget
+        for i in candidates.tolist():
+            if left <= 1:
+                break
+            g = int(groups[i])
+            units = self._units_for_gain(g, sold.boundary[i], left)
+            if self.assets[g] == "stock":
+                units = np.floor(units + 1e-9)
+            if units <= 0:
+                continue
+            part = self._sell([g], [units])
+            plan.append([self.assets[g], self.isins[g], self.names[g], _round(units, 4),
+                         _round(units * self.price[g]), _round(part.long_gain[0])])
+            left -= float(part.long_gain[0])
+        return {
+            "fy": fy_label(self.fy),
+            "exemption_left": _round(current["exemption_left"]),
+            "unabsorbed_loss": _round(current["unabsorbed_loss"]),
+            "sales": plan,
+            "tax_free_gain": _round(budget - left),
+        }
+
+    def _units_for_gain(self, g: int, boundary: float, target: float) -> float:
+        """Units (held today) to sell from the oldest lot so that the long-term gain reaches `target`."""
+        fifo = self.fifo
+        start = fifo.matched_end[g]
+        unit_price = self.price[g] * fifo.final_factor[g]
+        inner = fifo.axis[(fifo.axis > start) & (fifo.axis < boundary)]
+        points = np.r_[start, inner, boundary]
+        gain = (points - start) * unit_price - fifo.cost(np.full(len(points), start), points)
+        # Gains are linear within a lot; find the first lot boundary past the target and interpolate
+        reached = np.flatnonzero(gain >= target)
+        if not len(reached):
+            return float((boundary - start) * fifo.final_factor[g])
+        k = int(reached[0])
+        share = (target - gain[k - 1]) / (gain[k] - gain[k - 1])
+        return float((points[k - 1] + share * (points[k] - points[k - 1]) - start) * fifo.final_factor[g])
+
+    def loss_candidates(self) -> list:
+        """LOSS_COLUMNS for positions held at a loss: tax saved this year by selling them outright."""
+        fifo = self.fifo
+        groups, sold = self._open()
+        gain = np.nan_to_num(sold.short_gain) + np.nan_to_num(sold.long_gain)
+        losing = np.flatnonzero(gain < -0.005)
+        before = fy_tax(self.fy, self.realized_gains(self.fy))["tax"]
+        rows = []
+        for i in losing[np.argsort(gain[losing], kind="stable")].tolist():
+            g = groups[i:i + 1]
+            one = sold.take(slice(i, i + 1))
+            quantity = float((sold.short_qty[i] + sold.long_qty[i]) * fifo.final_factor[g[0]])
+            rows.append([
+                self.assets[g[0]], self.isins[g[0]], self.names[g[0]], TAX_CLASSES[self.tax_class[g[0]]],
+                _round(quantity, 4), _round(quantity * self.price[g[0]]), _round(gain[i]),
+                _round(before - self._tax_with(g, one)["tax"]),
+            ])
+        return rows
+
+    def summary(self) -> dict:
+        tax = fy_tax(self.fy, self.realized_gains(self.fy))
+        held = self.fifo.held > 0
+        return {
+            "as_of": str(self.as_of),
+            "fy": fy_label(self.fy),
+            "realized_short_term_gain": _round(tax["short_term_gain"]),
+            "realized_long_term_gain": _round(tax["long_term_gain"]),
+            "estimated_tax": _round(tax["tax"]),
+            "ltcg_exemption_left": _round(tax["exemption_left"]),
+            "unabsorbed_loss": _round(tax["unabsorbed_loss"]),
+            "slab_rate_assumed": SLAB_RATE,
+            "isins_without_price": sorted({self.isins[g] for g in np.flatnonzero(held & np.isnan(self.price))}),
+        }
+
+
+def _build(mf_payload, stock_payload, net_worth_payload, as_of) -> CapitalGains:
+    stock = load_columns("fetch_stock_transactions", stock_payload) if stock_payload else None
+    mf = load_columns("fetch_mf_transactions", mf_payload) if mf_payload else None
+    n_stock = len(stock.isins) if stock is not None else 0
+    n_mf = len(mf.isins) if mf is not None else 0
+    parts = []
+    if stock is not None and len(stock):
+        parts.append((stock.isin.astype(np.intp), stock.txn_type.astype(np.int64), stock.date, stock.quantity,
+                      stock.nav))
+    if mf is not None and len(mf):
+        valid = mf.units > 0
+        txn_type = np.where(valid & (mf.order_type == 1), BUY, np.where(valid & (mf.order_type == 2), SELL, 0))
+        price = np.divide(mf.amount, mf.units, out=np.full(len(mf), np.nan), where=valid)
+        parts.append((mf.scheme.astype(np.intp) + n_stock, txn_type, mf.date, mf.units, price))
+    n_groups = n_stock + n_mf
+    if parts:
+        group, txn_type, dates, quantity, price = (np.concatenate(column) for column in zip(*parts))
+    else:
+        group, txn_type, quantity, price = (np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.int64),
+                                            np.zeros(0), np.zeros(0))
+        dates = np.zeros(0, dtype="datetime64[D]")
+    fifo = fifo_lots(group, txn_type, dates, quantity, price, n_groups)
+
+    stock_prices = equity_prices(net_worth_payload)
+    mf_classes = scheme_tax_classes(net_worth_payload)
+    analytics = ((net_worth_payload or {}).get("mfSchemeAnalytics") or {}).get("schemeAnalytics") or []
+    mf_navs = {
+        scheme["schemeDetail"]["isinNumber"]: money_to_float(scheme["schemeDetail"]["nav"])
+        for scheme in analytics
+        if scheme.get("schemeDetail", {}).get("isinNumber") and scheme["schemeDetail"].get("nav")
+    }
+    stock_isins = stock.isins if stock is not None else []
+    mf_isins = mf.isins if mf is not None else []
+    isins = list(stock_isins) + list(mf_isins)
+    assets = ["stock"] * n_stock + ["mf"] * n_mf
+    mf_names = list(mf.scheme_names) if mf is not None else []
+    names = [stock_prices[isin][1] if isin in stock_prices else "" for isin in stock_isins] + mf_names
+    tax_class = np.array(
+        [EQUITY] * n_stock
+        + [mf_classes[isin] if isin in mf_classes else name_tax_class(name) for isin, name in zip(mf_isins, mf_names)],
+        dtype=np.intp,
+    )
+
+    # Current price per unit held today: market price, else the last transaction price (after splits)
+    g, txn_type, price = group[fifo.order], txn_type[fifo.order], price[fifo.order]
+    priced = np.flatnonzero(~np.isnan(price) & ((txn_type == BUY) | (txn_type == SELL)))
+    last_price = np.full(n_groups, np.nan)
+    last_price[g[priced]] = price[priced] * fifo.factor[priced] / fifo.final_factor[g[priced]]
+    market = [stock_prices[isin][0] if isin in stock_prices else np.nan for isin in stock_isins]
+    market += [mf_navs.get(isin, np.nan) for isin in mf_isins]
+    market = np.array(market, dtype=np.float64)
+    current_price = np.where(np.isnan(market), last_price, market)
+
+    # Realized gains of every past sale
+    rows = fifo.sale_rows
+    sale_dates = dates[fifo.order][rows]
+    unit_price = price[rows] * fifo.factor[rows]
+    sold = split_sales(fifo, tax_class, g[rows], fifo.sale_start, fifo.sale_end, sale_dates, unit_price)
+    # Units sold beyond the holding (bought before the history starts) have no lot to match
+    unmatched = quantity[fifo.order][rows] / fifo.factor[rows] - (fifo.sale_end - fifo.sale_start)
+    proceeds = (fifo.sale_end - fifo.sale_start - sold.unknown_qty) * unit_price
+    sales = {
+        "fy": financial_year(sale_dates),
+        "tax_class": tax_class[g[rows]],
+        "regime": sold.regime,
+        "short_gain": sold.short_gain,
+        "long_gain": sold.long_gain,
+        "proceeds": proceeds,
+        "cost": fifo.cost(fifo.sale_start, fifo.sale_end),
+        "incomplete": (sold.unknown_qty > fifo.tolerance) | (unmatched > fifo.tolerance) | np.isnan(unit_price),
+    }
+    return CapitalGains(fifo, assets, isins, names, tax_class, current_price, as_of, sales)
+
+
+# Built lots per payload content and valuation date, so what-ifs in a session reuse them
+_cache = TTLCache(CACHE_TTL, max_entries=64)
+
+
+def capital_gains(mf_payload, stock_payload, net_worth_payload=None, as_of: date = None) -> CapitalGains:
+    """Lots, realized gains and current prices of one user's mutual funds and stocks.
+
+    MF units are bought at transaction amount / units (stamp duty included) and
+    valued at the mfSchemeAnalytics NAV; stocks at the holdingsInfo last traded
+    price. Either falls back to the last transaction price. Sales without a price,
+    and units without a cost, are left out of the gains and counted as incomplete.
+    """
+    as_of = np.datetime64(as_of or date.today(), "D")
+    owner = "|".join(recent_digest(payload) if payload else "" for payload in (mf_payload, stock_payload, net_worth_payload))
+    result = _cache.get(owner, str(as_of))
+    if result is None:
+        result = _build(mf_payload, stock_payload, net_worth_payload, as_of)
+        _cache.put(owner, str(as_of), result)
+    return result
@@ -0,0 +1,274 @@
+"""Loan engine: EMIs, amortization schedules, prepayments, rate changes and affordability.
+
+Loan variants are amortized together: balances, rates and EMIs are vectors over
+the variants and each month is a handful of vector operations, so a batch costs
+about as much as its longest schedule. As Indian lenders do by default, a rate
+change or a part-prepayment keeps the EMI and moves the tenure; with
+`keep_emi=False` the EMI is recomputed over the remaining tenure instead. If a
+rate rise leaves the EMI below the month's interest, the EMI is reset over the
+remaining tenure, as lenders do, rather than letting the balance grow.
+Affordability is the FOIR test lenders apply: all EMIs including the new one as
+a share of the regular monthly income seen in the bank transactions.
+"""
+
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..fetchData.credit import REVOLVING_TYPES, credit_profiles
+from .cash_flow import cash_flow
+from .recurring import recurring_payments
+
+FOIR_LIMIT = float(os.getenv("FI_FOIR_LIMIT", "0.5"))  # lenders' usual cap on EMIs / income
+MAX_MONTHS = 600
+CLOSED_BELOW = 0.5  # balance in rupees treated as repaid
+
+VARIANT_COLUMNS = [
+    "variant", "principal", "rate_pct", "tenure_months", "emi", "total_interest", "months_to_close",
+    "changed_total_interest", "changed_months_to_close", "changed_last_emi", "interest_saved", "months_saved",
+    "foir_pct", "affordable", "max_affordable_principal",
+]
+SCHEDULE_COLUMNS = ["year", "emi_paid", "interest", "principal", "prepaid", "closing_balance", "rate_pct"]
+LOAN_COLUMNS = [
+    "lender", "type", "status", "opened", "reported", "original_amount", "outstanding", "past_due", "rate_pct",
+    "tenure_months", "estimated_emi", "estimated_months_left",
+]
+
+
+@dataclass(frozen=True)
+class LoanVariant:
+    principal: float
+    rate: float  # annual
+    months: int
+    prepayments: tuple = ()  # ((month, amount), ...) paid with that month's EMI
+    rate_changes: tuple = ()  # ((month, annual rate), ...) applying from that month on
+    keep_emi: bool = True
+
+
+@dataclass
+class Amortization:
+    emi: np.ndarray  # (variants,) first EMI
+    last_emi: np.ndarray  # (variants,) EMI at the end (differs after rate changes or prepayments)
+    interest: np.ndarray  # (variants, months)
+    principal: np.ndarray  # (variants, months) scheduled repayment
+    prepaid: np.ndarray  # (variants, months)
+    balance: np.ndarray  # (variants, months) after the month's payments
+    rate: np.ndarray  # (variants, months) annual
+    months_to_close: np.ndarray  # (variants,) -1 if not repaid within MAX_MONTHS
+
+    def total_interest(self) -> np.ndarray:
+        return self.interest.sum(axis=1)
+
+    def yearly(self, variant: int) -> list:
+        """SCHEDULE_COLUMNS per year of one variant."""
+        months = self.months_to_close[variant] if self.months_to_close[variant] > 0 else self.balance.shape[1]
+        rows = []
+        for start in range(0, months, 12):
+            end = min(start + 12, months)
+            interest = self.interest[variant, start:end].sum()
+            principal = self.principal[variant, start:end].sum()
+            rows.append([
+                start // 12 + 1, round(float(interest + principal), 2), round(float(interest), 2),
+                round(float(principal), 2), round(float(self.prepaid[variant, start:end].sum()), 2),
+                round(float(self.balance[variant, end - 1]), 2), round(float(self.rate[variant, end - 1]) * 100, 3),
+            ])
+        return rows
+
+
+@dataclass
+class Affordability:
+    monthly_income: float
+    income_source: str
+    existing_emis: float
+    emi_source: str
+    foir_limit: float
+
+    @property
+    def headroom(self) -> float:
+        """Largest new EMI within the FOIR limit."""
+        return max(self.monthly_income * self.foir_limit - self.existing_emis, 0.0)
+
+    def summary(self) -> dict:
+        return {
+            "monthly_income": round(self.monthly_income, 2), "income_source": self.income_source,
+            "existing_emis": round(self.existing_emis, 2), "emi_source": self.emi_source,
+            "foir_limit_pct": round(self.foir_limit * 100, 1),
+            "current_foir_pct": round(self.existing_emis / self.monthly_income * 100, 1) if self.monthly_income else None,
+            "emi_headroom": round(self.headroom, 2),
+        }
+
+
+def emi(principal, annual_rate, months):
+    """Equated monthly instalment repaying `principal` over `months` at `annual_rate` (arrays broadcast)."""
+    principal, rate, months = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64), np.asarray(annual_rate, dtype=np.float64) / 12,
+        np.maximum(np.asarray(months, dtype=np.float64), 1),
+    )
+    growth = (1 + rate) ** months
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(rate > 0, principal * rate * growth / (growth - 1), principal / months)
+
+
+def present_value(payment, annual_rate, months):
+    """Principal an EMI of `payment` repays over `months` at `annual_rate`."""
+    payment, rate, months = np.broadcast_arrays(
+        np.asarray(payment, dtype=np.float64), np.asarray(annual_rate, dtype=np.float64) / 12,
+        np.asarray(months, dtype=np.float64),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(rate > 0, payment * (1 - (1 + rate) ** -months) / rate, payment * months)
+
+
+def months_to_repay(balance, annual_rate, payment):
+    """Months an EMI of `payment` takes to repay `balance`; inf if it does not cover the interest."""
+    balance, rate, payment = np.broadcast_arrays(
+        np.asarray(balance, dtype=np.float64), np.asarray(annual_rate, dtype=np.float64) / 12,
+        np.asarray(payment, dtype=np.float64),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        left = 1 - balance * rate / payment
+        return np.where(
+            rate > 0, np.where(left > 0, -np.log(np.where(left > 0, left, 1)) / np.log1p(rate), np.inf),
+            balance / payment,
+        )
+
+
+def amortize(variants: list, max_months: int = MAX_MONTHS) -> Amortization:
+    """Month-by-month schedules of all `variants` at once."""
+    n = len(variants)
+    horizon = max_months
+    rates = np.empty((n, horizon))
+    prepay = np.zeros((n, horizon))
+    for i, variant in enumerate(variants):
+        rates[i] = variant.rate
+        for month, rate in sorted(variant.rate_changes):
+            rates[i, max(month, 1) - 1:] = rate
+        for month, amount in variant.prepayments:
+            if 1 <= month <= horizon:
+                prepay[i, month - 1] += amount
+    balance = np.array([variant.principal for variant in variants], dtype=np.float64)
+    remaining = np.array([variant.months for variant in variants], dtype=np.float64)
+    keep_emi = np.array([variant.keep_emi for variant in variants])
+    payment = emi(balance, rates[:, 0], remaining)
+    first = payment.copy()
+    interest = np.zeros((n, horizon))
+    principal = np.zeros((n, horizon))
+    balances = np.zeros((n, horizon))
+    closed = np.full(n, -1)
+    used = 0
+    for month in range(horizon):
+        open_ = balance > CLOSED_BELOW
+        if not open_.any():
+            break
+        used = month + 1
+        rate = rates[:, month] / 12
+        if month:
+            reset = ~keep_emi & (rates[:, month] != rates[:, month - 1])
+            reset |= payment <= balance * rate  # EMI no longer covers the interest
+            reset &= open_
+            if reset.any():
+                payment[reset] = emi(balance[reset], rates[reset, month], np.maximum(remaining[reset], 1))
+        interest[:, month] = np.where(open_, balance * rate, 0.0)
+        principal[:, month] = np.where(open_, np.minimum(payment - interest[:, month], balance), 0.0)
+        balance -= principal[:, month]
+        prepaid = np.minimum(prepay[:, month], balance)
+        prepay[:, month] = prepaid
+        balance -= prepaid
+        remaining -= 1
+        recompute = ~keep_emi & (prepaid > 0) & (balance > CLOSED_BELOW)
+        if recompute.any():
+            payment[recompute] = emi(balance[recompute], rates[recompute, month], np.maximum(remaining[recompute], 1))
+        balance[balance <= CLOSED_BELOW] = 0.0
+        balances[:, month] = balance
+        closed[open_ & (balance == 0) & (closed < 0)] = month + 1
+    return Amortization(
+        emi=first, last_emi=payment, interest=interest[:, :used], principal=principal[:, :used],
+        prepaid=prepay[:, :used], balance=balances[:, :used], rate=rates[:, :used], months_to_close=closed,
+    )
+
+
+def affordability(bank_payload, credit_payload=None, foir_limit: float = FOIR_LIMIT) -> Affordability:
+    """Regular monthly income and existing EMIs from the bank transactions (or the credit report)."""
+    income, income_source, emis, emi_source = 0.0, "none", 0.0, "none"
+    if bank_payload:
+        recurring = recurring_payments(bank_payload)
+        if recurring.monthly_recurring_income > 0:
+            income, income_source = recurring.monthly_recurring_income, "recurring_bank_credits"
+        else:
+            credits = [row[1] for row in cash_flow(bank_payload).totals[-12:]]
+            if credits:
+                income, income_source = float(np.median(credits)), "median_monthly_credits"
+        # "Likely" EMIs count too: missing a new loan would overstate the headroom
+        loan_emis = [row[10] for row in recurring.rows if row[1] == "loan_emi" and row[2] == "debit"]
+        if loan_emis:
+            emis, emi_source = float(sum(loan_emis)), "recurring_bank_emis"
+    if emi_source == "none" and credit_payload:
+        estimated = [row[10] for row in credit_report_loans(credit_payload) if row[10] != ""]
+        if estimated:
+            emis, emi_source = float(sum(estimated)), "credit_report_estimate"
+    return Affordability(income, income_source, emis, emi_source, foir_limit)
+
+
+def credit_report_loans(credit_payload) -> list:
+    """LOAN_COLUMNS per open instalment loan in fetch_credit_report, largest outstanding first.
+
+    The EMI is estimated from the original amount, rate and tenure when the bureau
+    reports them, and the months left from the outstanding balance at that EMI.
+    """
+    rows = []
+    for profile in credit_profiles(credit_payload):
+        for account in profile.accounts:
+            if account.kind in REVOLVING_TYPES or not account.is_open:
+                continue
+            estimated, left = "", ""
+            if account.rate > 0 and account.tenure > 0 and account.original > 0:
+                estimated = float(emi(account.original, account.rate, account.tenure))
+                months = float(months_to_repay(account.balance, account.rate, estimated))
+                left = int(np.ceil(months)) if np.isfinite(months) else ""
+                estimated = round(estimated, 2)
+            rows.append([
+                account.lender, account.type_name, account.status, str(account.opened), str(account.reported),
+                account.original, account.balance, account.past_due,
+                round(account.rate * 100, 3) if account.rate else "", account.tenure or "", estimated, left,
+            ])
+    rows.sort(key=lambda row: -row[6])
+    return rows
+
+
+def compare_loans(variants: list, changes: list, affordable: Affordability = None) -> tuple:
+    """(VARIANT_COLUMNS rows, Amortization) for each variant as offered and with its `changes` variant.
+
+    `changes[i]` is `variants[i]` with prepayments or rate changes (or None); both
+    are amortized in one batch. The Amortization holds the changed variants after
+    the plain ones.
+    """
+    changed = [change if change is not None else variant for variant, change in zip(variants, changes)]
+    schedules = amortize(variants + changed)
+    n = len(variants)
+    total = schedules.total_interest()
+    rows = []
+    for i, variant in enumerate(variants):
+        row = [
+            i + 1, round(variant.principal, 2), round(variant.rate * 100, 3), variant.months,
+            round(float(schedules.emi[i]), 2), round(float(total[i]), 2), int(schedules.months_to_close[i]),
+        ]
+        if changes[i] is not None:
+            j = n + i
+            row += [
+                round(float(total[j]), 2), int(schedules.months_to_close[j]), round(float(schedules.last_emi[j]), 2),
+                round(float(total[i] - total[j]), 2),
+                int(schedules.months_to_close[i] - schedules.months_to_close[j]),
+            ]
+        else:
+            row += ["", "", "", "", ""]
+        if affordable is not None and affordable.monthly_income > 0:
+            foir = (affordable.existing_emis + schedules.emi[i]) / affordable.monthly_income
+            row += [
+                round(float(foir) * 100, 1), bool(foir <= affordable.foir_limit),
+                round(float(present_value(affordable.headroom, variant.rate, variant.months)), 2),
+            ]
+        else:
+            row += ["", "", ""]
+        rows.append(row)
+    return rows, schedules
@@ -0,0 +1,409 @@
+"""Rebalancing engine: the cheapest sales, buys and SIP redirections that bring the allocation back within a band.
+
+Current values per asset class come from the net worth snapshot (EPF and NPS
+only with include_retirement). What can be sold comes from the capital-gains
+lots: every mutual fund folio and stock with a price, plus bank balances (cash,
+free to move) and deposits (debt, broken early at DEPOSIT_PENALTY). ELSS units
+within their LOCK_IN_MONTHS, and anything else (US securities, SGBs, holdings
+without transactions), stay as they are.
+
+The target is a weight per asset class with a tolerance band around it. New
+money, the monthly SIP over the horizon plus any lump sum, costs nothing to
+redirect, so it goes first to the classes below their lower band. What it cannot
+fix is sold: every class above its upper band by at least the excess, and in
+total enough to lift the classes below their lower band, without taking any
+class below its own lower band. Selling costs the tax on the FIFO gains at the
+position's own rates (CapitalGains.sale_tax), the exit load on units bought in
+the last EXIT_LOAD_DAYS and a token TRADE_COST per sale, so that of equally
+cheap plans the one with fewer trades wins. These costs are stepwise in the
+amount sold, so instead of an LP the problem is solved exactly on a grid of
+minimum-ticket multiples (at most MAX_CELLS cells) by two min-plus dynamic
+programs: positions within each class, then classes within the total sold.
+Hybrid funds count in the search by how much they cut their larger class
+(a sale of x cuts equity by 0.65x); the allocation after the trades uses their
+full split, and the buys fill the lower bands first and then move each class
+towards its target. The tax reported is that of all the
+chosen sales together, with set-off and the LTCG exemption (`what_if`).
+"""
+
+import math
+import os
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+
+from ..fetchData.net_worth import ASSET_CLASSES, MF_CLASSES, net_worth_snapshot
+from .capital_gains import DEBT, capital_gains
+from .mf_returns import scheme_navs
+from .recurring import add_months
+
+# Target weights per risk profile, in ASSET_CLASSES order
+TARGET_PROFILES = {
+    "conservative": {"equity": 0.30, "debt": 0.55, "gold": 0.05, "cash": 0.10},
+    "moderate": {"equity": 0.55, "debt": 0.30, "gold": 0.10, "cash": 0.05},
+    "aggressive": {"equity": 0.75, "debt": 0.15, "gold": 0.05, "cash": 0.05},
+}
+BAND = 0.05  # tolerance around each target weight
+MIN_TICKET = float(os.getenv("FI_MIN_TICKET", "1000"))  # smallest purchase or redemption most funds accept
+MIN_SIP = 500.0
+EXIT_LOAD = float(os.getenv("FI_EXIT_LOAD", "0.01"))  # usual on equity, hybrid and gold funds within a year
+EXIT_LOAD_DAYS = 365
+DEPOSIT_PENALTY = float(os.getenv("FI_DEPOSIT_PENALTY", "0.01"))  # interest lost breaking a deposit early
+LOCK_IN_MONTHS = 36  # ELSS units cannot be redeemed before
+ELSS_NAMES = ("ELSS", "TAX SAVER", "TAX SAVING", "TAX RELIEF")  # for schemes missing from mfSchemeAnalytics
+TRADE_COST = 1.0
+MAX_CELLS = 200
+
+CLASS_COLUMNS = [
+    "asset_class", "target_pct", "lower_pct", "upper_pct", "current", "current_pct", "sell", "buy", "after",
+    "after_pct", "not_tradable",
+]
+TRADE_COLUMNS = ["action", "asset_class", "asset", "isin", "name", "amount", "units", "estimated_tax", "exit_load"]
+SIP_COLUMNS = ["asset_class", "monthly_sip", "isin", "name"]
+
+
+@dataclass
+class Position:
+    asset: str  # "mf", "stock", "savings" or "deposits"
+    asset_class: str  # the larger class, used in the search
+    shares: dict  # asset class -> share of the value
+    isin: str
+    name: str
+    value: float
+    price: float = 1.0  # per unit; 1 for bank balances and deposits
+    group: int = -1  # capital-gains group (folio or stock), -1 for bank balances and deposits
+
+
+@dataclass
+class Rebalance:
+    summary: dict
+    classes: list  # CLASS_COLUMNS rows in ASSET_CLASSES order
+    trades: list  # TRADE_COLUMNS rows, sales first
+    sips: list  # SIP_COLUMNS rows
+    notes: list
+
+
+def _round(value, digits: int = 2) -> float:
+    return round(float(value), digits)
+
+
+def _elss(net_worth_payload) -> set:
+    """ISINs of ELSS schemes in mfSchemeAnalytics."""
+    analytics = ((net_worth_payload or {}).get("mfSchemeAnalytics") or {}).get("schemeAnalytics") or []
+    return {
+        scheme["schemeDetail"].get("isinNumber") for scheme in analytics
+        if (scheme.get("schemeDetail") or {}).get("categoryName") == "ELSS"
+    }
+
+
+def positions(snapshot, gains, net_worth_payload, as_of) -> list:
+    """Sellable Positions, largest first: folios and stocks with a price, bank balances and deposits."""
+    result = []
+    if gains is not None:
+        fifo = gains.fifo
+        navs = scheme_navs(net_worth_payload)
+        elss = _elss(net_worth_payload)
+        groups = np.flatnonzero(fifo.held > 0)
+        # ELSS units bought within the lock-in come after this position
+        unlocked = fifo.position_at(groups, add_months(np.full(len(groups), as_of), np.full(len(groups), -LOCK_IN_MONTHS)))
+        for i, g in enumerate(groups.tolist()):
+            units = fifo.held[g]
+            isin, name = gains.isins[g], gains.names[g].upper()
+            if gains.assets[g] == "mf" and (isin in elss or isin not in navs and any(word in name for word in ELSS_NAMES)):
+                units = max(unlocked[i] - fifo.matched_end[g], 0)
+            value = float(units * fifo.final_factor[g] * gains.price[g])
+            if not value > 0:
+                continue
+            if gains.assets[g] == "stock":
+                shares = {"equity": 1.0}
+            else:
+                shares = MF_CLASSES.get(navs.get(gains.isins[g], (0, ""))[1], {"equity": 1.0})
+            result.append(Position(gains.assets[g], max(shares, key=shares.get), shares, gains.isins[g],
+                                   gains.names[g], value, float(gains.price[g]), g))
+    assets = {item: value for item, kind, value in snapshot.items() if kind == "asset"}
+    for asset, asset_class in (("savings_accounts", "cash"), ("deposits", "debt")):
+        if assets[asset] > 0:
+            result.append(Position(asset.removesuffix("_accounts"), asset_class, {asset_class: 1.0}, "", asset,
+                                   float(assets[asset])))
+    result.sort(key=lambda position: -position.value)
+    return result
+
+
+def _exit_load(gains, groups, units, since) -> np.ndarray:
+    """Exit load on selling `units` of each group (oldest first) for the units bought after `since`."""
+    fifo = gains.fifo
+    groups = np.asarray(groups, dtype=np.intp)
+    start = fifo.matched_end[groups]
+    end = np.minimum(start + units / fifo.final_factor[groups], fifo.group_total[groups])
+    recent = np.maximum(end - np.maximum(start, fifo.position_at(groups, np.full(len(groups), since))), 0)
+    charged = (np.array([gains.assets[g] == "mf" for g in groups.tolist()], dtype=bool)
+               & (gains.tax_class[groups] != DEBT))
+    return np.where(charged, recent * fifo.final_factor[groups] * gains.price[groups] * EXIT_LOAD, 0.0)
+
+
+def sale_costs(held: list, amounts: list, gains, since) -> tuple:
+    """(tax, exit load) arrays of selling `amounts` rupees of each Position in `held`."""
+    amounts = np.asarray(amounts, dtype=np.float64)
+    tax, load = np.zeros(len(held)), np.zeros(len(held))
+    lots = [i for i, position in enumerate(held) if position.group >= 0]
+    if lots:
+        groups = np.array([held[i].group for i in lots], dtype=np.intp)
+        units = amounts[lots] / np.array([held[i].price for i in lots])
+        tax[lots] = gains.sale_tax(groups, units)
+        load[lots] = _exit_load(gains, groups, units, since)
+    load += np.array([DEPOSIT_PENALTY if position.asset == "deposits" else 0.0 for position in held]) * amounts
+    return tax, load
+
+
+def _min_plus(curve: np.ndarray, cost: np.ndarray, capped: bool) -> tuple:
+    """Add an item costing cost[j] for j cells to a cost-per-cells curve: (new curve, cells taken per cell).
+
+    With `capped`, the last cell means "at least that many"; otherwise going past it is not allowed.
+    """
+    top = len(curve) - 1
+    new = curve + cost[0]
+    taken = np.zeros(len(curve), dtype=np.intp)
+    for j in range(1, min(len(cost), top + 1)):
+        shifted = np.full(len(curve), np.inf)
+        shifted[j:] = curve[:top + 1 - j] + cost[j]
+        if capped:
+            shifted[top] = curve[top - j:].min() + cost[j]
+        better = shifted < new
+        new[better] = shifted[better]
+        taken[better] = j
+    return new, taken
+
+
+def _trace(history: list, cell: int, capped: bool) -> list:
+    """Cells taken per item to reach `cell`, from the (curve before, cells taken) of each _min_plus step."""
+    cells = []
+    for curve, taken in reversed(history):
+        j = int(taken[cell])
+        top = len(curve) - 1
+        if capped and cell == top and j:
+            cell = top - j + int(np.argmin(curve[top - j:]))
+        else:
+            cell -= j
+        cells.append(j)
+    return cells[::-1]
+
+
+def _spread(budget: float, after: np.ndarray, lower: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Buys per class: up to the lower bands first, then towards the targets, any rest by target weight."""
+    total = after.sum() + budget
+    buys = np.zeros(len(after))
+    for goal in (lower * total, weights * total):
+        gap = np.maximum(goal - after - buys, 0)
+        if gap.sum() > 0 and budget > 0:
+            take = min(budget, gap.sum())
+            buys += gap * take / gap.sum()
+            budget -= take
+    return buys + weights * budget
+
+
+def _tickets(amounts: np.ndarray, unit: float, cap: np.ndarray = None) -> np.ndarray:
+    """Amounts rounded down to multiples of `unit`, with what that leaves added back.
+
+    Without `cap` the remainder goes to the largest amount. With it, it goes to the
+    amounts rounded down the most (never to one rounded to zero), each only up to
+    cap[k]; whatever does not fit is left out.
+    """
+    rounded = np.floor(amounts / unit) * unit
+    left = amounts.sum() - rounded.sum()
+    if cap is None:
+        if amounts.sum() > 0:
+            rounded[int(np.argmax(amounts))] += left
+        return rounded
+    for k in np.argsort(rounded - amounts, kind="stable").tolist():
+        if rounded[k] > 0 and left > 0:
+            add = min(left, max(cap[k] - rounded[k], 0.0))
+            rounded[k] += add
+            left -= add
+    return rounded
+
+
+def rebalance(net_worth_payload, mf_payload, stock_payload, target: dict, band: float = BAND,
+              monthly_sip: float = 0.0, horizon_months: int = 0, lump_sum: float = 0.0,
+              min_ticket: float = MIN_TICKET, include_retirement: bool = False, as_of: date = None) -> Rebalance:
+    """Cheapest plan to bring the allocation within `band` of the `target` weights (asset class -> weight).
+
+    Raises ValueError for a negative SIP, horizon or lump sum.
+    """
+    if monthly_sip < 0 or horizon_months < 0 or lump_sum < 0:
+        raise ValueError("monthly_sip, horizon_months and lump_sum must not be negative")
+    as_of = np.datetime64(as_of or date.today(), "D")
+    weights = np.array([float(target.get(name, 0.0)) for name in ASSET_CLASSES])
+    weights = weights / weights.sum()
+    snapshot = net_worth_snapshot(net_worth_payload)
+    current = np.array([float(value) for value in snapshot.asset_classes(include_retirement).values()])
+    new_money = monthly_sip * horizon_months + lump_sum
+    total = current.sum() + new_money
+    lower, upper = np.maximum(weights - band, 0), weights + band
+
+    gains = capital_gains(mf_payload, stock_payload, net_worth_payload, as_of) if mf_payload or stock_payload else None
+    held = positions(snapshot, gains, net_worth_payload, as_of)
+    index = {name: k for k, name in enumerate(ASSET_CLASSES)}
+    tradable = np.zeros(len(ASSET_CLASSES))
+    for position in held:
+        tradable[index[position.asset_class]] += position.value * position.shares[position.asset_class]
+    fixed = np.maximum(current - tradable, 0)
+
+    # Must sell: the excess over each upper band, and in total what new money leaves below the lower bands
+    excess = np.maximum(current - upper * total, 0)
+    funding = max(np.maximum(lower * total - current, 0).sum() - new_money, 0.0)
+    slack = np.maximum(np.minimum(current - lower * total, tradable), 0)
+    needed = max(funding, excess.sum())
+    step = min_ticket * max(1, math.ceil(needed / min_ticket / MAX_CELLS))
+    top = math.ceil(needed / step - 1e-9)
+    limit = np.minimum(np.floor(slack / step + 1e-9), top).astype(int)
+    required = np.ceil(excess / step - 1e-9).astype(int)
+
+    # Cost of cutting each position's class by r cells: selling ceil(r / share) cells of it, for every r at once
+    options = []
+    for p, position in enumerate(held):
+        share = position.shares[position.asset_class]
+        for r in range(1, min(int(position.value * share / step + 1e-9), limit[index[position.asset_class]]) + 1):
+            options.append((p, min(math.ceil(r / share - 1e-9) * step, position.value)))
+    tax, load = sale_costs([held[p] for p, _ in options], [amount for _, amount in options], gains,
+                           as_of - np.timedelta64(EXIT_LOAD_DAYS, "D"))
+    costs = {p: [0.0] for p in range(len(held))}
+    grid = {p: [0.0] for p in range(len(held))}
+    for (p, amount), value in zip(options, (tax + load + TRADE_COST).tolist()):
+        costs[p].append(value)
+        grid[p].append(amount)
+
+    # Positions within each class, then classes within the total
+    notes, class_history, curves = [], [], []
+    for k, name in enumerate(ASSET_CLASSES):
+        curve = np.r_[0.0, np.full(limit[k], np.inf)]
+        history = []
+        for p, position in enumerate(held):
+            if position.asset_class == name:
+                previous = curve
+                curve, taken = _min_plus(curve, np.array(costs[p]), capped=False)
+                history.append((previous, taken))
+        reachable = int(np.flatnonzero(np.isfinite(curve)).max())
+        if excess[k] - reachable * step > step:
+            notes.append(f"Only {reachable * step:.0f} of the {excess[k]:.0f} {name} above the upper band can be "
+                         f"sold; the rest is not tradable here or the other classes are at their lower bands.")
+        required[k] = min(required[k], reachable)
+        curve = np.where(np.arange(len(curve)) < required[k], np.inf, curve)
+        class_history.append(history)
+        curves.append(curve)
+    total_curve, history = np.r_[0.0, np.full(top, np.inf)], []
+    for curve in curves:
+        previous = total_curve
+        total_curve, taken = _min_plus(total_curve, curve, capped=True)
+        history.append((previous, taken))
+    floor = min(math.ceil(funding / step - 1e-9), top)
+    if np.isfinite(total_curve[floor:]).any():
+        cell = floor + int(np.argmin(total_curve[floor:]))
+    else:
+        cell = int(np.flatnonzero(np.isfinite(total_curve)).max())
+        notes.append(f"Sales can raise only {cell * step:.0f} of the {funding:.0f} needed to reach the lower bands.")
+
+    # Amounts per position; a remainder below the minimum ticket is sold too, stocks in whole shares
+    sold = {}
+    for k, cells in enumerate(_trace(history, cell, capped=True)):
+        members = [p for p, position in enumerate(held) if position.asset_class == ASSET_CLASSES[k]]
+        for p, r in zip(members, _trace(class_history[k], cells, capped=False)):
+            if r:
+                position = held[p]
+                amount = grid[p][r] if position.value - grid[p][r] >= min_ticket else position.value
+                if position.asset == "stock":
+                    amount = min(math.ceil(amount / position.price - 1e-9), round(position.value / position.price)) * position.price
+                sold[p] = amount
+    sales = [held[p] for p in sold]
+    amounts = np.array(list(sold.values()))
+    tax, load = sale_costs(sales, amounts, gains, as_of - np.timedelta64(EXIT_LOAD_DAYS, "D"))
+    exact_tax = 0.0
+    lots = {}
+    for position, amount in zip(sales, amounts.tolist()):
+        if position.group >= 0:
+            lots[position.group] = lots.get(position.group, 0.0) + amount / position.price
+    if lots:
+        # The folios chosen above, not the first folios of their ISINs
+        exact_tax = gains.extra_tax(list(lots), list(lots.values()))
+
+    after = current.copy()
+    sell = np.zeros(len(ASSET_CLASSES))
+    for position, amount in zip(sales, amounts.tolist()):
+        sell[index[position.asset_class]] += amount
+        for name, share in position.shares.items():
+            after[index[name]] -= amount * share
+    now = float(amounts.sum() - load.sum()) + lump_sum
+    budget = now + monthly_sip * horizon_months
+    buys = np.zeros(len(after))
+    if budget > 0:
+        # Rounding leftovers only top classes up to their targets; the rest stays in cash
+        room = weights * (after.sum() + budget) - after
+        buys = _tickets(_spread(budget, after, lower, weights), min_ticket, room)
+    left_in_cash = budget - buys.sum() if budget > 0 else 0.0
+    after += buys
+    after[index["cash"]] += left_in_cash
+    total_after = after.sum()
+    # What the buys leave over is simply not withdrawn from the savings accounts
+    for i, position in enumerate(sales):
+        if position.asset == "savings" and left_in_cash > 0:
+            cut = min(left_in_cash, amounts[i])
+            amounts[i] -= cut
+            sell[index["cash"]] -= cut
+            now, budget, left_in_cash = now - cut, budget - cut, left_in_cash - cut
+
+    def suggestion(k):
+        listed = [position for position in held if position.asset_class == ASSET_CLASSES[k] and position.group >= 0]
+        if listed:
+            return listed[0].asset, listed[0].isin, listed[0].name
+        return ("savings", "", "savings_accounts") if ASSET_CLASSES[k] == "cash" else ("", "", "")
+
+    trades = [
+        ["sell" if position.group >= 0 else "withdraw", position.asset_class, position.asset, position.isin,
+         position.name, _round(amount), _round(amount / position.price, 4) if position.group >= 0 else "",
+         _round(tax[i]), _round(load[i])]
+        for i, (position, amount) in enumerate(zip(sales, amounts.tolist())) if amount > 0
+    ]
+    sips = []
+    if budget > 0:
+        # Buys are funded pro rata by what is available now (sales and lump sum) and by the SIPs
+        for k in np.flatnonzero(buys * now / budget >= 1).tolist():
+            asset, isin, name = suggestion(k)
+            trades.append(["buy", ASSET_CLASSES[k], asset, isin, name, _round(buys[k] * now / budget), "", 0.0, 0.0])
+        if monthly_sip > 0 and horizon_months > 0 and buys.sum() > 0:
+            split = _tickets(monthly_sip * buys / buys.sum(), 100.0)
+            small = (split > 0) & (split < MIN_SIP)
+            if small.any() and not small.all():
+                split[int(np.argmax(split))] += split[small].sum()
+                split[small] = 0
+            for k in np.flatnonzero(split > 0).tolist():
+                sips.append([ASSET_CLASSES[k], _round(split[k]), *suggestion(k)[1:]])
+
+    before_pct = current / current.sum() if current.sum() > 0 else np.zeros(len(current))
+    after_pct = after / total_after if total_after > 0 else np.zeros(len(after))
+    outside = (after_pct < lower - 1e-9) | (after_pct > upper + 1e-9)
+    for k in np.flatnonzero(outside).tolist():
+        notes.append(f"{ASSET_CLASSES[k]} ends at {after_pct[k] * 100:.2f}%, outside its "
+                     f"{lower[k] * 100:.1f}-{upper[k] * 100:.1f}% band.")
+    classes = [
+        [name, _round(weights[k] * 100), _round(lower[k] * 100), _round(upper[k] * 100), _round(current[k]),
+         _round(before_pct[k] * 100), _round(sell[k]), _round(buys[k]), _round(after[k]), _round(after_pct[k] * 100),
+         _round(fixed[k])]
+        for k, name in enumerate(ASSET_CLASSES)
+    ]
+    summary = {
+        "current_value": _round(current.sum()),
+        "new_money": _round(new_money),
+        "monthly_sip": _round(monthly_sip),
+        "horizon_months": horizon_months,
+        "sales": _round(amounts.sum()),
+        "buys": _round(buys.sum()),
+        "left_in_cash": _round(left_in_cash),
+        "estimated_tax": _round(exact_tax),
+        "exit_loads": _round(load.sum()),
+        "trades": len(trades),
+        "max_drift_pct_before": _round(np.abs(before_pct - weights).max() * 100),
+        "max_drift_pct_after": _round(np.abs(after_pct - weights).max() * 100),
+        "within_band_after": not outside.any(),
+        "grid_step": step,
+    }
+    return Rebalance(summary, classes, trades, sips, notes)
@@ -0,0 +1,209 @@
+"""Recurring payment detector: SIPs, rent, EMIs, subscriptions and salary credits.
+
+Transactions are keyed by a normalized counterparty (the narration without
+reference numbers, dates and month names) and direction. After one sort by
+(key, date), every per-group statistic (count, median interval, interval and
+amount spread) comes from segment operations on the sorted arrays, so the cost
+is O(n log n) in the number of rows.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from ..fetchData.columnar import BANK_CREDIT_TYPES, BANK_DEBIT_TYPES, load_columns
+from .categorizer import get_categorizer
+
+RECURRING_COLUMNS = [
+    "counterparty", "category", "direction", "cadence", "occurrences", "typical_amount", "amount_spread_pct",
+    "first_date", "last_date", "next_expected", "monthly_equivalent", "status",
+]
+
+# (name, typical interval in days, tolerance in days, calendar months per step or 0 for fixed days)
+CADENCES = [
+    ("weekly", 7, 1, 0),
+    ("fortnightly", 14, 2, 0),
+    ("monthly", 30.44, 4, 1),
+    ("quarterly", 91.31, 8, 3),
+    ("half_yearly", 182.62, 12, 6),
+    ("yearly", 365.25, 15, 12),
+]
+# A series whose intervals or amounts vary more than this (relative to the median) is not recurring
+MAX_INTERVAL_SPREAD = 0.25
+MAX_AMOUNT_SPREAD = 0.35
+# Occurrences for a series to be "confirmed"; with fewer (two) it is only "likely"
+CONFIRMED_OCCURRENCES = 3
+DAYS_PER_MONTH = 30.44
+
+_MONTHS = {
+    "JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "SEPT", "OCT", "NOV", "DEC",
+    "JANUARY", "FEBRUARY", "MARCH", "APRIL", "JUNE", "JULY", "AUGUST", "SEPTEMBER", "OCTOBER", "NOVEMBER", "DECEMBER",
+}
+_TOKEN = re.compile(r"[A-Z0-9]+")
+
+
+@lru_cache(maxsize=65536)
+def normalize_counterparty(narration: str) -> str:
+    """Narration with reference numbers, masked account numbers and month names removed."""
+    tokens = [
+        token for token in _TOKEN.findall(narration.upper())
+        if not any(char.isdigit() for char in token) and token not in _MONTHS and set(token) != {"X"}
+    ]
+    return " ".join(tokens)
+
+
+@dataclass
+class Recurring:
+    rows: list  # RECURRING_COLUMNS, one per detected series, largest monthly equivalent first
+    monthly_obligations: float  # sum of monthly equivalents of confirmed recurring debits
+    monthly_recurring_income: float
+    # The same for "likely" series (seen only twice), kept out of the totals above
+    likely_monthly_obligations: float
+    likely_monthly_recurring_income: float
+
+
+def _segment_median(values: np.ndarray, group: np.ndarray, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Median of `values` within each contiguous group (groups given by start offset and length)."""
+    order = np.lexsort((values, group))
+    ranked = values[order]
+    low = ranked[starts + (counts - 1) // 2]
+    high = ranked[starts + counts // 2]
+    return (low + high) / 2
+
+
+def add_months(dates: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """Same day of month `months` later, clipped to the month's last day (Jan 31 + 1 -> Feb 28/29)."""
+    start = dates.astype("datetime64[M]")
+    day = (dates - start).astype(np.int64)
+    target = start + months.astype("timedelta64[M]")
+    month_days = ((target + 1).astype("datetime64[D]") - target.astype("datetime64[D]")).astype(np.int64)
+    return target.astype("datetime64[D]") + np.minimum(day, month_days - 1).astype("timedelta64[D]")
+
+
+def _next_dates(last: np.ndarray, cadence: np.ndarray, interval: np.ndarray, as_of: np.datetime64) -> np.ndarray:
+    """First expected date on or after `as_of` (and after `last`) for each series."""
+    step_months = np.array([c[3] for c in CADENCES])[cadence.clip(0)]
+    step_days = np.array([c[1] for c in CADENCES])[cadence.clip(0)]
+    step_days = np.where(cadence >= 0, step_days, np.nan_to_num(interval, nan=DAYS_PER_MONTH))
+    behind = (as_of - last).astype(np.float64)
+    # Estimate the number of steps from the day count, then step forward while still before as_of
+    steps = np.maximum(1, np.floor(behind / np.maximum(step_days, 1)))
+    by_days = last + np.round(steps * step_days).astype("timedelta64[D]")
+    by_months = add_months(last, steps * step_months)
+    for _ in range(2):
+        steps = steps + (np.where(step_months > 0, by_months, by_days) < as_of)
+        by_days = last + np.round(steps * step_days).astype("timedelta64[D]")
+        by_months = add_months(last, steps * step_months)
+    return np.where(step_months > 0, by_months, by_days)
+
+
+def recurring_payments(payload, as_of=None, min_occurrences: int = 2) -> Recurring:
+    """Detect periodic series in a bank transactions payload.
+
+    A series needs at least `min_occurrences` transactions on distinct days, a median
+    interval close to one of CADENCES, and stable intervals and amounts. Series seen
+    only twice are reported as "likely", longer ones as "confirmed"; only confirmed
+    series count towards the monthly totals. Next expected
+    dates are the first due on or after `as_of` (default: the latest transaction date).
+    """
+    cols = load_columns("fetch_bank_transactions", payload)
+    if not len(cols):
+        return Recurring([], 0.0, 0.0, 0.0, 0.0)
+
+    debit = np.isin(cols.txn_type, BANK_DEBIT_TYPES)
+    credit = np.isin(cols.txn_type, BANK_CREDIT_TYPES)
+    keep = debit | credit
+
+    # Counterparty per distinct narration, then per row through the narration codes
+    names, name_codes = np.unique(
+        np.array([normalize_counterparty(narration) for narration in cols.narrations], dtype=object),
+        return_inverse=True,
+    )
+    name = name_codes[cols.narration]
+    key = name * 2 + credit.astype(np.intp)  # debits and credits to the same party are separate series
+    categorizer = get_categorizer()
+    category = categorizer.categorize_codes(cols.narrations, cols.narration)
+
+    rows = np.flatnonzero(keep)
+    order = rows[np.lexsort((cols.date[rows], key[rows]))]
+    key, dates, amounts = key[order], cols.date[order], cols.amount[order]
+    category = category[order]
+
+    # Collapse same-day rows of a series into one payment (e.g. split debits)
+    same_day = np.r_[False, (key[1:] == key[:-1]) & (dates[1:] == dates[:-1])]
+    day_start = np.flatnonzero(~same_day)
+    amounts = np.add.reduceat(amounts, day_start)
+    key, dates, category = key[day_start], dates[day_start], category[day_start]
+
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    counts = np.diff(np.r_[starts, len(key)])
+    group = np.repeat(np.arange(len(starts)), counts)
+    candidates = counts >= max(2, min_occurrences)
+
+    # Intervals between consecutive payments, one fewer per group than payments
+    days = dates.astype(np.int64)
+    interval = np.diff(days).astype(np.float64)
+    within = group[1:] == group[:-1]
+    interval_group = group[1:][within]
+    interval = interval[within]
+    interval_counts = np.maximum(counts - 1, 0)
+    interval_starts = np.r_[0, np.cumsum(interval_counts)[:-1]]
+    has_interval = interval_counts > 0
+
+    median_interval = np.full(len(starts), np.nan)
+    interval_spread = np.full(len(starts), np.nan)
+    if has_interval.any():
+        median_interval[has_interval] = _segment_median(
+            interval, interval_group, interval_starts[has_interval], interval_counts[has_interval])
+        deviation = np.abs(interval - median_interval[interval_group])
+        interval_spread[has_interval] = _segment_median(
+            deviation, interval_group, interval_starts[has_interval], interval_counts[has_interval]
+        ) / median_interval[has_interval]
+
+    median_amount = _segment_median(amounts, group, starts, counts)
+    amount_deviation = np.abs(amounts - median_amount[group])
+    amount_spread = np.maximum.reduceat(amount_deviation, starts) / np.where(median_amount > 0, median_amount, 1)
+
+    cadence = np.full(len(starts), -1)
+    for i, (_, period, tolerance, _) in enumerate(CADENCES):
+        cadence = np.where((cadence < 0) & (np.abs(median_interval - period) <= tolerance), i, cadence)
+    recurring = (
+        candidates & (cadence >= 0) & (amount_spread <= MAX_AMOUNT_SPREAD)
+        & ~(interval_spread > MAX_INTERVAL_SPREAD)
+    )
+
+    last = starts + counts - 1
+    as_of = np.datetime64(as_of, "D") if as_of is not None else dates.max()
+    next_expected = _next_dates(dates[last], cadence, median_interval, as_of)
+    # Normalize by the cadence period, not the observed interval (a 31-day gap is still monthly)
+    period = np.array([c[1] for c in CADENCES])[cadence.clip(0)]
+    monthly = np.where(cadence >= 0, median_amount * DAYS_PER_MONTH / period, 0.0)
+
+    found = np.flatnonzero(recurring)
+    found = found[np.argsort(-monthly[found], kind="stable")]
+    table = [
+        [
+            names[key[starts[g]] // 2] or "(unnamed)", categorizer.categories[category[last[g]]],
+            "credit" if key[starts[g]] % 2 else "debit", CADENCES[cadence[g]][0], int(counts[g]),
+            round(float(median_amount[g]), 2), round(float(amount_spread[g]) * 100, 1), str(dates[starts[g]]),
+            str(dates[last[g]]), str(next_expected[g]), round(float(monthly[g]), 2),
+            "confirmed" if counts[g] >= CONFIRMED_OCCURRENCES else "likely",
+        ]
+        for g in found
+    ]
+    is_credit = (key[starts] % 2 == 1)[found]
+    confirmed = counts[found] >= CONFIRMED_OCCURRENCES
+    found_monthly = monthly[found]
+
+    def total(mask) -> float:
+        return round(float(found_monthly[mask].sum()), 2)
+
+    return Recurring(
+        rows=table,
+        monthly_obligations=total(confirmed & ~is_credit),
+        monthly_recurring_income=total(confirmed & is_credit),
+        likely_monthly_obligations=total(~confirmed & ~is_credit),
+        likely_monthly_recurring_income=total(~confirmed & is_credit),
+    )
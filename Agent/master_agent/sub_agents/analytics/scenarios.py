@@ -0,0 +1,226 @@
+"""Scenario sweeps over a goal projection: contribution, step-up, return, inflation, horizon and lump sums.
+
+Every scenario is run on the same random draws (common random numbers), so the
+differences between scenarios come from their inputs and not from sampling
+noise. A simulation is kept per path as yearly growth and annuity factors
+(monte_carlo.yearly_factors), and any schedule of contributions and lump sums
+is replayed from them with one multiply-add per year: the contribution,
+step-up, inflation, horizon and lump-sum dimensions cost a few milliseconds per
+scenario. Only a different expected return needs a new simulation. The
+distinct returns are simulated in parallel in a process pool; each worker
+replays the scenarios of its return and returns summary rows only. Wealth is
+checked against the target at year ends, and a withdrawal that empties a path
+leaves it at zero from that year end on.
+"""
+
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+from .monte_carlo import DEFAULT_INFLATION, PATHS, goal_inputs, percentiles, yearly_factors
+
+WORKERS = int(os.getenv("FI_SWEEP_WORKERS", "0")) or os.cpu_count() or 1
+MAX_SCENARIOS = int(os.getenv("FI_SWEEP_MAX_SCENARIOS", "500"))
+
+DIMENSIONS = ("monthly_contribution", "annual_step_up_pct", "expected_return_pct", "inflation_pct", "years",
+              "lump_sums")
+SCENARIO_COLUMNS = ["changed", *DIMENSIONS, "success_probability", "p10", "p50", "p90", "median_years_to_goal"]
+TORNADO_COLUMNS = ["parameter", "low", "high", "probability_low", "probability_high", "swing"]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    monthly: float
+    step_up: float
+    mean: float
+    inflation: float
+    years: int
+    lumps: tuple = ()  # ((year, amount), ...); year 0 is today, year y the end of year y, negative = withdrawal
+
+    def values(self) -> list:
+        """The scenario in DIMENSIONS order, percentages as percent."""
+        return [
+            round(self.monthly, 2), round(self.step_up * 100, 2), round(self.mean * 100, 2),
+            round(self.inflation * 100, 2), self.years, format_lumps(self.lumps),
+        ]
+
+
+@dataclass
+class Sweep:
+    base: dict  # the base scenario and its results
+    scenarios: list  # SCENARIO_COLUMNS rows
+    tornado: list  # TORNADO_COLUMNS rows, largest swing first
+    inputs: dict
+
+
+def format_lumps(lumps: tuple) -> str:
+    return ";".join(f"{amount:.0f}@{year}" for year, amount in lumps)
+
+
+def replay(initial: float, target: float, scenario: Scenario, factors) -> list:
+    """[success probability, p10, p50, p90 of the final wealth (today's rupees), median years to goal]."""
+    lumps = {}
+    for year, amount in scenario.lumps:
+        lumps[year] = lumps.get(year, 0.0) + amount
+    floor = scenario.monthly < 0 or any(amount < 0 for amount in lumps.values())
+    paths = factors.growth.shape[1]
+    wealth = np.full(paths, float(initial) + lumps.get(0, 0.0))
+    if floor:
+        np.maximum(wealth, 0.0, out=wealth)
+    reached = np.full(paths, -1, dtype=np.int16)  # first year end at or above the target
+    reached[wealth >= target] = 0
+    invested = np.empty(paths)
+    price_level = 1.0
+    for year in range(scenario.years):
+        wealth *= factors.growth[year]
+        np.multiply(factors.annuity[year], scenario.monthly * (1 + scenario.step_up) ** year, out=invested)
+        wealth += invested
+        if year + 1 in lumps:
+            wealth += lumps[year + 1]
+        if floor:
+            np.maximum(wealth, 0.0, out=wealth)
+        price_level *= 1 + scenario.inflation
+        reached[(reached < 0) & (wealth >= target * price_level)] = year + 1
+    final = wealth / price_level
+    years = reached[reached >= 0]
+    return [
+        round(float(np.count_nonzero(final >= target)) / paths, 4),
+        *(round(float(value)) for value in percentiles(final, (10, 50, 90))),
+        float(np.median(years)) if len(years) else "",
+    ]
+
+
+def _replay_all(initial: float, target: float, volatility: float, paths: int, seed: int, scenarios: list) -> list:
+    """Results of scenarios sharing one expected return; the unit of work sent to the process pool."""
+    factors = yearly_factors(scenarios[0].mean, volatility, max(s.years for s in scenarios), paths, seed)
+    return [replay(initial, target, scenario, factors) for scenario in scenarios]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Workers start from a clean server process, not a fork of this threaded one
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context(method))
+        return _pool
+
+
+def _discard_executor() -> None:
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def _evaluate(initial: float, target: float, volatility: float, paths: int, seed: int, scenarios: list) -> dict:
+    """Scenario -> results, one simulation per distinct expected return, in parallel when there are several."""
+    groups = {}
+    for scenario in scenarios:
+        groups.setdefault(scenario.mean, []).append(scenario)
+    groups = list(groups.values())
+    if len(groups) > 1 and WORKERS > 1:
+        try:
+            pool = _executor()
+            futures = [pool.submit(_replay_all, initial, target, volatility, paths, seed, group) for group in groups]
+            return {
+                scenario: result
+                for group, future in zip(groups, futures) for scenario, result in zip(group, future.result())
+            }
+        except BrokenProcessPool:  # a worker died; run in this process and start a new pool next time
+            _discard_executor()
+    return {
+        scenario: result
+        for group in groups for scenario, result in zip(group, _replay_all(initial, target, volatility, paths, seed, group))
+    }
+
+
+def sweep(initial: float, target: float, base: Scenario, volatility: float, alternatives: dict,
+          full_grid: bool = False, paths: int = PATHS, seed: int = 0) -> Sweep:
+    """Evaluate `base` and its variants towards `target` (today's rupees).
+
+    `alternatives` maps a DIMENSIONS name to the other values to try for it, in
+    the units of Scenario.values() (lump sums as tuples of (year, amount)). By
+    default each alternative changes one dimension of the base; with
+    `full_grid` every combination is evaluated, up to MAX_SCENARIOS.
+    """
+    fields = dict(zip(DIMENSIONS, ("monthly", "step_up", "mean", "inflation", "years", "lumps")))
+    scale = {"annual_step_up_pct": 100, "inflation_pct": 100}
+    choices = {}
+    for name, values in alternatives.items():
+        if name not in fields:
+            raise ValueError(f"unknown dimension {name}; expected one of {', '.join(DIMENSIONS)}")
+        if name == "expected_return_pct":
+            converted = [base.mean + value / 100 for value in values]  # shifts of the base return
+        elif name == "years":
+            converted = [int(value) for value in values]
+        elif name == "lump_sums":
+            converted = [tuple((int(year), float(amount)) for year, amount in value) for value in values]
+        else:
+            converted = [value / scale.get(name, 1) for value in values]
+        current = getattr(base, fields[name])
+        choices[name] = [current] + list(dict.fromkeys(value for value in converted if value != current))
+    one_at_a_time = [base] + [
+        replace(base, **{fields[name]: value}) for name, values in choices.items() for value in values[1:]
+    ]
+    scenarios = one_at_a_time
+    if full_grid and choices:
+        names = list(choices)
+        scenarios = [
+            replace(base, **{fields[name]: value for name, value in zip(names, combination)})
+            for combination in itertools.product(*(choices[name] for name in names))
+        ]
+        if len(scenarios) > MAX_SCENARIOS:
+            raise ValueError(f"{len(scenarios)} scenarios in the full grid; at most {MAX_SCENARIOS}")
+    scenarios = list(dict.fromkeys(scenarios + one_at_a_time))
+    results = _evaluate(initial, target, volatility, paths, seed, scenarios)
+
+    base_values = base.values()
+    rows = []
+    for scenario in scenarios:
+        values = scenario.values()
+        changed = [name for name, value, default in zip(DIMENSIONS, values, base_values) if value != default]
+        rows.append(["+".join(changed) or "base", *values, *results[scenario]])
+    tornado = []
+    for name, values in choices.items():
+        if len(values) < 2:
+            continue
+        ranked = sorted(values, key=lambda value: sum(amount for _, amount in value) if name == "lump_sums" else value)
+        low, high = (replace(base, **{fields[name]: value}) for value in (ranked[0], ranked[-1]))
+        column = DIMENSIONS.index(name)
+        probability_low, probability_high = results[low][0], results[high][0]
+        tornado.append([
+            name, low.values()[column], high.values()[column], probability_low, probability_high,
+            round(abs(probability_high - probability_low), 4),
+        ])
+    tornado.sort(key=lambda row: -row[-1])
+    return Sweep(
+        base=dict(zip(SCENARIO_COLUMNS[1:], [*base_values, *results[base]])),
+        scenarios=rows,
+        tornado=tornado,
+        inputs={"initial": round(float(initial), 2), "target_today": round(float(target), 2),
+                "volatility": round(volatility, 4), "paths": paths, "scenarios": len(scenarios)},
+    )
+
+
+def goal_sweep(net_worth_payload, mf_payload, bank_payload, target: float, years: int, alternatives: dict,
+               monthly: float = None, step_up: float = 0.0, mean: float = None, volatility: float = None,
+               inflation: float = DEFAULT_INFLATION, initial: float = None, include_retirement: bool = False,
+               full_grid: bool = False) -> Sweep:
+    """sweep() around the user's goal projection; base inputs not given are derived by goal_inputs()."""
+    inputs = goal_inputs(net_worth_payload, mf_payload, bank_payload, monthly, mean, volatility, initial,
+                         include_retirement)
+    base = Scenario(inputs["monthly"], step_up, inputs["mean"], inflation, years)
+    result = sweep(inputs["initial"], target, base, inputs["volatility"], alternatives, full_grid=full_grid)
+    result.inputs["contribution_source"] = inputs["contribution_source"]
+    result.inputs["allocation"] = inputs["allocation"]
+    return result
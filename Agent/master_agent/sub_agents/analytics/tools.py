@@ -0,0 +1,779 @@
+"""ADK tools exposing the analytics engines to the agents.
+
+Each tool reads the payloads fetchData_agent stored in session state (fetching
+through the cached client only if they are missing) and returns the engine's
+results as small tables, so the model never has to do the arithmetic itself.
+"""
+
+from typing import Optional
+
+import numpy as np
+from google.adk.tools import ToolContext
+
+from ..fetchData.columnar import recent_digest
+from ..fetchData.compaction import to_csv
+from ..fetchData.net_worth import (
+    ALLOCATION_COLUMNS, ASSET_CLASSES, DIFF_COLUMNS, NetWorthSnapshot, diff_rows, net_worth_snapshot,
+)
+from ..fetchData.state import NET_WORTH_SNAPSHOTS_KEY, get_payload
+from .anomalies import FLAG_COLUMNS, detect_anomalies
+from .capital_gains import (
+    FY_TAX_COLUMNS, HARVEST_COLUMNS, LOSS_COLUMNS, OPEN_COLUMNS, REALIZED_COLUMNS, WHAT_IF_COLUMNS, capital_gains,
+)
+from .cash_flow import MODE_COLUMNS, MONTHLY_COLUMNS, RECONCILIATION_COLUMNS, TOTAL_COLUMNS, cash_flow
+from .categorizer import CATEGORY_COLUMNS, MONTHLY_CATEGORY_COLUMNS, spending_breakdown
+from .epf import (
+    ESTABLISHMENT_COLUMNS, EPF_RATE, GAP_COLUMNS, PROJECTION_COLUMNS, RETIREMENT_AGE, current_age, epf_summary,
+    estimated_basic, retirement_projection,
+)
+from .goal_solver import SOLUTION_COLUMNS, Goal, solve_user_goals
+from .loans import (
+    LOAN_COLUMNS, MAX_MONTHS, SCHEDULE_COLUMNS, VARIANT_COLUMNS, LoanVariant, affordability, compare_loans, credit_report_loans,
+)
+from .mf_returns import SCHEME_COLUMNS, mf_returns
+from .monte_carlo import PATH_COLUMNS, goal_projection, monthly_contribution
+from .rebalance import CLASS_COLUMNS, MIN_TICKET, SIP_COLUMNS, TARGET_PROFILES, TRADE_COLUMNS, rebalance
+from .recurring import RECURRING_COLUMNS, recurring_payments
+from .risk import SCHEME_RISK_COLUMNS, portfolio_risk
+from .scenarios import SCENARIO_COLUMNS, TORNADO_COLUMNS, goal_sweep
+from .stock_holdings import HOLDING_COLUMNS, SALE_COLUMNS, stock_holdings
+
+# Sales listed by analyze_stock_holdings; older ones only count towards the realized totals
+RECENT_SALES = 25
+# Net worth snapshots kept in session state for analyze_net_worth comparisons
+MAX_SNAPSHOTS = 12
+
+
+def _missing(tool_name: str) -> dict:
+    return {"status": "error", "error_message": f"No {tool_name} data is available for this user."}
+
+
+def analyze_mf_returns(tool_context: ToolContext) -> dict:
+    """Compute mutual fund returns from the user's transactions and current NAVs.
+
+    Returns:
+        "schemes": CSV with one row per scheme (units held, NAV, invested, redeemed,
+        current value, absolute return, CAGR %, XIRR %, first purchase date, holding days),
+        "portfolio": the same metrics for the whole portfolio plus current value by asset class,
+        and "as_of": the valuation date. Percentages are already multiplied by 100.
+    """
+    state = tool_context.state
+    mf_payload = get_payload(state, "fetch_mf_transactions")
+    if not mf_payload:
+        return _missing("fetch_mf_transactions")
+    result = mf_returns(mf_payload, get_payload(state, "fetch_net_worth"))
+    if not result.schemes:
+        return {"status": "success", "as_of": result.as_of, "schemes": "", "portfolio": {}, "note": "No mutual fund transactions."}
+    return {
+        "status": "success",
+        "as_of": result.as_of,
+        "schemes": to_csv(SCHEME_COLUMNS, result.schemes),
+        "portfolio": result.portfolio,
+    }
+
+
+def analyze_cash_flow(tool_context: ToolContext) -> dict:
+    """Compute bank cash flow from the user's transactions.
+
+    Returns CSV tables:
+        "monthly": credits, debits, net, savings rate % and closing balance per account and month,
+        "totals": the same per month across all accounts (transfers between own accounts count on both sides),
+        "by_mode": credits and debits per account and transaction mode (UPI, NEFT, ACH, ...),
+        "reconciliation": per account, whether the running balance matches the transactions
+        (breaks = rows where currentBalance does not follow from the previous balance and the amount).
+    """
+    payload = get_payload(tool_context.state, "fetch_bank_transactions")
+    if not payload:
+        return _missing("fetch_bank_transactions")
+    result = cash_flow(payload)
+    if not result.monthly:
+        return {"status": "success", "note": "No bank transactions."}
+    return {
+        "status": "success",
+        "monthly": to_csv(MONTHLY_COLUMNS, result.monthly),
+        "totals": to_csv(TOTAL_COLUMNS, result.totals),
+        "by_mode": to_csv(MODE_COLUMNS, result.by_mode),
+        "reconciliation": to_csv(RECONCILIATION_COLUMNS, result.reconciliation),
+    }
+
+
+def analyze_spending(tool_context: ToolContext) -> dict:
+    """Categorize the user's bank transactions (rent, groceries, investments, EMIs, ...) by narration.
+
+    Returns CSV tables:
+        "by_category": debits with count and share %, plus credits, per category (largest spend first),
+        "monthly": debits per month and category,
+    and "uncategorized_debits_pct", the share of spending that no rule recognised.
+    """
+    payload = get_payload(tool_context.state, "fetch_bank_transactions")
+    if not payload:
+        return _missing("fetch_bank_transactions")
+    result = spending_breakdown(payload)
+    if not result["by_category"]:
+        return {"status": "success", "note": "No bank transactions."}
+    return {
+        "status": "success",
+        "by_category": to_csv(CATEGORY_COLUMNS, result["by_category"]),
+        "monthly": to_csv(MONTHLY_CATEGORY_COLUMNS, result["monthly"]),
+        "uncategorized_debits_pct": result["uncategorized_debits_pct"],
+    }
+
+
+def analyze_recurring_payments(tool_context: ToolContext) -> dict:
+    """Detect recurring bank transactions: SIPs, rent, EMIs, subscriptions, card bills and salary credits.
+
+    Returns:
+        "recurring": CSV with one row per series (counterparty, category, direction, cadence,
+        occurrences, typical amount, amount spread %, first and last date, next expected date,
+        monthly equivalent, and status "confirmed" for 3+ occurrences or "likely" for 2),
+        "monthly_obligations": the monthly equivalent of confirmed recurring debits,
+        "monthly_recurring_income": the same for confirmed recurring credits,
+        and "likely_monthly_obligations" / "likely_monthly_recurring_income": the same
+        for series seen only twice, which are not included in the first two.
+    """
+    payload = get_payload(tool_context.state, "fetch_bank_transactions")
+    if not payload:
+        return _missing("fetch_bank_transactions")
+    result = recurring_payments(payload)
+    if not result.rows:
+        return {"status": "success", "recurring": "", "note": "No recurring transactions found."}
+    return {
+        "status": "success",
+        "recurring": to_csv(RECURRING_COLUMNS, result.rows),
+        "monthly_obligations": result.monthly_obligations,
+        "monthly_recurring_income": result.monthly_recurring_income,
+        "likely_monthly_obligations": result.likely_monthly_obligations,
+        "likely_monthly_recurring_income": result.likely_monthly_recurring_income,
+    }
+
+
+def detect_suspicious_transactions(tool_context: ToolContext) -> dict:
+    """Flag unusual bank transactions for review.
+
+    Returns:
+        "flags": CSV of the most recent flags, newest first (date, account, bank, kind, amount,
+        counterparty, category, score, detail), where kind is one of
+        amount_outlier (score = robust z-score within the spending category),
+        new_counterparty (a large first debit to someone; score = amount / 10,000),
+        balance_drop (one debit took most of the balance; score = share of the balance) and
+        duplicate_debit (same amount to the same counterparty within a day),
+        "counts": number of flags per kind over the whole history, and "transactions_scanned".
+    """
+    payload = get_payload(tool_context.state, "fetch_bank_transactions")
+    if not payload:
+        return _missing("fetch_bank_transactions")
+    detector = detect_anomalies(payload)
+    if not detector.counts:
+        return {"status": "success", "flags": "", "counts": {}, "transactions_scanned": detector.rows,
+                "note": "No suspicious transactions found."}
+    return {
+        "status": "success",
+        "flags": to_csv(FLAG_COLUMNS, detector.flags()),
+        "counts": dict(detector.counts),
+        "transactions_scanned": detector.rows,
+    }
+
+
+def analyze_stock_holdings(tool_context: ToolContext) -> dict:
+    """Rebuild the user's stock positions from BUY/SELL/BONUS/SPLIT transactions with FIFO lots.
+
+    Returns:
+        "holdings": CSV with one row per ISIN (quantity after splits and bonuses, average cost,
+        invested, current price and its source, current value, unrealized and realized P&L,
+        first buy, oldest open lot, and the quantity reported by the depository if any),
+        "sales": CSV of the most recent sales with their FIFO cost and realized P&L,
+        and "portfolio": totals plus the ISINs without a market price or with unknown cost.
+        price_source is "holdingsInfo" (depository last traded price), "last_txn" (last
+        transaction price, may be stale) or empty (no price; value and unrealized P&L unknown).
+        Quantities whose cost or sale price is missing are reported in unknown_cost_qty /
+        unknown_pnl_qty and left out of the P&L. Holding quantities (including sold_qty) are in
+        today's post-split shares; sale rows are in shares at the time of the sale.
+    """
+    state = tool_context.state
+    payload = get_payload(state, "fetch_stock_transactions")
+    if not payload:
+        return _missing("fetch_stock_transactions")
+    result = stock_holdings(payload, get_payload(state, "fetch_net_worth"))
+    if not result.holdings:
+        return {"status": "success", "holdings": "", "portfolio": {}, "note": "No stock transactions."}
+    return {
+        "status": "success",
+        "holdings": to_csv(HOLDING_COLUMNS, result.holdings),
+        "sales": to_csv(SALE_COLUMNS, result.sales[-RECENT_SALES:]),
+        "sales_count": len(result.sales),
+        "portfolio": result.portfolio,
+    }
+
+
+def _capital_gains(state):
+    mf_payload = get_payload(state, "fetch_mf_transactions")
+    stock_payload = get_payload(state, "fetch_stock_transactions")
+    if not mf_payload and not stock_payload:
+        return None
+    return capital_gains(mf_payload, stock_payload, get_payload(state, "fetch_net_worth"))
+
+
+def analyze_capital_gains(tool_context: ToolContext) -> dict:
+    """Compute capital gains and tax on the user's mutual fund and stock sales (FIFO lots, Indian tax rules).
+
+    Returns:
+        "summary": this financial year's realized short- and long-term gains, estimated tax,
+        remaining equity LTCG exemption and unabsorbed losses,
+        "realized": CSV per financial year and tax class (equity / debt / other),
+        "tax_by_fy": CSV of gains after loss set-off, exemption used and estimated tax per year,
+        "open_positions": CSV per holding with the quantity and unrealized gain that is short-term
+        vs long-term today, and the date the oldest short-term units turn long-term,
+        "harvest_plan": sales that book long-term equity gains within this year's remaining exemption
+        (sell and buy back to reset the cost), and "loss_harvest": holdings at a loss with the tax
+        their sale would save this year. Taxes include 4% cess and exclude surcharge.
+    """
+    result = _capital_gains(tool_context.state)
+    if result is None:
+        return _missing("fetch_mf_transactions / fetch_stock_transactions")
+    plan = result.harvest_plan()
+    return {
+        "status": "success",
+        "summary": result.summary(),
+        "realized": to_csv(REALIZED_COLUMNS, result.realized()),
+        "tax_by_fy": to_csv(FY_TAX_COLUMNS, result.fy_taxes()),
+        "open_positions": to_csv(OPEN_COLUMNS, result.open_positions()),
+        "harvest_plan": {
+            "sales": to_csv(HARVEST_COLUMNS, plan["sales"]),
+            "tax_free_gain": plan["tax_free_gain"],
+        },
+        "loss_harvest": to_csv(LOSS_COLUMNS, result.loss_candidates()),
+    }
+
+
+def estimate_sale_tax(isins: list[str], quantities: list[float], tool_context: ToolContext) -> dict:
+    """Estimate the capital gains and extra tax this financial year if the user sold some holdings today.
+
+    Args:
+        isins: ISINs of the mutual funds or stocks to sell.
+        quantities: Units (or shares) to sell of each ISIN, in the same order; oldest units are sold first.
+
+    Returns:
+        "sales": CSV of the units actually sold (capped at the holding) with proceeds and short- and
+        long-term gains, "tax_before" / "tax_after" / "extra_tax" for this financial year, the equity
+        LTCG exemption left afterwards, and "isins_not_held". Call it once per strategy to compare them.
+    """
+    if len(isins) != len(quantities):
+        return {"status": "error", "error_message": "isins and quantities must have the same length."}
+    result = _capital_gains(tool_context.state)
+    if result is None:
+        return _missing("fetch_mf_transactions / fetch_stock_transactions")
+    what_if = result.what_if(isins, quantities)
+    what_if["sales"] = to_csv(WHAT_IF_COLUMNS, what_if["sales"])
+    return {"status": "success", **what_if}
+
+
+def project_goal(
+    target_amount: float,
+    years: int,
+    tool_context: ToolContext,
+    monthly_contribution: Optional[float] = None,
+    annual_step_up_pct: float = 0.0,
+    expected_return_pct: Optional[float] = None,
+    volatility_pct: Optional[float] = None,
+    inflation_pct: float = 6.0,
+    current_amount: Optional[float] = None,
+    include_retirement_accounts: bool = False,
+) -> dict:
+    """Monte Carlo projection (100,000 paths, monthly steps) of the user's investments towards a goal.
+
+    Args:
+        target_amount: Goal amount in today's rupees (it is inflated to the horizon).
+        years: Horizon in years.
+        monthly_contribution: Monthly investment; default = mutual fund purchases over the last
+            12 months / 12, or recurring investment debits in the bank account.
+        annual_step_up_pct: Yearly increase of the monthly contribution, in percent.
+        expected_return_pct: Annual portfolio return; default from the current allocation
+            (equity 12%, debt 7%, gold 8%, cash 4%).
+        volatility_pct: Annual portfolio volatility; default from the current allocation.
+        inflation_pct: Annual inflation, in percent.
+        current_amount: Starting amount; default = current assets in fetch_net_worth.
+        include_retirement_accounts: Count EPF and NPS in the starting amount (for retirement goals).
+
+    Returns:
+        "success_probability" (share of paths at or above the target at the horizon),
+        "time_to_goal" (share of paths that ever reach it and percentiles of the years needed),
+        "final" (mean and percentiles of the final amount), "paths" (CSV of yearly percentiles and
+        the share of paths that reached the target by then) and the "inputs" used.
+        All amounts are in today's rupees. An error status for a negative horizon or a
+        return or inflation of -100% or less.
+    """
+    state = tool_context.state
+    try:
+        projection = goal_projection(
+            get_payload(state, "fetch_net_worth"), get_payload(state, "fetch_mf_transactions"),
+            get_payload(state, "fetch_bank_transactions"), target_amount, years,
+            monthly=monthly_contribution, step_up=annual_step_up_pct / 100,
+            mean=None if expected_return_pct is None else expected_return_pct / 100,
+            volatility=None if volatility_pct is None else volatility_pct / 100,
+            inflation=inflation_pct / 100, initial=current_amount, include_retirement=include_retirement_accounts,
+        )
+    except ValueError as error:
+        return {"status": "error", "error_message": str(error)}
+    return {
+        "status": "success",
+        "success_probability": projection.success_probability,
+        "time_to_goal": projection.time_to_goal,
+        "final": projection.final,
+        "paths": to_csv(PATH_COLUMNS, projection.paths),
+        "inputs": projection.inputs,
+    }
+
+
+def sweep_goal_scenarios(
+    target_amount: float,
+    years: int,
+    tool_context: ToolContext,
+    monthly_contributions: Optional[list[float]] = None,
+    step_up_pcts: Optional[list[float]] = None,
+    return_shifts_pct: Optional[list[float]] = None,
+    inflation_pcts: Optional[list[float]] = None,
+    horizons_years: Optional[list[int]] = None,
+    lump_sum_amounts: Optional[list[float]] = None,
+    lump_sum_year: int = 0,
+    full_grid: bool = False,
+    monthly_contribution: Optional[float] = None,
+    annual_step_up_pct: float = 0.0,
+    expected_return_pct: Optional[float] = None,
+    volatility_pct: Optional[float] = None,
+    inflation_pct: float = 6.0,
+    current_amount: Optional[float] = None,
+    include_retirement_accounts: bool = False,
+) -> dict:
+    """What-if analysis of a goal in one call: many variants of project_goal on the same simulated markets.
+
+    The base scenario takes the same inputs and defaults as project_goal; each list gives
+    alternative values to try. Use it instead of calling project_goal once per variant.
+
+    Args:
+        target_amount: Goal amount in today's rupees.
+        years: Base horizon in years.
+        monthly_contributions: Alternative monthly investments, in rupees.
+        step_up_pcts: Alternative yearly increases of the monthly investment, in percent.
+        return_shifts_pct: Changes to the expected annual return, in percentage points (e.g. [-2, 2]).
+        inflation_pcts: Alternative annual inflation rates, in percent.
+        horizons_years: Alternative horizons, in years.
+        lump_sum_amounts: Alternative one-off amounts invested (negative = withdrawn) in `lump_sum_year`.
+        lump_sum_year: Year of the lump sum: 0 = today, n = end of year n.
+        full_grid: Evaluate every combination of the alternatives instead of changing one at a time.
+        monthly_contribution, annual_step_up_pct, expected_return_pct, volatility_pct, inflation_pct,
+        current_amount, include_retirement_accounts: Base scenario, as in project_goal.
+
+    Returns:
+        "base" (the base scenario and its results), "tornado" (CSV per swept parameter of the success
+        probability at its lowest and highest value, largest swing first), "scenarios" (CSV of every
+        scenario evaluated with the parameters it changed, success probability, p10/p50/p90 of the
+        final amount in today's rupees and the median years to reach the goal, at year ends; lump
+        sums are written amount@year) and the "inputs" used.
+    """
+    state = tool_context.state
+    alternatives = {
+        name: values for name, values in (
+            ("monthly_contribution", monthly_contributions),
+            ("annual_step_up_pct", step_up_pcts),
+            ("expected_return_pct", return_shifts_pct),
+            ("inflation_pct", inflation_pcts),
+            ("years", horizons_years),
+            ("lump_sums", [[(lump_sum_year, amount)] for amount in lump_sum_amounts or []]),
+        ) if values
+    }
+    try:
+        result = goal_sweep(
+            get_payload(state, "fetch_net_worth"), get_payload(state, "fetch_mf_transactions"),
+            get_payload(state, "fetch_bank_transactions"), target_amount, years, alternatives,
+            monthly=monthly_contribution, step_up=annual_step_up_pct / 100,
+            mean=None if expected_return_pct is None else expected_return_pct / 100,
+            volatility=None if volatility_pct is None else volatility_pct / 100,
+            inflation=inflation_pct / 100, initial=current_amount, include_retirement=include_retirement_accounts,
+            full_grid=full_grid,
+        )
+    except ValueError as error:
+        return {"status": "error", "error_message": str(error)}
+    return {
+        "status": "success",
+        "base": result.base,
+        "tornado": to_csv(TORNADO_COLUMNS, result.tornado),
+        "scenarios": to_csv(SCENARIO_COLUMNS, result.scenarios),
+        "inputs": result.inputs,
+    }
+
+
+def solve_goal_requirements(
+    goal_names: list[str],
+    target_amounts: list[float],
+    years: list[int],
+    tool_context: ToolContext,
+    solve_for: str = "monthly",
+    confidence_pct: float = 90.0,
+    current_amounts: Optional[list[float]] = None,
+    monthly_contributions: Optional[list[float]] = None,
+    annual_step_up_pct: float = 0.0,
+    expected_returns_pct: Optional[list[float]] = None,
+    volatilities_pct: Optional[list[float]] = None,
+    inflation_pct: float = 6.0,
+) -> dict:
+    """Solve one or many goals for the monthly SIP, lump sum today or yearly SIP step-up they need.
+
+    Args:
+        goal_names: Name of each goal; the other per-goal lists follow the same order.
+        target_amounts: Goal amounts in today's rupees (inflated to each horizon).
+        years: Horizon of each goal, in years.
+        solve_for: "monthly" (SIP needed), "lump_sum" (amount to invest today on top of
+            current_amounts) or "step_up" (yearly increase of monthly_contributions needed).
+        confidence_pct: Share of simulated markets in which the goal must be reached, in percent.
+        current_amounts: Amount already set aside for each goal (default 0). Split existing
+            investments between goals instead of counting them twice.
+        monthly_contributions: Monthly investment for each goal when solving for a lump sum or step-up.
+        annual_step_up_pct: Yearly increase of the monthly investment when solving for a monthly amount
+            or lump sum, in percent.
+        expected_returns_pct: Annual return of each goal's investments; default from the user's
+            current allocation. Use lower ones for short goals held in debt.
+        volatilities_pct: Annual volatility of each goal's investments; default from the allocation.
+        inflation_pct: Annual inflation applied to the targets, in percent.
+
+    Returns:
+        "goals": CSV per goal with the nominal target and "required" (at the expected return every
+        year) and "required_at_confidence" (reached in confidence_pct of simulated markets; a
+        step-up is in percent, empty when above 50% a year), plus totals across goals for
+        monthly amounts and lump sums.
+    """
+    per_goal = {
+        "target_amounts": target_amounts, "years": years, "current_amounts": current_amounts,
+        "monthly_contributions": monthly_contributions, "expected_returns_pct": expected_returns_pct,
+        "volatilities_pct": volatilities_pct,
+    }
+    uneven = [name for name, values in per_goal.items() if values is not None and len(values) != len(goal_names)]
+    if uneven:
+        return {"status": "error", "error_message": f"{', '.join(uneven)} must have one value per goal."}
+    goals = [
+        Goal(
+            name, target_amounts[i], int(years[i]),
+            initial=current_amounts[i] if current_amounts else 0.0,
+            monthly=monthly_contributions[i] if monthly_contributions else 0.0,
+            step_up=annual_step_up_pct / 100,
+            mean=expected_returns_pct[i] / 100 if expected_returns_pct else None,
+            volatility=volatilities_pct[i] / 100 if volatilities_pct else None,
+        )
+        for i, name in enumerate(goal_names)
+    ]
+    state = tool_context.state
+    try:
+        rows = solve_user_goals(
+            get_payload(state, "fetch_net_worth"), get_payload(state, "fetch_mf_transactions"),
+            get_payload(state, "fetch_bank_transactions"), goals, solve_for, confidence_pct / 100,
+            inflation_pct / 100,
+        )
+    except ValueError as error:
+        return {"status": "error", "error_message": str(error)}
+    result = {"status": "success", "goals": to_csv(SOLUTION_COLUMNS, rows)}
+    if solve_for != "step_up":
+        result["total_required"] = round(sum(row[-2] or 0 for row in rows), 2)
+        result["total_required_at_confidence"] = round(sum(row[-1] or 0 for row in rows), 2)
+    return result
+
+
+def analyze_loans(
+    tool_context: ToolContext,
+    principals: Optional[list[float]] = None,
+    rates_pct: Optional[list[float]] = None,
+    tenures_months: Optional[list[int]] = None,
+    prepayment_amounts: Optional[list[float]] = None,
+    prepayment_months: Optional[list[int]] = None,
+    monthly_prepayment: float = 0.0,
+    new_rate_pct: Optional[float] = None,
+    rate_change_month: int = 13,
+    keep_emi: bool = True,
+    schedule_variant: int = 1,
+) -> dict:
+    """EMIs, amortization, prepayment and rate-change effects and affordability for loan variants.
+
+    With no variants it reports the user's existing loans and EMI headroom only.
+
+    Args:
+        principals: Loan amount of each variant (home loan, car loan, or an existing loan's outstanding).
+        rates_pct: Annual interest rate of each variant, in percent.
+        tenures_months: Tenure of each variant in months. A list of length one applies to all variants.
+        prepayment_amounts: One-off part-prepayments, applied to every variant.
+        prepayment_months: Loan month of each prepayment (1 = with the first EMI).
+        monthly_prepayment: Extra amount paid every month on top of the EMI.
+        new_rate_pct: Annual rate after a rate change (repo rate move, refinance), applied to every variant.
+        rate_change_month: Loan month from which new_rate_pct applies.
+        keep_emi: After a prepayment or rate change keep the EMI and change the tenure (lenders'
+            default); False keeps the tenure and changes the EMI.
+        schedule_variant: Variant (1-based) whose yearly schedule is returned.
+
+    Returns:
+        "existing_loans": CSV of open loans in the credit report with estimated EMI and months left,
+        "affordability": regular monthly income, existing EMIs, FOIR (EMIs / income) and the EMI
+        headroom under the lenders' limit, "variants": CSV per variant with EMI, total interest and
+        months to close, the same with the prepayments / rate change and the interest and months saved,
+        FOIR with the new EMI, whether it is affordable and the largest affordable principal, and
+        "schedule": yearly CSV (with the changes, if any) of the chosen variant.
+    """
+    state = tool_context.state
+    credit = get_payload(state, "fetch_credit_report")
+    afford = affordability(get_payload(state, "fetch_bank_transactions"), credit)
+    result = {"status": "success", "affordability": afford.summary()}
+    if credit:
+        result["existing_loans"] = to_csv(LOAN_COLUMNS, credit_report_loans(credit))
+    if not principals:
+        return result
+    count = len(principals)
+    lists = {"rates_pct": rates_pct or [], "tenures_months": tenures_months or []}
+    uneven = [name for name, values in lists.items() if len(values) not in (1, count)]
+    if uneven:
+        return {"status": "error", "error_message": f"{', '.join(uneven)} must have one value or one per principal."}
+    if len(prepayment_amounts or []) != len(prepayment_months or []):
+        return {"status": "error", "error_message": "prepayment_amounts and prepayment_months must have the same length."}
+    invalid = [
+        message for message, bad in (
+            ("principals must be positive", min(principals) <= 0),
+            ("rates must not be negative", min(rates_pct) < 0 or (new_rate_pct is not None and new_rate_pct < 0)),
+            (f"tenures must be between 1 and {MAX_MONTHS} months",
+             not all(1 <= months <= MAX_MONTHS for months in tenures_months)),
+            ("prepayment and rate change months must be 1 or later",
+             min(prepayment_months or [1]) < 1 or rate_change_month < 1),
+            ("prepayments must not be negative", min(prepayment_amounts or [0]) < 0 or monthly_prepayment < 0),
+        ) if bad
+    ]
+    if invalid:
+        return {"status": "error", "error_message": "; ".join(invalid) + "."}
+    rates = [rate / 100 for rate in rates_pct] * (count if len(rates_pct) == 1 else 1)
+    tenures = [int(months) for months in tenures_months] * (count if len(tenures_months) == 1 else 1)
+    variants = [LoanVariant(float(principal), rate, months) for principal, rate, months in zip(principals, rates, tenures)]
+    prepayments = tuple(zip(prepayment_months or [], prepayment_amounts or []))
+    changed = bool(prepayments or monthly_prepayment or new_rate_pct is not None or not keep_emi)
+    changes = [
+        LoanVariant(
+            variant.principal, variant.rate, variant.months,
+            prepayments=prepayments + tuple((month, monthly_prepayment) for month in range(1, variant.months + 1)
+                                            if monthly_prepayment),
+            rate_changes=((rate_change_month, new_rate_pct / 100),) if new_rate_pct is not None else (),
+            keep_emi=keep_emi,
+        ) if changed else None
+        for variant in variants
+    ]
+    rows, schedules = compare_loans(variants, changes, afford)
+    chosen = min(max(schedule_variant, 1), count) - 1
+    result["variants"] = to_csv(VARIANT_COLUMNS, rows)
+    result["schedule"] = to_csv(SCHEDULE_COLUMNS, schedules.yearly(count + chosen if changed else chosen))
+    return result
+
+
+def analyze_epf(
+    tool_context: ToolContext,
+    monthly_basic_salary: Optional[float] = None,
+    age: Optional[float] = None,
+    retirement_ages: Optional[list[int]] = None,
+    vpf_pcts: Optional[list[float]] = None,
+    epf_rate_pct: float = EPF_RATE * 100,
+    salary_growth_pct: float = 7.0,
+) -> dict:
+    """EPF balances across all establishments, service tenure and gaps, and the projected corpus at retirement.
+
+    Args:
+        monthly_basic_salary: Current basic pay + DA; default 40% of the recurring salary credits
+            in the bank transactions.
+        age: Current age; default from the date of birth in the credit report.
+        retirement_ages: Retirement ages to project to (default 58).
+        vpf_pcts: Voluntary PF rates to compare, in percent of basic pay (default 0).
+        epf_rate_pct: EPF interest rate, in percent.
+        salary_growth_pct: Yearly growth of basic pay, in percent.
+
+    Returns:
+        "summary" (EPF balance with employee/employer shares, EPS pension balance, service years
+        across employers without double counting overlaps, total gap days, current employer and
+        whether the 10 years of service for an EPS pension are met), "establishments" and "gaps"
+        (CSV), and "projection" (CSV per retirement age and VPF rate of the corpus, in rupees at
+        retirement and in today's rupees, with employee and employer contributions and interest)
+        with the "projection_inputs" used.
+    """
+    state = tool_context.state
+    payload = get_payload(state, "fetch_epf_details")
+    if not payload:
+        return _missing("fetch_epf_details")
+    summary = epf_summary(payload)
+    result = {
+        "status": "success",
+        "summary": summary.summary(),
+        "establishments": to_csv(ESTABLISHMENT_COLUMNS, summary.rows()),
+        "gaps": to_csv(GAP_COLUMNS, summary.gaps()),
+    }
+    basic_source, age_source = "given", "given"
+    if monthly_basic_salary is None:
+        monthly_basic_salary, basic_source = estimated_basic(get_payload(state, "fetch_bank_transactions"))
+    if age is None:
+        age, age_source = current_age(get_payload(state, "fetch_credit_report")), "credit_report_date_of_birth"
+    if age is None:
+        result["projection"] = "Age unknown: pass age to project the corpus."
+        return result
+    result["projection"] = to_csv(PROJECTION_COLUMNS, retirement_projection(
+        summary, monthly_basic_salary, age, retirement_ages or [RETIREMENT_AGE],
+        [pct / 100 for pct in vpf_pcts or [0.0]], epf_rate_pct / 100, salary_growth_pct / 100,
+    ))
+    result["projection_inputs"] = {
+        "monthly_basic_salary": monthly_basic_salary, "basic_source": basic_source, "age": age,
+        "age_source": age_source, "epf_rate_pct": epf_rate_pct, "salary_growth_pct": salary_growth_pct,
+    }
+    return result
+
+
+def analyze_net_worth(tool_context: ToolContext, compare_to: Optional[str] = None) -> dict:
+    """Decompose the user's net worth: assets, liabilities, asset classes and ratios, and the change since before.
+
+    Args:
+        compare_to: as_of date (YYYY-MM-DD) of an earlier snapshot to compare with; default the
+            snapshot before the current one.
+
+    Returns:
+        "summary" (net worth, total assets and liabilities, the reported net worth and any
+        difference from the itemized sum, liquid and retirement assets, liquidity ratio = liquid
+        assets / net worth, debt-to-asset ratio, allocation % per asset class with mutual funds
+        split by their schemes' asset classes, and emergency_fund_months = liquid assets / median
+        monthly bank debits), "allocation" (CSV per asset type, liability and asset class with its
+        share of total assets), and "change" (CSV of every item before and after) when an earlier
+        snapshot is available, with "snapshots" listing the stored as_of dates.
+    """
+    state = tool_context.state
+    payload = get_payload(state, "fetch_net_worth")
+    if not payload or not payload.get("netWorthResponse"):
+        return _missing("fetch_net_worth")
+    snapshot = net_worth_snapshot(payload)
+    summary = snapshot.summary()
+    bank = get_payload(state, "fetch_bank_transactions")
+    debits = [row[2] for row in cash_flow(bank).totals[-12:]] if bank else []
+    summary["emergency_fund_months"] = (
+        round(float(snapshot.liquid) / float(np.median(debits)), 1) if debits and np.median(debits) > 0 else None
+    )
+    result = {"status": "success", "summary": summary, "allocation": to_csv(ALLOCATION_COLUMNS, snapshot.rows())}
+
+    history = list(state.get(NET_WORTH_SNAPSHOTS_KEY) or [])
+    digest = recent_digest(payload)
+    if not history or history[-1]["digest"] != digest:
+        history.append({"as_of": str(np.datetime64("today", "D")), "digest": digest, "snapshot": snapshot.to_record()})
+        # Reassign rather than mutate so the change is recorded in the state delta
+        state[NET_WORTH_SNAPSHOTS_KEY] = history[-MAX_SNAPSHOTS:]
+    earlier = [entry for entry in history[:-1] if compare_to is None or entry["as_of"] == compare_to]
+    if earlier:
+        before = earlier[-1]
+        result["change"] = to_csv(DIFF_COLUMNS, diff_rows(NetWorthSnapshot.from_record(before["snapshot"]), snapshot))
+        result["compared_to"] = before["as_of"]
+    elif compare_to is not None:
+        result["note"] = f"No net worth snapshot from {compare_to}."
+    result["snapshots"] = [entry["as_of"] for entry in history[-MAX_SNAPSHOTS:]]
+    return result
+
+
+def analyze_portfolio_risk(tool_context: ToolContext, confidence_pct: float = 95.0, horizon_months: int = 1) -> dict:
+    """Risk of the user's mutual fund portfolio from the NAV history in their transactions.
+
+    Args:
+        confidence_pct: Confidence level of the value at risk, in percent.
+        horizon_months: Horizon of the value at risk, in months.
+
+    Returns:
+        "portfolio" (value, annual volatility %, diversification ratio, Herfindahl index and
+        effective number of schemes, largest weight, max drawdown % of the portfolio's monthly
+        history, and the parametric and historical value at risk and expected shortfall in
+        rupees of loss over the horizon), "schemes" (CSV per held scheme: weight, annual
+        volatility % and whether it comes from the NAV history or the asset-class assumption,
+        max drawdown %, and share of the portfolio risk), and "correlation" (CSV matrix by ISIN).
+        NAVs are only observed on transaction dates, so the figures are approximate; schemes and
+        pairs with little history use the asset-class assumptions.
+    """
+    state = tool_context.state
+    mf_payload = get_payload(state, "fetch_mf_transactions")
+    if not mf_payload:
+        return _missing("fetch_mf_transactions")
+    if not 0 < confidence_pct < 100:
+        return {"status": "error", "error_message": "confidence_pct must be between 0 and 100."}
+    result = portfolio_risk(mf_payload, get_payload(state, "fetch_net_worth"), confidence_pct / 100,
+                            max(int(horizon_months), 1))
+    if not result.schemes:
+        return {"status": "success", "portfolio": {}, "schemes": "", "note": "No mutual fund holdings."}
+    return {
+        "status": "success",
+        "portfolio": result.portfolio,
+        "schemes": to_csv(SCHEME_RISK_COLUMNS, result.schemes),
+        "correlation": to_csv(
+            ["isin", *result.isins],
+            [[isin, *(round(float(value), 2) for value in row)] for isin, row in zip(result.isins, result.correlation)],
+        ),
+    }
+
+
+def rebalance_portfolio(
+    tool_context: ToolContext,
+    risk_profile: str = "moderate",
+    target_allocation_pct: Optional[list[float]] = None,
+    band_pct: float = 5.0,
+    monthly_sip: Optional[float] = None,
+    horizon_months: int = 12,
+    lump_sum: float = 0.0,
+    min_ticket: float = MIN_TICKET,
+    include_retirement_accounts: bool = False,
+) -> dict:
+    """Cheapest trades and SIP redirections that bring the user's asset allocation within a band of a target.
+
+    Args:
+        risk_profile: "conservative" (equity 30 / debt 55 / gold 5 / cash 10), "moderate"
+            (55 / 30 / 10 / 5) or "aggressive" (75 / 15 / 5 / 5).
+        target_allocation_pct: Custom target instead of the profile: equity, debt, gold and cash
+            weights in percent, in that order.
+        band_pct: Allowed drift of each asset class from its target, in percentage points.
+        monthly_sip: Monthly investing to redirect; default = recurring investment debits in the
+            bank account, or mutual fund purchases over the last 12 months / 12.
+        horizon_months: Months of SIPs counted as new money (0 to rebalance with sales only).
+        lump_sum: Extra money to invest now.
+        min_ticket: Smallest purchase or redemption, in rupees.
+        include_retirement_accounts: Count EPF and NPS in the allocation (they are never sold).
+
+    Returns:
+        "summary" (current value, new money, sales, buys, money left in cash, this year's extra
+        capital gains tax of all the sales together, exit loads, number of trades, largest drift
+        from the target before and after, and whether every class ends within its band),
+        "allocation" (CSV per asset class: target and band, current, sold, bought and after amounts
+        and %, and the value that cannot be sold here), "trades" (CSV of sales, oldest units first,
+        with their tax on their own and exit load, and buys now with a suggested holding in the
+        class), "sip_split" (CSV of the monthly SIP per class) and "notes" on anything that could
+        not be fixed, including every class that ends outside its band. Sales respect ELSS lock-in,
+        exit loads, tax lots and the minimum ticket; new money is used before anything is sold.
+    """
+    state = tool_context.state
+    net_worth_payload = get_payload(state, "fetch_net_worth")
+    if not net_worth_payload:
+        return _missing("fetch_net_worth")
+    if target_allocation_pct is not None:
+        if len(target_allocation_pct) != 4 or min(target_allocation_pct) < 0 or sum(target_allocation_pct) <= 0:
+            return {"status": "error", "error_message": "target_allocation_pct needs 4 non-negative weights "
+                                                        "(equity, debt, gold, cash) with a positive sum."}
+        target = dict(zip(ASSET_CLASSES, target_allocation_pct))
+    elif risk_profile in TARGET_PROFILES:
+        target = TARGET_PROFILES[risk_profile]
+    else:
+        return {"status": "error", "error_message": f"risk_profile must be one of {', '.join(TARGET_PROFILES)}."}
+    if not 0 <= band_pct < 50:
+        return {"status": "error", "error_message": "band_pct must be between 0 and 50."}
+    mf_payload = get_payload(state, "fetch_mf_transactions")
+    sip_source = "given"
+    if monthly_sip is None:
+        monthly_sip, sip_source = monthly_contribution(mf_payload, get_payload(state, "fetch_bank_transactions"))
+    try:
+        result = rebalance(
+            net_worth_payload, mf_payload, get_payload(state, "fetch_stock_transactions"), target, band_pct / 100,
+            monthly_sip, max(int(horizon_months), 0), lump_sum, max(min_ticket, 1.0), include_retirement_accounts,
+        )
+    except ValueError as error:
+        return {"status": "error", "error_message": str(error)}
+    return {
+        "status": "success",
+        "summary": {**result.summary, "sip_source": sip_source},
+        "allocation": to_csv(CLASS_COLUMNS, result.classes),
+        "trades": to_csv(TRADE_COLUMNS, result.trades),
+        "sip_split": to_csv(SIP_COLUMNS, result.sips),
+        "notes": result.notes,
+    }
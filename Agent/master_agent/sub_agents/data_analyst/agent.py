@@ -5,6 +5,11 @@ from google.adk.tools.agent_tool import AgentTool
 
 from . import prompt
 from .market_research_agent import market_research_agent
+from ..analytics.tools import (
+    analyze_capital_gains, analyze_cash_flow, analyze_mf_returns, analyze_net_worth, analyze_portfolio_risk,
+    analyze_spending, analyze_stock_holdings, detect_suspicious_transactions,
+)
+from ..fetchData.state import load_financial_data
 
 MODEL = "gemini-2.5-pro"
 
@@ -14,6 +19,15 @@ data_analyst_agent = LlmAgent(
     description="Comprehensive financial data analyst that provides expert analysis across all financial domains with market research support when needed.",
     instruction=prompt.PROMPT,
     tools=[
+        load_financial_data,
+        analyze_mf_returns,
+        analyze_cash_flow,
+        analyze_spending,
+        analyze_stock_holdings,
+        analyze_capital_gains,
+        detect_suspicious_transactions,
+        analyze_net_worth,
+        analyze_portfolio_risk,
         AgentTool(agent=market_research_agent),
     ]
 )
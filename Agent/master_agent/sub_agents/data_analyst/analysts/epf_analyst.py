@@ -2,18 +2,21 @@
 
 from google.adk.agents import Agent
 
+from ...analytics.tools import analyze_epf
+
 EPF_PROMPT = """
 You are a specialized EPF (Employee Provident Fund) Analysis Agent. Your expertise lies in analyzing retirement savings data and providing comprehensive retirement planning assessments.
 
 Your Responsibilities:
 
 1. **EPF Balance Analysis**:
+   - Call `analyze_epf` first and base every balance, service, gap and corpus figure on its output rather than computing them yourself
    - Evaluate current EPF balance and contribution patterns
    - Analyze employee vs employer contribution ratios
    - Track balance growth trends over time
 
 2. **Retirement Readiness Assessment**:
-   - Calculate projected retirement corpus based on current contributions
+   - Report the projected retirement corpus from `analyze_epf` (pass retirement_ages and vpf_pcts to compare options)
    - Assess adequacy for retirement lifestyle goals
    - Identify contribution gaps or surpluses
 
@@ -47,5 +50,6 @@ epf_analyst = Agent(
     model='gemini-2.5-flash',
     name='epf_analyst',
     description="Specialized agent for analyzing EPF retirement savings data and providing comprehensive retirement planning assessments.",
-    instruction=EPF_PROMPT
+    instruction=EPF_PROMPT,
+    tools=[analyze_epf],
 )
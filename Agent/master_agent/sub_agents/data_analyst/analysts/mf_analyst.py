@@ -2,6 +2,8 @@
 
 from google.adk.agents import Agent
 
+from ...analytics.tools import analyze_portfolio_risk
+
 MF_PROMPT = """
 You are a specialized Mutual Fund Analysis Agent. Your expertise lies in analyzing mutual fund transactions and providing comprehensive investment performance assessments.
 
@@ -10,12 +12,13 @@ Your Responsibilities:
 1. **Portfolio Performance Analysis**:
    - Evaluate returns across different mutual fund schemes
    - Calculate CAGR, absolute returns, and risk-adjusted returns
+   - Call `analyze_portfolio_risk` for volatility, correlations, drawdowns and value at risk instead of estimating them yourself
    - Analyze performance vs standard benchmark indices
 
 2. **Asset Allocation Assessment**:
    - Review diversification across equity, debt, and hybrid funds
    - Assess sector and geographic allocation
-   - Identify concentration risks or gaps
+   - Identify concentration risks or gaps (Herfindahl index and risk contributions from `analyze_portfolio_risk`)
 
 3. **Investment Pattern Analysis**:
    - Analyze SIP vs lump sum investment patterns
@@ -52,5 +55,6 @@ mf_analyst = Agent(
     model='gemini-2.5-flash',
     name='mf_analyst',
     description="Specialized agent for analyzing mutual fund transactions and providing comprehensive investment performance assessments.",
-    instruction=MF_PROMPT
+    instruction=MF_PROMPT,
+    tools=[analyze_portfolio_risk],
 )
@@ -1,46 +1,45 @@
 """Agent to fetch the required data using various tools."""
 
 from google.adk.agents import Agent
-import requests
+from google.adk.tools import ToolContext
+
+from .state import fetch_into_state, fetch_plan_into_state
 
 # Tool definitions
-def fetch_net_worth() -> dict:
+def fetch_net_worth(tool_context: ToolContext) -> dict:
     """Fetch the user's net worth data."""
-    return _fetch_tool_data("fetch_net_worth")
+    return fetch_into_state(tool_context.state, "fetch_net_worth")
 
-def fetch_credit_report() -> dict:
+def fetch_credit_report(tool_context: ToolContext) -> dict:
     """Fetch the user's credit report."""
-    return _fetch_tool_data("fetch_credit_report")
+    return fetch_into_state(tool_context.state, "fetch_credit_report")
 
-def fetch_epf_details() -> dict:
+def fetch_epf_details(tool_context: ToolContext) -> dict:
     """Fetch the user's EPF details."""
-    return _fetch_tool_data("fetch_epf_details")
+    return fetch_into_state(tool_context.state, "fetch_epf_details")
 
-def fetch_mf_transactions() -> dict:
+def fetch_mf_transactions(tool_context: ToolContext) -> dict:
     """Fetch the user's mutual fund transactions."""
-    return _fetch_tool_data("fetch_mf_transactions")
+    return fetch_into_state(tool_context.state, "fetch_mf_transactions")
 
-def fetch_bank_transactions() -> dict:
+def fetch_bank_transactions(tool_context: ToolContext) -> dict:
     """Fetch the user's bank transactions."""
-    return _fetch_tool_data("fetch_bank_transactions")
+    return fetch_into_state(tool_context.state, "fetch_bank_transactions")
 
-def fetch_stock_transactions() -> dict:
+def fetch_stock_transactions(tool_context: ToolContext) -> dict:
     """Fetch the user's stock transactions."""
-    return _fetch_tool_data("fetch_stock_transactions")
-
-# Shared fetch function
-def _fetch_tool_data(tool_name: str) -> dict:
-    """Helper to call the localhost tool endpoint with a fixed session ID."""
-    try:
-        response = requests.get(
-            # f"http://localhost:8080/tool?sessionId=temp1&tool={tool_name}",
-            f"http://localhost:8080/tool?sessionId=temp1&tool={tool_name}",
-            timeout=5
-        )
-        response.raise_for_status()
-        return {"status": "success", "report": response.json()}
-    except requests.RequestException as e:
-        return {"status": "error", "error_message": str(e)}
+    return fetch_into_state(tool_context.state, "fetch_stock_transactions")
+
+def fetch_financial_data(tools: list[str], tool_context: ToolContext) -> dict:
+    """Fetch every tool in the chartered plan at once and store the data in session state.
+
+    Args:
+        tools: The tool names from the plan's "tools" list, e.g. ["fetch_net_worth", "fetch_bank_transactions"].
+
+    Returns:
+        Each tool's status, latency and the session-state key holding its data, under "results".
+    """
+    return fetch_plan_into_state(tool_context.state, tools)
 
 # Instruction prompt (assume you have it in prompt.py)
 from . import prompt
@@ -52,6 +51,7 @@ fetchData_agent = Agent(
     description="It is a data fetching agent. Its job is to fetch data using the tools provided based on the user's request.",
     instruction=prompt.PROMPT,
     tools=[
+        fetch_financial_data,
         fetch_net_worth,
         fetch_credit_report,
         fetch_epf_details,
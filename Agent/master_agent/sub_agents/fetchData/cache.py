@@ -0,0 +1,82 @@
+"""In-process TTL + LRU cache for fetched tool payloads."""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def payload_digest(payload) -> str:
+    """Stable content hash of a JSON payload, used to key work derived from it."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class TTLCache:
+    """Thread-safe cache keyed by (owner, tool_name) with expiry and LRU eviction.
+
+    For fetched payloads the owner is the Fi MCP session id (which maps to one
+    phone number); caches of derived data use the payload digest instead.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "expirations": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, owner: str, tool_name: str):
+        """Return the cached value, or None on a miss or an expired entry."""
+        key = (owner, tool_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._metrics["misses"] += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self._metrics["expirations"] += 1
+                self._metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._metrics["hits"] += 1
+            return value
+
+    def put(self, owner: str, tool_name: str, value) -> None:
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        key = (owner, tool_name)
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics["evictions"] += 1
+
+    def invalidate(self, owner: str = None, tool_name: str = None) -> int:
+        """Drop matching entries; with no arguments the whole cache is cleared.
+
+        Returns the number of entries removed.
+        """
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if (owner is None or key[0] == owner) and (tool_name is None or key[1] == tool_name)
+            ]
+            for key in keys:
+                del self._entries[key]
+            self._metrics["invalidations"] += len(keys)
+            return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._metrics["hits"] + self._metrics["misses"]
+            return dict(
+                self._metrics,
+                size=len(self._entries),
+                hit_rate=self._metrics["hits"] / lookups if lookups else 0.0,
+            )
@@ -0,0 +1,204 @@
+"""Typed columnar views over the positional `txns` arrays of the transaction payloads.
+
+Each loader turns one payload into NumPy columns (numbers as float64, dates as
+datetime64[D], enums as small ints and repeated strings as categorical codes), so
+the analytics engines can work vectorized instead of re-parsing JSON strings.
+Rows keep their order from the payload.
+"""
+
+from collections import deque
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+from .cache import TTLCache, payload_digest
+from .client import CACHE_TTL
+
+# Enum codes as documented in each payload's schemaDescription
+BANK_TXN_TYPES = {1: "CREDIT", 2: "DEBIT", 3: "OPENING", 4: "INTEREST", 5: "TDS", 6: "INSTALLMENT", 7: "CLOSING", 8: "OTHERS"}
+MF_ORDER_TYPES = {1: "BUY", 2: "SELL"}
+STOCK_TXN_TYPES = {1: "BUY", 2: "SELL", 3: "BONUS", 4: "SPLIT"}
+# Bank transaction types that move money into / out of the account (OPENING, CLOSING and OTHERS do neither)
+BANK_CREDIT_TYPES = (1, 4)
+BANK_DEBIT_TYPES = (2, 5, 6)
+
+
+def encode_categories(values) -> tuple:
+    """Map repeated strings to (categories, int32 codes) in first-seen order."""
+    index = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int32, count=len(values))
+    return list(index), codes
+
+
+class _Columns:
+    """Shared helpers for the column dataclasses."""
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the NumPy columns (category lists excluded)."""
+        return sum(getattr(self, f.name).nbytes for f in fields(self) if isinstance(getattr(self, f.name), np.ndarray))
+
+
+@dataclass
+class BankColumns(_Columns):
+    """`bankTransactions[].txns` rows: [amount, narration, date, type, mode, balance]."""
+
+    accounts: list  # bank name per account; one payload entry is one account
+    narrations: list
+    modes: list
+    account: np.ndarray  # int16 index into accounts
+    amount: np.ndarray  # float64
+    narration: np.ndarray  # int32 code into narrations
+    date: np.ndarray  # datetime64[D]
+    txn_type: np.ndarray  # int8, see BANK_TXN_TYPES
+    mode: np.ndarray  # int16 code into modes
+    balance: np.ndarray  # float64 currentBalance after the transaction
+
+
+@dataclass
+class MFColumns(_Columns):
+    """`mfTransactions[].txns` rows: [orderType, date, nav, units, amount]."""
+
+    isins: list
+    scheme_names: list
+    folios: list
+    scheme: np.ndarray  # int16 index into isins / scheme_names / folios
+    order_type: np.ndarray  # int8, see MF_ORDER_TYPES
+    date: np.ndarray  # datetime64[D]
+    nav: np.ndarray  # float64 purchase price per unit
+    units: np.ndarray  # float64
+    amount: np.ndarray  # float64
+
+
+@dataclass
+class StockColumns(_Columns):
+    """`stockTransactions[].txns` rows: [type, date, quantity, nav?]; a missing nav is NaN."""
+
+    isins: list
+    isin: np.ndarray  # int16 index into isins
+    txn_type: np.ndarray  # int8, see STOCK_TXN_TYPES
+    date: np.ndarray  # datetime64[D]
+    quantity: np.ndarray  # float64
+    nav: np.ndarray  # float64, NaN when absent
+
+
+def _rows(payload, list_key: str) -> tuple:
+    """Flatten the grouped txns into (group index per row, rows)."""
+    groups = (payload or {}).get(list_key) or []
+    group_index, rows = [], []
+    for i, group in enumerate(groups):
+        txns = group.get("txns") or []
+        group_index.extend([i] * len(txns))
+        rows.extend(txns)
+    return groups, np.asarray(group_index, dtype=np.int16), rows
+
+
+def _column(rows, position: int, dtype, default=None):
+    if default is None:
+        return np.array([row[position] for row in rows], dtype=dtype)
+    return np.array([row[position] if len(row) > position else default for row in rows], dtype=dtype)
+
+
+def bank_columns(payload) -> BankColumns:
+    groups, account, rows = _rows(payload, "bankTransactions")
+    narrations, narration = encode_categories([row[1] for row in rows])
+    modes, mode = encode_categories([row[4] for row in rows])
+    return BankColumns(
+        accounts=[group.get("bank", "") for group in groups],
+        narrations=narrations,
+        modes=modes,
+        account=account,
+        amount=_column(rows, 0, np.float64),
+        narration=narration,
+        date=_column(rows, 2, "datetime64[D]"),
+        txn_type=_column(rows, 3, np.int8),
+        mode=mode.astype(np.int16),
+        balance=_column(rows, 5, np.float64),
+    )
+
+
+def mf_columns(payload) -> MFColumns:
+    groups, scheme, rows = _rows(payload, "mfTransactions")
+    return MFColumns(
+        isins=[group.get("isin", "") for group in groups],
+        scheme_names=[group.get("schemeName", "").strip() for group in groups],
+        folios=[group.get("folioId", "") for group in groups],
+        scheme=scheme,
+        order_type=_column(rows, 0, np.int8),
+        date=_column(rows, 1, "datetime64[D]"),
+        nav=_column(rows, 2, np.float64),
+        units=_column(rows, 3, np.float64),
+        amount=_column(rows, 4, np.float64),
+    )
+
+
+def stock_columns(payload) -> StockColumns:
+    groups, isin, rows = _rows(payload, "stockTransactions")
+    return StockColumns(
+        isins=[group.get("isin", "") for group in groups],
+        isin=isin,
+        txn_type=_column(rows, 0, np.int8),
+        date=_column(rows, 1, "datetime64[D]"),
+        quantity=_column(rows, 2, np.float64),
+        nav=_column(rows, 3, np.float64, default=np.nan),
+    )
+
+
+LOADERS = {
+    "fetch_bank_transactions": bank_columns,
+    "fetch_mf_transactions": mf_columns,
+    "fetch_stock_transactions": stock_columns,
+}
+
+# Key of the stand-in payload stored for a streamed history (see streaming.streamed_bank_payload)
+STREAMED_KEY = "streamedColumns"
+
+# Built columns per payload content, so every engine in a turn shares one parse
+_columns_cache = TTLCache(CACHE_TTL, max_entries=64)
+# Digests of the last few payload objects seen; engines in one turn get the same object
+# from session state, so hashing a long history once is enough
+_recent_digests = deque(maxlen=8)
+
+
+def recent_digest(payload) -> str:
+    """payload_digest, remembered for the last few payload objects."""
+    for seen, digest in _recent_digests:
+        if seen is payload:
+            return digest
+    digest = payload_digest(payload)
+    _recent_digests.append((payload, digest))
+    return digest
+
+
+def register_streamed(key: str, tool_name: str, columns) -> None:
+    """Keep columns streamed from a large payload for load_columns to find under `key`."""
+    _columns_cache.put(key, tool_name, columns)
+
+
+def _streamed_columns(tool_name: str, stand_in: dict):
+    columns = _columns_cache.get(stand_in[STREAMED_KEY], tool_name)
+    if columns is None:
+        # Expired, or streamed by another process: stream the payload again.
+        # Imported here because streaming builds on this module.
+        from .streaming import restream_columns
+        columns = restream_columns(stand_in)
+        register_streamed(stand_in[STREAMED_KEY], tool_name, columns)
+    return columns
+
+
+def load_columns(tool_name: str, payload):
+    """Columnar view of a transaction payload, built once per distinct payload.
+
+    A stand-in for a streamed history (STREAMED_KEY) resolves to its streamed columns.
+    """
+    if isinstance(payload, dict) and STREAMED_KEY in payload:
+        return _streamed_columns(tool_name, payload)
+    digest = recent_digest(payload)
+    columns = _columns_cache.get(digest, tool_name)
+    if columns is None:
+        columns = LOADERS[tool_name](payload)
+        _columns_cache.put(digest, tool_name, columns)
+    return columns
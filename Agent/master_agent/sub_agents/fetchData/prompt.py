@@ -14,7 +14,9 @@ Your Required Workflow:
 
 Find the JSON plan from the recent conversation history.
 
-Execute all the tools listed in the \"tools\" array.
+Execute all the tools listed in the \"tools\" array with a SINGLE call to fetch_financial_data, passing the whole \"tools\" list as its `tools` argument. It fetches every tool in parallel and returns one merged result.
+
+Only fall back to the individual fetch_* tools to retry a tool listed under \"failed_tools\" in that result. Transient errors are already retried by the client, so retry each failed tool at most once, and never retry a tool whose result has \"circuit_open\": true (the data service is down for it; report it as unavailable instead).
 
 After all tools have been successfully executed, you MUST immediately call the transfer_to_agent function to return control to the master_agent.
 
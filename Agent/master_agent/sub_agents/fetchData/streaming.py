@@ -0,0 +1,234 @@
+"""Streaming ingestion of long `txns` histories without materialising the whole document.
+
+`iter_txn_rows` pulls text chunks from a response (or file), finds each group's
+label (e.g. "bank") and its `txns` array, and yields one decoded row at a time.
+Rows go either into `BankColumnsBuilder`, which converts them to NumPy columns
+every `chunk_rows` rows, or into `MonthlyBankAggregator`, whose memory depends
+only on the number of (account, month) pairs. MF and stock payloads are capped
+at 500 transactions by the server, so only bank histories need this path.
+
+ToolClient.fetch hands bank bodies above FI_STREAM_ABOVE_BYTES to
+`streamed_bank_payload`: the columns are built while the body arrives and
+session state keeps a small stand-in that `load_columns` resolves, so every
+engine reads the streamed columns without the full document ever being parsed.
+
+Run `python -m benchmarks.streaming [rows]` from the agent directory for a
+benchmark on a synthetic history (1M transactions by default).
+"""
+
+import codecs
+import hashlib
+import json
+import re
+
+import numpy as np
+
+from .backends import STREAM_CHUNK_BYTES
+from .client import get_client
+from .columnar import BANK_CREDIT_TYPES, BANK_DEBIT_TYPES, STREAMED_KEY, BankColumns, register_streamed
+
+_WHITESPACE = re.compile(r"[\s,]*")
+
+
+def iter_text_chunks(byte_chunks):
+    """Decode UTF-8 byte chunks incrementally (multi-byte characters may straddle chunks)."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_file_chunks(path, chunk_bytes: int = STREAM_CHUNK_BYTES):
+    with open(path, "rb") as f:
+        yield from iter_text_chunks(iter(lambda: f.read(chunk_bytes), b""))
+
+
+def iter_txn_rows(text_chunks, label_key: str = "bank"):
+    """Yield (group_index, label, row) for every row of every `txns` array in the stream.
+
+    Assumes each group's label key precedes its `txns` key, as in the Fi MCP payloads.
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(text_chunks)
+    label_token = f'"{label_key}":'
+    txns_token = '"txns":'
+    keep = max(len(label_token), len(txns_token))
+    buf, pos, exhausted = "", 0, False
+    group, label, in_txns = -1, None, False
+
+    def refill():
+        nonlocal buf, pos, exhausted
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            return False
+        buf, pos = buf[pos:] + chunk, 0
+        return True
+
+    while True:
+        if in_txns:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos >= len(buf):
+                if not refill():
+                    raise ValueError("stream ended inside a txns array")
+                continue
+            if buf[pos] == "]":
+                in_txns = False
+                pos += 1
+                continue
+            try:
+                row, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not refill():
+                    raise
+                continue
+            pos = end
+            yield group, label, row
+            continue
+
+        label_at = buf.find(label_token, pos)
+        txns_at = buf.find(txns_token, pos)
+        if label_at != -1 and (txns_at == -1 or label_at < txns_at):
+            start = _WHITESPACE.match(buf, label_at + len(label_token)).end()
+            try:
+                label, end = decoder.raw_decode(buf, start)
+            except json.JSONDecodeError:
+                if not refill():
+                    return
+                continue
+            pos = end
+        elif txns_at != -1:
+            start = _WHITESPACE.match(buf, txns_at + len(txns_token)).end()
+            if start >= len(buf):
+                if not refill():
+                    return
+                continue
+            group += 1
+            in_txns = True
+            pos = start + 1  # past "["
+        else:
+            # Keep a tail long enough to hold a token split across chunks
+            pos = max(pos, len(buf) - keep)
+            if not refill():
+                return
+
+
+class BankColumnsBuilder:
+    """Accumulates bank rows into NumPy column chunks of `chunk_rows` rows each."""
+
+    def __init__(self, chunk_rows: int = 65536):
+        self.chunk_rows = chunk_rows
+        self.accounts = []
+        self._narrations = {}
+        self._modes = {}
+        self._pending = []
+        self._chunks = {name: [] for name in ("account", "amount", "narration", "date", "txn_type", "mode", "balance")}
+
+    def add(self, group: int, label, row) -> None:
+        while len(self.accounts) <= group:
+            self.accounts.append(label or "")
+        self._pending.append((group, row))
+        if len(self._pending) >= self.chunk_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        rows = [row for _, row in self._pending]
+        narrations, modes = self._narrations, self._modes
+        self._chunks["account"].append(np.array([group for group, _ in self._pending], dtype=np.int16))
+        self._chunks["amount"].append(np.array([row[0] for row in rows], dtype=np.float64))
+        self._chunks["narration"].append(np.array([narrations.setdefault(row[1], len(narrations)) for row in rows], dtype=np.int32))
+        self._chunks["date"].append(np.array([row[2] for row in rows], dtype="datetime64[D]"))
+        self._chunks["txn_type"].append(np.array([row[3] for row in rows], dtype=np.int8))
+        self._chunks["mode"].append(np.array([modes.setdefault(row[4], len(modes)) for row in rows], dtype=np.int16))
+        self._chunks["balance"].append(np.array([row[5] for row in rows], dtype=np.float64))
+        self._pending = []
+
+    def build(self) -> BankColumns:
+        self._flush()
+        dtypes = {"account": np.int16, "amount": np.float64, "narration": np.int32, "date": "datetime64[D]",
+                  "txn_type": np.int8, "mode": np.int16, "balance": np.float64}
+        columns = {
+            name: np.concatenate(parts) if parts else np.array([], dtype=dtypes[name])
+            for name, parts in self._chunks.items()
+        }
+        return BankColumns(accounts=self.accounts, narrations=list(self._narrations), modes=list(self._modes), **columns)
+
+
+class MonthlyBankAggregator:
+    """Running per-(account, month) credit/debit totals; memory is independent of history length."""
+
+    def __init__(self):
+        self.accounts = []
+        self.totals = {}  # (account, "YYYY-MM") -> [credits, debits, count]
+        self.rows = 0
+
+    def add(self, group: int, label, row) -> None:
+        while len(self.accounts) <= group:
+            self.accounts.append(label or "")
+        entry = self.totals.setdefault((group, row[2][:7]), [0.0, 0.0, 0])
+        amount, txn_type = float(row[0]), row[3]
+        if txn_type in BANK_CREDIT_TYPES:
+            entry[0] += amount
+        elif txn_type in BANK_DEBIT_TYPES:
+            entry[1] += amount
+        entry[2] += 1
+        self.rows += 1
+
+    def table(self) -> list:
+        """Rows of [account, bank, month, credits, debits, txns] ordered by account and month."""
+        return [
+            [account, self.accounts[account], month, round(credits, 2), round(debits, 2), count]
+            for (account, month), (credits, debits, count) in sorted(self.totals.items())
+        ]
+
+
+def consume(text_chunks, sink, label_key: str = "bank"):
+    for group, label, row in iter_txn_rows(text_chunks, label_key):
+        sink.add(group, label, row)
+    return sink
+
+
+def stream_bank_columns(text_chunks) -> BankColumns:
+    return consume(text_chunks, BankColumnsBuilder()).build()
+
+
+def stream_bank_monthly(text_chunks) -> list:
+    return consume(text_chunks, MonthlyBankAggregator()).table()
+
+
+def streamed_bank_payload(session_id: str, byte_chunks) -> dict:
+    """Stream a large fetch_bank_transactions body into columns and return a small stand-in payload.
+
+    The columns are registered in the columnar cache under a hash of the raw body;
+    the stand-in is what gets cached and stored in session state, and
+    load_columns resolves it (streaming again if the columns have expired).
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    size = 0
+
+    def hashed():
+        nonlocal size
+        for chunk in byte_chunks:
+            hasher.update(chunk)
+            size += len(chunk)
+            yield chunk
+
+    columns = stream_bank_columns(iter_text_chunks(hashed()))
+    key = hasher.hexdigest()
+    register_streamed(key, "fetch_bank_transactions", columns)
+    return {
+        STREAMED_KEY: key, "tool": "fetch_bank_transactions", "sessionId": session_id, "rows": len(columns),
+        "accounts": columns.accounts, "bytes": size,
+    }
+
+
+def restream_columns(stand_in: dict) -> BankColumns:
+    """Columns of a stand-in from streamed_bank_payload, streamed again from the backend."""
+    chunks = get_client().stream(stand_in["tool"], stand_in["sessionId"])
+    return stream_bank_columns(iter_text_chunks(chunks))
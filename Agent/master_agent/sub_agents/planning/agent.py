@@ -5,6 +5,11 @@ from google.adk.tools.agent_tool import AgentTool
 
 from . import prompt
 from .planning_research_agent import planning_research_agent
+from ..analytics.tools import (
+    analyze_capital_gains, analyze_epf, analyze_loans, analyze_recurring_payments, estimate_sale_tax,
+    rebalance_portfolio, solve_goal_requirements,
+)
+from ..fetchData.state import load_financial_data
 
 MODEL = "gemini-2.5-flash"
 
@@ -14,6 +19,14 @@ planning_agent = LlmAgent(
     description="Financial Planning Agent that creates comprehensive, actionable financial plans by synthesizing data analysis and predictions with current market research to achieve specific financial goals.",
     instruction=prompt.PROMPT,
     tools=[
+        load_financial_data,
+        analyze_recurring_payments,
+        analyze_capital_gains,
+        estimate_sale_tax,
+        solve_goal_requirements,
+        analyze_loans,
+        analyze_epf,
+        rebalance_portfolio,
         AgentTool(agent=planning_research_agent),
     ]
 )
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The agent runs from this directory, so `sub_agents` is imported top-level
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,24 @@
+from datetime import date
+
+from sub_agents.analytics.capital_gains import capital_gains
+from sub_agents.analytics.stock_holdings import HOLDING_COLUMNS, SALE_COLUMNS, stock_holdings
+
+# The SELL is listed before the same-day BUY it closes
+SAME_DAY = {"stockTransactions": [
+    {"isin": "INE000A01010", "txns": [[2, "2024-05-10", 10, 110], [1, "2024-05-10", 10, 100]]},
+]}
+
+
+def test_same_day_sell_matches_the_buy():
+    result = stock_holdings(SAME_DAY)
+    holding = dict(zip(HOLDING_COLUMNS, result.holdings[0]))
+    sale = dict(zip(SALE_COLUMNS, result.sales[0]))
+    assert holding["quantity"] == 0
+    assert sale["cost"] == 1000
+    assert sale["realized_pnl"] == 100
+
+
+def test_same_day_sell_is_a_short_term_gain():
+    realized = capital_gains(None, SAME_DAY, as_of=date(2025, 1, 1)).realized()
+    fy, tax_class, sales, proceeds, cost, short_gain, long_gain, incomplete = realized[0]
+    assert (fy, sales, cost, short_gain, long_gain, incomplete) == ("FY2024-25", 1, 1000, 100, 0, 0)
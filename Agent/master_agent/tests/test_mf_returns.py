@@ -0,0 +1,28 @@
+import copy
+import json
+from datetime import date
+
+from sub_agents.analytics.mf_returns import SCHEME_COLUMNS, mf_returns
+from sub_agents.fetchData.backends import TEST_DATA_DIR
+
+AS_OF = date(2025, 6, 30)
+
+
+def _mf_payload(phone: str = "2222222222") -> dict:
+    with open(f"{TEST_DATA_DIR}/{phone}/fetch_mf_transactions.json") as f:
+        return json.load(f)
+
+
+def test_scheme_without_units_is_worth_nothing():
+    payload = _mf_payload()
+    with_empty = copy.deepcopy(payload)
+    schemes = with_empty["mfTransactions"]
+    schemes.append({**schemes[0], "isin": "INF000EMPTY1", "txns": []})
+
+    portfolio = mf_returns(payload, as_of=AS_OF).portfolio
+    result = mf_returns(with_empty, as_of=AS_OF)
+    for key in ("current_value", "absolute_return", "cagr_pct", "xirr_pct", "holding_days"):
+        assert result.portfolio[key] == portfolio[key] is not None
+    empty = dict(zip(SCHEME_COLUMNS, result.schemes[-1]))
+    assert empty["isin"] == "INF000EMPTY1"
+    assert empty["current_value"] == 0 and empty["holding_days"] is None
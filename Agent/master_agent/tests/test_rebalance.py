@@ -0,0 +1,42 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from sub_agents.analytics.rebalance import TARGET_PROFILES, _tickets, rebalance
+from sub_agents.fetchData.backends import TEST_DATA_DIR
+
+
+def _rebalance(phone: str, profile: str):
+    payloads = []
+    for tool in ("fetch_net_worth", "fetch_mf_transactions", "fetch_stock_transactions"):
+        path = f"{TEST_DATA_DIR}/{phone}/{tool}.json"
+        payloads.append(json.load(open(path)) if os.path.exists(path) else None)
+    return rebalance(*payloads, TARGET_PROFILES[profile])
+
+
+def test_tickets_remainder_stays_within_cap():
+    buys = _tickets(np.array([11812.5, 2362.5, 787.5, 787.5]), 1000.0, np.array([11812.5, 2362.5, 787.5, 787.5]))
+    assert buys.tolist() == [11812.5, 2362.5, 0.0, 0.0]
+
+
+@pytest.mark.parametrize("phone, profile", [("1212121212", "aggressive"), ("1414141414", "conservative")])
+def test_rounding_keeps_classes_within_band(phone, profile):
+    result = _rebalance(phone, profile)
+    for _, _, lower, upper, *_, after_pct, _ in result.classes:
+        assert lower <= after_pct <= upper
+    assert result.summary["within_band_after"] and not result.notes
+
+
+def test_class_outside_band_gets_a_note():
+    # 1313131313 holds gold that cannot be sold here, above the conservative band
+    result = _rebalance("1313131313", "conservative")
+    assert not result.summary["within_band_after"]
+    assert any(note.startswith("gold ends at") for note in result.notes)
+
+
+@pytest.mark.parametrize("amounts", [{"monthly_sip": -5000.0, "horizon_months": 12}, {"lump_sum": -1e9}])
+def test_negative_new_money_is_rejected(amounts):
+    with pytest.raises(ValueError):
+        rebalance(None, None, None, TARGET_PROFILES["moderate"], **amounts)
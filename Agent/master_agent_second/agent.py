@@ -22,7 +22,7 @@ master_agent = Agent(
     1.  **Initial Request:** If the last message is from the user, your first step is ALWAYS to call the `prompt_enhancer`.
     2.  **After Prompt Enhancer:** If the last message is the enhanced prompt from `prompt_enhancer`, your next step is ALWAYS to call the `chartered_agent` with that enhanced prompt.
     3.  **After Chartered Agent:** If the last message is a JSON plan from `chartered_agent`, your next step is to call the `fetchData_agent`. You must pass it BOTH the enhanced prompt and the JSON data_part list from the history.
-    4.  **After FetchData Agent:** If the last message is the raw data from `fetchData_agent`, analyze the enhanced prompt to determine the next step:
+    4.  **After FetchData Agent:** If the last message is the fetch summary from `fetchData_agent` (the fetched data itself is kept in session state for the downstream agents), analyze the enhanced prompt to determine the next step:
        - If the user is asking for FINANCIAL PLANNING, STRATEGIES, or ACTION PLANS (keywords: "create a plan", "strategy", "how to achieve", "plan for", "roadmap", "action plan"), call the `planning_agent`
        - If the user is asking for PREDICTIONS, FORECASTS, or FUTURE SCENARIOS (keywords: "will be", "by 2030", "when will", "can I afford", "predict", "forecast", "future"), call the `predictive_model_agent`
        - If the user is asking for CURRENT ANALYSIS, INSIGHTS, or DATA REVIEW (keywords: "analyze", "current", "performance", "breakdown", "insights"), call the `data_analyst_agent`
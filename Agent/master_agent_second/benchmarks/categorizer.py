@@ -0,0 +1,53 @@
+"""Throughput benchmark of the narration categorizer.
+
+Run `python -m benchmarks.categorizer` from the agent directory. "cold" is one
+uncached narration at a time; "list" goes through the LRU cache and "column"
+categorizes per distinct narration as the analytics engines do.
+"""
+
+import json
+import time
+
+import numpy as np
+
+from sub_agents.analytics.categorizer import Categorizer
+
+
+def benchmark(rows: int = 2_000_000, distinct: int = 50_000) -> dict:
+    """Throughput on `rows` narrations drawn from `distinct` variants of realistic narrations."""
+    templates = [
+        "UPI-SWIGGY-SWIGGY8@YBL-YESB0YBLUPI-{n}-PAYMENT FROM PHONE", "ACH D-NIPPONGOLDFUND-SIP/{n}/NGF",
+        "IMPS-{n}-RAKESH KUMAR-JULY RENT", "SALARY CREDIT - ACME CORP - {n}", "UPI-UBER INDIA SYSTEMS P-{n}",
+        "NWD-{n}-BANGALORE MET", "UPI-SANJAY AGRAWAL-SANJAY30AGRAWAL@OKICICI-{n}-TRANSFER",
+        "UPI-CRED-CRED@AXISB-UTIB0000114-{n}-CREDIT CARD BILL P", "BILLPAY-TATA POWER-ELECTRICITY BILL {n}",
+        "UPI-PINTU GUPTA-PAYTMQR{n}@PAYTM-PYTM0123456", "UNKNOWN REF {n}",
+    ]
+    rng = np.random.default_rng(11)
+    variants = [templates[i % len(templates)].format(n=100000000000 + i) for i in range(distinct)]
+    picks = rng.integers(0, distinct, rows)
+    narrations = [variants[i] for i in picks]
+
+    results = {"rows": rows, "distinct": distinct}
+    categorizer = Categorizer()
+    start = time.perf_counter()
+    categorizer.categorize_many(variants)
+    elapsed = time.perf_counter() - start
+    results["cold_distinct_per_sec"] = round(distinct / elapsed)
+
+    categorizer = Categorizer()
+    start = time.perf_counter()
+    categorizer.categorize_many(narrations)
+    elapsed = time.perf_counter() - start
+    results["list_per_sec"] = round(rows / elapsed)
+
+    categorizer = Categorizer()
+    start = time.perf_counter()
+    categorizer.categorize_codes(variants, picks)
+    elapsed = time.perf_counter() - start
+    results["column_per_sec"] = round(rows / elapsed)
+    results["cache"] = categorizer.cache_info()
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark(), indent=2))
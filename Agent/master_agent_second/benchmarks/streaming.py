@@ -0,0 +1,89 @@
+"""Benchmark of the streaming bank ingestion against parsing the whole document.
+
+Run `python -m benchmarks.streaming [rows]` from the agent directory (1M
+transactions by default). "tool_client_fetch_then_columns" is the production
+path: ToolClient.fetch streams bodies above FI_STREAM_ABOVE_BYTES and the
+engines get the columns through load_columns.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from sub_agents.fetchData.backends import STREAM_ABOVE_BYTES, LocalBackend
+from sub_agents.fetchData.client import ToolClient
+from sub_agents.fetchData.columnar import bank_columns, load_columns
+from sub_agents.fetchData.streaming import iter_file_chunks, stream_bank_columns, stream_bank_monthly
+
+PHONE = "9000000000"  # directory of the synthetic user; LocalBackend takes digit session ids as phone numbers
+
+
+def write_synthetic_history(path, rows: int, accounts: int = 4) -> None:
+    """Write a bank payload with `rows` transactions over `accounts` accounts, ~10 years and 30k narrations."""
+    rng = np.random.default_rng(7)
+    merchants = ["UPI-SWIGGY-SWIGGY8@YBL", "ACH D-NIPPONGOLDFUND-SIP", "IMPS-RAKESH KUMAR-JULY RENT",
+                 "NEFT-SALARY ACME CORP", "UPI-UBER INDIA SYSTEMS P", "ATM WDL-BANGALORE MET"]
+    modes = ["UPI", "ACH", "IMPS", "NEFT", "CARD_PAYMENT", "ATM"]
+    dates = np.datetime64("2015-01-01") + rng.integers(0, 3650, rows)
+    amounts = rng.integers(10, 100000, rows)
+    kinds = rng.integers(0, len(merchants), rows)
+    types = rng.choice([1, 2, 2, 2, 6], rows)
+    per_account = -(-rows // accounts)
+    with open(path, "w") as f:
+        f.write('{"schemaDescription":"synthetic","bankTransactions":[')
+        for account in range(accounts):
+            f.write(("," if account else "") + f'{{"bank":"Bank {account}","txns":[')
+            start, stop = account * per_account, min(rows, (account + 1) * per_account)
+            f.write(",".join(
+                f'["{amounts[i]}","{merchants[kinds[i]]}-{i % 5000}","{dates[i]}",{types[i]},"{modes[kinds[i]]}","{amounts[i] * 3}"]'
+                for i in range(start, stop)
+            ))
+            f.write("]}")
+        f.write("]}")
+
+
+def benchmark(rows: int = 1_000_000) -> dict:
+    """Compare json.load + columnar loading against both streaming paths on a synthetic file."""
+    results = {"rows": rows}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.mkdir(os.path.join(tmp, PHONE))
+        path = os.path.join(tmp, PHONE, "fetch_bank_transactions.json")
+        write_synthetic_history(path, rows)
+        results["file_mb"] = round(os.path.getsize(path) / 2**20, 1)
+
+        def measure(name, fn):
+            tracemalloc.start()
+            start = time.perf_counter()
+            out = fn()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[name] = {"seconds": round(elapsed, 2), "peak_mb": round(peak / 2**20, 1)}
+            return out
+
+        def full_document():
+            with open(path) as f:
+                return bank_columns(json.load(f))
+
+        full = measure("json_load_then_columns", full_document)
+        streamed = measure("stream_to_columns", lambda: stream_bank_columns(iter_file_chunks(path)))
+        monthly = measure("stream_to_monthly_aggregates", lambda: stream_bank_monthly(iter_file_chunks(path)))
+        client = ToolClient(backend=LocalBackend(tmp), cache_ttl=0)
+        fetched = measure(
+            "tool_client_fetch_then_columns",
+            lambda: load_columns("fetch_bank_transactions", client.fetch("fetch_bank_transactions", PHONE)["report"]),
+        )
+        results["streamed_above_mb"] = round(STREAM_ABOVE_BYTES / 2**20, 1)
+        assert len(full) == len(streamed) == len(fetched) == rows
+        assert np.allclose(full.amount, streamed.amount)
+        results["monthly_rows"] = len(monthly)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000), indent=2))
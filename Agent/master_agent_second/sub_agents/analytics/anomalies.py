@@ -0,0 +1,197 @@
+"""Streaming anomaly detector for bank transactions.
+
+One pass over the transactions in date order flags four kinds of outliers:
+
+- amount_outlier: a debit far above what the user usually spends in its category
+  (robust z-score: distance from the median of the recent amounts in units of
+  IQR / 1.349, which ignores the outliers themselves)
+- new_counterparty: a large debit to a counterparty never seen before
+- balance_drop: a single debit that takes most of the account's balance
+- duplicate_debit: the same amount to the same counterparty from the same account
+  again within DUPLICATE_WINDOW_DAYS
+
+All state is bounded: a sliding window of amounts per category, an LRU set of
+known counterparties, the last balance per account, the debits of the last few
+days and the most recent flags. A detector can therefore be kept and fed new
+transactions as they arrive, oldest first (`update`, or `add` for raw payload
+rows). The payloads and `fetchData.streaming.consume` list each account
+newest-first, so rows from them must be reordered before they are fed in.
+"""
+
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+
+from ..fetchData.columnar import BANK_DEBIT_TYPES, load_columns
+from .cash_flow import chronological_order
+from .categorizer import get_categorizer
+from .recurring import normalize_counterparty
+
+FLAG_COLUMNS = ["date", "account", "bank", "kind", "amount", "counterparty", "category", "score", "detail"]
+
+WINDOW = 100  # recent debit amounts kept per category
+MIN_HISTORY = 8  # amounts needed in a category before its outliers are flagged
+Z_THRESHOLD = 3.5
+MIN_AMOUNT = 1000.0  # smaller debits are never flagged as amount outliers
+NEW_COUNTERPARTY_MIN_AMOUNT = 10000.0
+WARMUP_DAYS = 30  # every counterparty is new at first; start flagging them after this much history
+BALANCE_DROP_RATIO = 0.5
+DUPLICATE_WINDOW_DAYS = 1
+MAX_COUNTERPARTIES = 50000
+MAX_RECENT_DEBITS = 10000  # duplicate-window entries kept when many debits share a few days
+MAX_FLAGS = 25
+
+
+@dataclass
+class _Window:
+    """Last WINDOW amounts of a category, in arrival order and sorted."""
+
+    recent: deque
+    ranked: list
+
+    def add(self, amount: float) -> None:
+        if len(self.recent) == self.recent.maxlen:
+            del self.ranked[bisect_left(self.ranked, self.recent[0])]
+        self.recent.append(amount)
+        insort(self.ranked, amount)
+
+    def score(self, amount: float):
+        """Robust z-score of `amount`, or None while the history is too short."""
+        ranked, n = self.ranked, len(self.ranked)
+        if n < MIN_HISTORY:
+            return None
+        median = (ranked[(n - 1) // 2] + ranked[n // 2]) / 2
+        spread = (ranked[(3 * n) // 4] - ranked[n // 4]) / 1.349
+        # Identical amounts (a fixed SIP) have no spread; still require a 5% deviation
+        spread = max(spread, 0.05 * abs(median), 1.0)
+        return (amount - median) / spread
+
+
+class AnomalyDetector:
+    """Bounded-memory detector; feed transactions oldest first with `update` or `add`."""
+
+    def __init__(self, max_flags: int = MAX_FLAGS, max_counterparties: int = MAX_COUNTERPARTIES):
+        self.categorizer = get_categorizer()
+        self.accounts = []
+        self.rows = 0
+        self.counts = Counter()  # flags per kind, including those no longer in `flags`
+        self._flags = deque(maxlen=max_flags)
+        self._windows = {}  # category code -> _Window
+        self._seen = OrderedDict()  # counterparty -> None, least recently seen first
+        self._max_counterparties = max_counterparties
+        self._balances = {}  # account -> last balance
+        self._recent = deque()  # (day, key) of debits within the duplicate window, oldest first
+        self._recent_keys = {}  # key -> occurrences in _recent
+        self._first_day = None
+        self._last_day = -1
+
+    def _flag(self, day, account, kind, amount, counterparty, category, score, detail) -> None:
+        self.counts[kind] += 1
+        self._flags.append([
+            str(np.datetime64(day, "D")), account, self.accounts[account], kind, round(amount, 2),
+            counterparty, self.categorizer.categories[category], round(score, 2), detail,
+        ])
+
+    def update(self, account: int, day: int, txn_type: int, amount: float, narration: str, balance: float) -> None:
+        """Process one transaction; `day` is days since 1970-01-01."""
+        self._observe(account, day, txn_type, amount, normalize_counterparty(narration),
+                      self.categorizer.code(narration), balance)
+
+    def _observe(self, account, day, txn_type, amount, counterparty, category, balance) -> None:
+        if account >= len(self.accounts):
+            self.accounts.extend([""] * (account + 1 - len(self.accounts)))
+        self.rows += 1
+        if self._first_day is None:
+            self._first_day = day
+        previous_balance = self._balances.get(account)
+        self._balances[account] = balance
+        seen = self._seen
+        known = counterparty in seen
+        if known:
+            seen.move_to_end(counterparty)
+        else:
+            seen[counterparty] = None
+            if len(seen) > self._max_counterparties:
+                seen.popitem(last=False)
+        if txn_type not in BANK_DEBIT_TYPES:
+            return
+
+        window = self._windows.get(category)
+        if window is None:
+            window = self._windows[category] = _Window(deque(maxlen=WINDOW), [])
+        z = window.score(amount)
+        window.add(amount)
+        if z is not None and z > Z_THRESHOLD and amount >= MIN_AMOUNT:
+            self._flag(day, account, "amount_outlier", amount, counterparty, category, z,
+                       f"{z:.1f} robust SDs above the usual {self.categorizer.categories[category]} debit")
+
+        if not known and amount >= NEW_COUNTERPARTY_MIN_AMOUNT and day - self._first_day >= WARMUP_DAYS:
+            self._flag(day, account, "new_counterparty", amount, counterparty, category,
+                       amount / NEW_COUNTERPARTY_MIN_AMOUNT, "first debit to this counterparty")
+
+        # A debit larger than the balance means the ledger has gaps (see cash_flow's reconciliation), not a drop
+        if previous_balance and BALANCE_DROP_RATIO * previous_balance <= amount <= previous_balance + 0.01:
+            ratio = amount / previous_balance
+            self._flag(day, account, "balance_drop", amount, counterparty, category, ratio,
+                       f"took {ratio * 100:.0f}% of the balance of {previous_balance:.2f}")
+
+        # Duplicates: expire debits older than the window (or beyond the size cap), then look this one up
+        recent, recent_keys = self._recent, self._recent_keys
+        if day > self._last_day:
+            self._last_day = day
+        while recent and (recent[0][0] < self._last_day - DUPLICATE_WINDOW_DAYS or len(recent) >= MAX_RECENT_DEBITS):
+            old = recent.popleft()[1]
+            if recent_keys[old] == 1:
+                del recent_keys[old]
+            else:
+                recent_keys[old] -= 1
+        key = (account, counterparty, round(amount, 2))
+        earlier = recent_keys.get(key, 0)
+        if earlier:
+            self._flag(day, account, "duplicate_debit", amount, counterparty, category, float(earlier),
+                       "same amount to the same counterparty within a day")
+        recent.append((day, key))
+        recent_keys[key] = earlier + 1
+
+    def add(self, group: int, label, row) -> None:
+        """Feed one raw `[amount, narration, date, type, mode, balance]` row; rows must arrive oldest first."""
+        if group >= len(self.accounts):
+            self.accounts.extend([""] * (group + 1 - len(self.accounts)))
+        if not self.accounts[group]:
+            self.accounts[group] = label or ""
+        day = date.fromisoformat(row[2]).toordinal() - _EPOCH
+        self.update(group, day, int(row[3]), float(row[0]), row[1], float(row[5]) if row[5] is not None else 0.0)
+
+    def flags(self) -> list:
+        """The most recent flags (FLAG_COLUMNS), newest first."""
+        return list(reversed(self._flags))
+
+
+_EPOCH = date(1970, 1, 1).toordinal()
+
+
+def detect_anomalies(payload, detector: AnomalyDetector = None) -> AnomalyDetector:
+    """Run a bank transactions payload through a detector, account by account in date order."""
+    detector = detector or AnomalyDetector()
+    cols = load_columns("fetch_bank_transactions", payload)
+    if not len(cols):
+        return detector
+    while len(detector.accounts) < len(cols.accounts):
+        detector.accounts.append(cols.accounts[len(detector.accounts)])
+    # Oldest first within each account, then merged across accounts by date
+    order = chronological_order(cols.account.astype(np.intp), cols.date)
+    order = order[np.argsort(cols.date[order], kind="stable")]
+    # Counterparty and category per distinct narration, looked up per row through the narration codes
+    parties = [normalize_counterparty(narration) for narration in cols.narrations]
+    categories = detector.categorizer.categorize_codes(cols.narrations, cols.narration)
+    observe = detector._observe
+    for account, day, txn_type, amount, narration, category, balance in zip(
+        cols.account[order].tolist(), cols.date[order].astype(np.int64).tolist(), cols.txn_type[order].tolist(),
+        cols.amount[order].tolist(), cols.narration[order].tolist(), categories[order].tolist(),
+        cols.balance[order].tolist(),
+    ):
+        observe(account, day, txn_type, amount, parties[narration], category, balance)
+    return detector
@@ -0,0 +1,150 @@
+"""Bank cash-flow engine: monthly totals, savings rate, per-mode breakdown and balance reconciliation.
+
+All grouping runs on combined integer keys (account x month, account x mode)
+with np.bincount, so the cost is linear in the number of transactions no matter
+how many banks or years a user has.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..fetchData.columnar import BANK_CREDIT_TYPES, BANK_DEBIT_TYPES, load_columns
+
+MONTHLY_COLUMNS = ["account", "bank", "month", "credits", "debits", "net", "savings_rate_pct", "closing_balance", "txns"]
+TOTAL_COLUMNS = ["month", "credits", "debits", "net", "savings_rate_pct", "txns"]
+MODE_COLUMNS = ["account", "bank", "mode", "credits", "debits", "credit_txns", "debit_txns"]
+RECONCILIATION_COLUMNS = [
+    "account", "bank", "first_date", "last_date", "opening_balance", "closing_balance", "net_flow",
+    "implied_closing", "unexplained", "rows_reconciled_pct", "breaks", "max_break",
+]
+
+# Balance differences below this are rounding, not a break in the ledger
+TOLERANCE = 0.01
+
+
+@dataclass
+class CashFlow:
+    monthly: list  # MONTHLY_COLUMNS, per account and month
+    totals: list  # TOTAL_COLUMNS, all accounts combined per month
+    by_mode: list  # MODE_COLUMNS
+    reconciliation: list  # RECONCILIATION_COLUMNS
+
+
+def _rate(net, credits):
+    return np.divide(net, credits, out=np.full(len(net), np.nan), where=credits > 0) * 100
+
+
+def _value(value, digits: int = 2):
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def chronological_order(account: np.ndarray, dates: np.ndarray) -> np.ndarray:
+    """Row order oldest-first within each account.
+
+    The Fi payloads list each account newest-first, so rows on the same date are
+    taken in reverse payload order; an account already listed oldest-first keeps
+    its order.
+    """
+    n = len(dates)
+    position = np.arange(n)
+    days = dates.astype(np.int64)
+    # Per account, compare the date of its first and last payload rows
+    first = np.full(account.max() + 1, n)
+    last = np.full(account.max() + 1, -1)
+    np.minimum.at(first, account, position)
+    np.maximum.at(last, account, position)
+    # Accounts without rows (empty txns lists) keep the sentinels and are masked out
+    newest_first = (last >= 0) & (days[first.clip(max=n - 1)] > days[last.clip(0)])
+    tie_break = np.where(newest_first[account], -position, position)
+    return np.lexsort((tie_break, days, account))
+
+
+def cash_flow(payload) -> CashFlow:
+    cols = load_columns("fetch_bank_transactions", payload)
+    if not len(cols):
+        return CashFlow([], [], [], [])
+
+    n_accounts = len(cols.accounts)
+    order = chronological_order(cols.account.astype(np.intp), cols.date)
+    account = cols.account.astype(np.intp)[order]
+    amount, txn_type, dates = cols.amount[order], cols.txn_type[order], cols.date[order]
+    balance, mode = cols.balance[order], cols.mode.astype(np.intp)[order]
+
+    credit = np.isin(txn_type, BANK_CREDIT_TYPES)
+    debit = np.isin(txn_type, BANK_DEBIT_TYPES)
+    signed = np.where(credit, amount, np.where(debit, -amount, 0.0))
+    credit_amount, debit_amount = np.where(credit, amount, 0.0), np.where(debit, amount, 0.0)
+
+    months, month = np.unique(dates.astype("datetime64[M]"), return_inverse=True)
+    n_months = len(months)
+
+    # Account x month
+    key = account * n_months + month
+    size = n_accounts * n_months
+    credits = np.bincount(key, weights=credit_amount, minlength=size)
+    debits = np.bincount(key, weights=debit_amount, minlength=size)
+    counts = np.bincount(key, minlength=size)
+    net = credits - debits
+    rate = _rate(net, credits)
+    # Rows are chronological, so the month's closing balance is on its last row
+    last = np.full(size, -1)
+    np.maximum.at(last, key, np.arange(len(key)))
+    closing = np.where(last >= 0, balance[last], np.nan)
+    monthly = [
+        [int(k // n_months), cols.accounts[k // n_months], str(months[k % n_months]), _value(credits[k]),
+         _value(debits[k]), _value(net[k]), _value(rate[k], 1), _value(closing[k]), int(counts[k])]
+        for k in np.flatnonzero(counts)
+    ]
+
+    # All accounts per month
+    all_credits = np.bincount(month, weights=credit_amount, minlength=n_months)
+    all_debits = np.bincount(month, weights=debit_amount, minlength=n_months)
+    all_counts = np.bincount(month, minlength=n_months)
+    all_rate = _rate(all_credits - all_debits, all_credits)
+    totals = [
+        [str(months[m]), _value(all_credits[m]), _value(all_debits[m]), _value(all_credits[m] - all_debits[m]),
+         _value(all_rate[m], 1), int(all_counts[m])]
+        for m in range(n_months)
+    ]
+
+    # Account x mode
+    n_modes = len(cols.modes)
+    key = account * n_modes + mode
+    size = n_accounts * n_modes
+    mode_credits = np.bincount(key, weights=credit_amount, minlength=size)
+    mode_debits = np.bincount(key, weights=debit_amount, minlength=size)
+    credit_counts = np.bincount(key, weights=credit, minlength=size).astype(np.int64)
+    debit_counts = np.bincount(key, weights=debit, minlength=size).astype(np.int64)
+    by_mode = [
+        [int(k // n_modes), cols.accounts[k // n_modes], cols.modes[k % n_modes], _value(mode_credits[k]),
+         _value(mode_debits[k]), int(credit_counts[k]), int(debit_counts[k])]
+        for k in np.flatnonzero(credit_counts + debit_counts)
+    ]
+
+    # Reconciliation: each balance should equal the previous one plus this row's signed amount
+    same_account = np.r_[False, account[1:] == account[:-1]]
+    expected = np.r_[np.nan, balance[:-1]] + signed
+    gap = np.where(same_account & np.isin(txn_type, BANK_CREDIT_TYPES + BANK_DEBIT_TYPES), np.abs(balance - expected), np.nan)
+    checked = ~np.isnan(gap)
+    broken = checked & (gap > TOLERANCE)
+    first_row = np.flatnonzero(~same_account)
+    last_row = np.r_[first_row[1:] - 1, len(account) - 1]
+    flow = np.bincount(account, weights=signed, minlength=n_accounts)
+    n_checked = np.bincount(account, weights=checked, minlength=n_accounts)
+    n_broken = np.bincount(account, weights=broken, minlength=n_accounts)
+    max_gap = np.zeros(n_accounts)
+    np.maximum.at(max_gap, account[broken], gap[broken])
+    reconciliation = []
+    for start, end in zip(first_row, last_row):
+        a = account[start]
+        opening = balance[start] - signed[start]
+        implied = opening + flow[a]
+        reconciliation.append([
+            int(a), cols.accounts[a], str(dates[start]), str(dates[end]), _value(opening), _value(balance[end]),
+            _value(flow[a]), _value(implied), _value(balance[end] - implied),
+            _value((1 - n_broken[a] / n_checked[a]) * 100 if n_checked[a] else np.nan, 1),
+            int(n_broken[a]), _value(max_gap[a]),
+        ])
+    return CashFlow(monthly, totals, by_mode, reconciliation)
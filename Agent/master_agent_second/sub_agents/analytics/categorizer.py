@@ -0,0 +1,230 @@
+"""Rule-based categorizer for bank transaction narrations.
+
+Long keywords are compiled into one prefix-tree regex and short ones into a
+token dict, so a narration is scanned once however many rules there are. When
+several categories match, the one listed first in the rules wins, also when
+their keywords overlap. Results are memoized in an LRU cache, and columns from
+the columnar store are categorized per distinct narration and then expanded
+with a NumPy index, so repeated narrations cost nothing.
+
+Keywords of five or more characters match anywhere in the narration (merchant
+handles are glued to other text, e.g. SWIGGY8@YBL); shorter ones, and any
+keyword written with a leading "=" (e.g. "=SHELL"), must be a whole
+alphanumeric token (RENT, but not CURRENT). Extra or overriding rules can be
+supplied as a JSON file ({"category": ["KEYWORD", ...]}) via FI_CATEGORY_RULES;
+they take precedence over the defaults.
+
+Uncached, a narration takes a few microseconds (roughly 170-180k distinct
+narrations per second); millions of rows per second come only from the cache
+and from categorizing a column per distinct narration. Run
+`python -m benchmarks.categorizer` from the agent directory to measure both.
+"""
+
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from ..fetchData.columnar import BANK_CREDIT_TYPES, BANK_DEBIT_TYPES, load_columns
+
+RULES_PATH = os.getenv("FI_CATEGORY_RULES", "")
+CACHE_SIZE = int(os.getenv("FI_CATEGORY_CACHE_SIZE", "65536"))
+UNCATEGORIZED = "other"
+
+# Ordered by priority: earlier categories win when a narration matches several
+DEFAULT_RULES = {
+    "salary": ["SALARY", "STIPEND", "PAYROLL"],
+    "interest": ["CREDIT INTEREST", "INTEREST CREDIT", "INT.PD", "INT PD"],
+    "credit_card": ["CREDIT CARD", "CARD PAYMENT", "CRED@", "CREDCLUB", "CREDCC", "DREAMPLUG", "PAYMENT ON CRED",
+                    "=SIMPL", "LAZYPAY", "LAZY PAY", "PAYTM POSTPAID"],
+    "investments": ["SIP", "LUMPSUM INV", "ZERODHA", "GROWW", "KUVERA", "SAFEGOLD", "SAFE GOLD", "GOLD ETF", "NPS",
+                    "MUTUA", "PAYTMMONEY", "RD INSTALLMENT", "FOR RD", "TD BOOKING", "TRANSFER TO FD"],
+    "loan_emi": ["EMI", "LOAN", "BAJAJFIN", "HOMEFIN"],
+    "rent": ["RENT"],
+    "insurance": ["INSURANCE", "LIC", "SUN LIF", "POLICY", "PREMIUM PAY"],
+    "food_delivery": ["SWIGGY", "ZOMATO", "DUNZO", "EATSURE"],
+    "groceries": ["GROCER", "BIGBASKET", "DMART", "BLINKIT", "ZEPTO", "RELIANCE FRESH", "DAILY NEEDS", "MINI MART",
+                  "SUPERMARKET", "FRUIT"],
+    "dining": ["HOTEL", "CAFE", "COFFEE", "STARBUCKS", "RESTAURANT", "KITCHEN", "DINING", "SAAPAAD"],
+    "fuel": ["PETROL", "FUEL", "INDIAN OIL", "HPCL", "BPCL", "=SHELL"],
+    "transport": ["UBER", "OLA", "OLACABS", "RAPIDO", "FASTAG", "METRO", "DMRC", "IRCTC", "REDBUS"],
+    "utilities": ["BROADBAND", "ELECTRICITY", "BBNL", "INTERNET", "AIRTEL", "RECHARGE", "JIO", "BILLDESK",
+                  "TATA POWER", "BESCOM", "WATER BILL", "GAS"],
+    "entertainment": ["NETFLIX", "SONYLIV", "HOTSTAR", "SPOTIFY", "FANCODE", "BOOKMYSHOW", "PRIME VIDEO"],
+    "shopping": ["AMAZON", "FLIPKART", "MYNTRA", "DECATHLON", "AJIO", "NYKAA"],
+    "health": ["MEDICAL", "PHARMA", "HOSPITAL", "DENTAL", "DENTIS", "CLINIC", "APOLLO"],
+    "education": ["SCHOOL", "TUITION", "COLLEGE", "UNIVERSITY", "COURSE"],
+    "cash": ["ATM", "CASH WDL", "NWD", "CASH DEPOSIT", "CDM"],
+    "wallet": ["WALLET", "EURONET"],
+    "bank_charges": ["CHG", "CHGS", "CHARGE", "MIN BAL"],
+    "merchant_upi": ["PAYTMQR", "BHARATPE", "MERCHANT"],
+    "transfers": ["IMPS", "NEFT", "RTGS", "P2P", "UPI", "CHQ"],
+}
+
+
+def load_rules(path: str = RULES_PATH) -> dict:
+    """Default rules, with the categories from a JSON rules file (if any) placed first."""
+    if not path:
+        return dict(DEFAULT_RULES)
+    with open(path) as f:
+        custom = json.load(f)
+    rules = {category: list(keywords) for category, keywords in custom.items()}
+    for category, keywords in DEFAULT_RULES.items():
+        rules.setdefault(category, list(keywords))
+    return rules
+
+
+_TOKEN = re.compile(r"[A-Z0-9]+")
+WHOLE_TOKEN = "="  # keyword prefix: match only as a whole token, whatever its length
+
+
+def _trie_pattern(words) -> str:
+    """Regex for a set of literals built as a prefix tree, so each position needs one branch lookup."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class Categorizer:
+    """Maps narrations to categories; see the module docstring for the matching rules.
+
+    Long keywords are found with one prefix-tree regex over the upper-cased
+    narration, short ones by looking up its alphanumeric tokens in a dict.
+    """
+
+    def __init__(self, rules: dict = None, cache_size: int = CACHE_SIZE):
+        rules = DEFAULT_RULES if rules is None else rules
+        self.categories = list(rules) + ([UNCATEGORIZED] if UNCATEGORIZED not in rules else [])
+        self._other = self.categories.index(UNCATEGORIZED)
+        self._long, self._short = {}, {}
+        for i, keywords in enumerate(rules.values()):
+            for keyword in keywords:
+                keyword = keyword.upper()
+                whole = keyword.startswith(WHOLE_TOKEN)
+                keyword = keyword.lstrip(WHOLE_TOKEN)
+                table = self._short if whole or len(keyword) < 5 else self._long
+                table.setdefault(keyword, i)  # a keyword listed twice keeps its higher priority
+        # The regex reports only the longest keyword starting at each position, so credit
+        # it with the best category among the keywords it starts with (a custom keyword
+        # can be a prefix of a default one)
+        self._long = {
+            keyword: min(code for other, code in self._long.items() if keyword.startswith(other))
+            for keyword in self._long
+        }
+        self._pattern = re.compile(_trie_pattern(self._long)) if self._long else None
+        self._code = lru_cache(maxsize=cache_size)(self._match)
+
+    def _match(self, narration: str) -> int:
+        text = narration.upper()
+        best = self._other
+        if self._short:
+            short = self._short
+            for token in _TOKEN.findall(text):
+                code = short.get(token)
+                if code is not None and code < best:
+                    best = code
+        if self._pattern is not None:
+            long, search = self._long, self._pattern.search
+            # Resume one character after each match rather than after its end, so an
+            # overlapping keyword is still seen (PAYTM POSTPAID in "PREMIUM PAYTM POSTPAID")
+            match = search(text)
+            while match is not None:
+                code = long[match.group()]
+                if code < best:
+                    best = code
+                match = search(text, match.start() + 1)
+        return best
+
+    def code(self, narration: str) -> int:
+        """Index into `categories` for one narration."""
+        return self._code(narration)
+
+    def categorize(self, narration: str) -> str:
+        return self.categories[self._code(narration)]
+
+    def categorize_many(self, narrations) -> list:
+        code, categories = self._code, self.categories
+        return [categories[code(narration)] for narration in narrations]
+
+    def categorize_codes(self, narrations: list, codes: np.ndarray) -> np.ndarray:
+        """Category code per row for a categorical column (distinct `narrations`, row `codes`)."""
+        code = self._code
+        lookup = np.fromiter((code(narration) for narration in narrations), dtype=np.int16, count=len(narrations))
+        return lookup[codes]
+
+    def cache_info(self) -> dict:
+        info = self._code.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
+
+
+_categorizer = None
+_categorizer_lock = threading.Lock()
+
+
+def get_categorizer() -> Categorizer:
+    """Process-wide categorizer built from DEFAULT_RULES plus FI_CATEGORY_RULES."""
+    global _categorizer
+    if _categorizer is None:
+        with _categorizer_lock:
+            if _categorizer is None:
+                _categorizer = Categorizer(load_rules())
+    return _categorizer
+
+
+CATEGORY_COLUMNS = ["category", "debits", "debit_txns", "share_of_debits_pct", "credits", "credit_txns"]
+MONTHLY_CATEGORY_COLUMNS = ["month", "category", "debits", "debit_txns"]
+
+
+def spending_breakdown(payload, categorizer: Categorizer = None) -> dict:
+    """Debits and credits per category, overall and per month, from a bank transactions payload."""
+    categorizer = categorizer or get_categorizer()
+    cols = load_columns("fetch_bank_transactions", payload)
+    if not len(cols):
+        return {"by_category": [], "monthly": [], "uncategorized_debits_pct": None}
+
+    category = categorizer.categorize_codes(cols.narrations, cols.narration).astype(np.intp)
+    n = len(categorizer.categories)
+    debit = np.isin(cols.txn_type, BANK_DEBIT_TYPES)
+    credit = np.isin(cols.txn_type, BANK_CREDIT_TYPES)
+    debits = np.bincount(category, weights=np.where(debit, cols.amount, 0.0), minlength=n)
+    credits = np.bincount(category, weights=np.where(credit, cols.amount, 0.0), minlength=n)
+    debit_counts = np.bincount(category, weights=debit, minlength=n).astype(np.int64)
+    credit_counts = np.bincount(category, weights=credit, minlength=n).astype(np.int64)
+    total = debits.sum()
+    share = debits / total * 100 if total else np.zeros(n)
+
+    by_category = [
+        [categorizer.categories[c], round(float(debits[c]), 2), int(debit_counts[c]), round(float(share[c]), 1),
+         round(float(credits[c]), 2), int(credit_counts[c])]
+        for c in np.argsort(-debits, kind="stable") if debit_counts[c] or credit_counts[c]
+    ]
+
+    months, month = np.unique(cols.date.astype("datetime64[M]"), return_inverse=True)
+    key = month * n + category
+    monthly_debits = np.bincount(key[debit], weights=cols.amount[debit], minlength=len(months) * n)
+    monthly_counts = np.bincount(key[debit], minlength=len(months) * n)
+    monthly = [
+        [str(months[k // n]), categorizer.categories[k % n], round(float(monthly_debits[k]), 2), int(monthly_counts[k])]
+        for k in np.flatnonzero(monthly_counts)
+    ]
+    return {
+        "by_category": by_category,
+        "monthly": monthly,
+        "uncategorized_debits_pct": round(float(share[categorizer.categories.index(UNCATEGORIZED)]), 1),
+    }
+
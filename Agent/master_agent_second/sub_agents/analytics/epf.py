@@ -0,0 +1,238 @@
+"""EPF engine: balances across establishments, service tenure and gaps, and the corpus at retirement.
+
+fetch_epf_details lists one entry per establishment (employer) under each UAN,
+with DD-MM-YYYY joining and exit dates ("NOT AVAILABLE" while still employed)
+and the employee and employer shares of the balance. Service is the union of
+the employment intervals, so overlapping spells are not counted twice, and the
+gaps are the breaks between the merged intervals.
+
+The projection follows the EPFO rules: the employee puts EMPLOYEE_RATE (plus
+any VPF) of basic pay into EPF, the employer puts 12% of which 8.33% of pay up
+to EPS_WAGE_CEILING goes to the pension scheme (EPS) and the rest to EPF.
+Interest is worked out monthly on the running balance and credited once a year,
+so contributions earn from the month after they are made. Every input is an
+array over scenarios (or users) and each year is a handful of vector operations.
+"""
+
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..fetchData.credit import credit_profiles
+from .recurring import recurring_payments
+
+EPF_RATE = float(os.getenv("FI_EPF_RATE", "0.0825"))  # declared rate for FY 2023-24
+EMPLOYEE_RATE = 0.12
+EMPLOYER_RATE = 0.12
+EPS_RATE = 0.0833
+EPS_WAGE_CEILING = 15000.0
+SALARY_GROWTH = 0.07
+RETIREMENT_AGE = 58
+EPS_MIN_SERVICE_YEARS = 10  # pension eligibility
+BASIC_SHARE = float(os.getenv("FI_BASIC_SHARE", "0.4"))  # basic pay / salary credited, when not given
+INFLATION = 0.06
+
+ESTABLISHMENT_COLUMNS = [
+    "establishment", "member_id", "office", "joined", "exited", "service_years", "employee_share", "employer_share",
+    "net_balance",
+]
+GAP_COLUMNS = ["from", "to", "days"]
+PROJECTION_COLUMNS = [
+    "vpf_pct", "retirement_age", "years", "corpus", "corpus_today", "employee_contributions",
+    "employer_contributions", "interest", "monthly_basic_at_retirement",
+]
+
+
+@dataclass
+class Establishment:
+    name: str
+    member_id: str
+    office: str
+    joined: np.datetime64
+    exited: np.datetime64  # NaT while employed
+    employee: float
+    employer: float
+    net: float
+
+
+@dataclass
+class EpfSummary:
+    establishments: list  # Establishment
+    pension_balance: float  # EPS, paid as pension rather than withdrawn
+    reported_balance: float  # overall current_pf_balance; 0 if not reported
+    as_of: np.datetime64
+
+    @property
+    def balance(self) -> float:
+        return sum((establishment.net for establishment in self.establishments), 0.0)
+
+    def intervals(self) -> list:
+        """Merged (start, end) employment intervals, oldest first."""
+        spans = sorted(
+            (establishment.joined, self.as_of if np.isnat(establishment.exited) else establishment.exited)
+            for establishment in self.establishments if not np.isnat(establishment.joined)
+        )
+        merged = []
+        for start, end in spans:
+            if merged and start <= merged[-1][1] + np.timedelta64(1, "D"):
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return [tuple(span) for span in merged]
+
+    @property
+    def service_days(self) -> int:
+        return sum(int((end - start).astype(int)) + 1 for start, end in self.intervals())
+
+    def gaps(self) -> list:
+        """GAP_COLUMNS per break between employment intervals."""
+        spans = self.intervals()
+        return [
+            [str(end + np.timedelta64(1, "D")), str(start - np.timedelta64(1, "D")), int((start - end).astype(int)) - 1]
+            for (_, end), (start, _) in zip(spans, spans[1:])
+        ]
+
+    def rows(self) -> list:
+        """ESTABLISHMENT_COLUMNS, oldest joining first."""
+        rows = []
+        for establishment in sorted(self.establishments, key=lambda e: str(e.joined)):
+            end = self.as_of if np.isnat(establishment.exited) else establishment.exited
+            years = "" if np.isnat(establishment.joined) else round(int((end - establishment.joined).astype(int)) / 365.25, 2)
+            rows.append([
+                establishment.name, establishment.member_id, establishment.office, str(establishment.joined),
+                "current" if np.isnat(establishment.exited) else str(establishment.exited), years,
+                round(establishment.employee, 2), round(establishment.employer, 2), round(establishment.net, 2),
+            ])
+        return rows
+
+    def summary(self) -> dict:
+        current = [e.name for e in self.establishments if np.isnat(e.exited) and not np.isnat(e.joined)]
+        service_years = self.service_days / 365.25
+        return {
+            "epf_balance": round(self.balance, 2),
+            "employee_share": round(sum((e.employee for e in self.establishments), 0.0), 2),
+            "employer_share": round(sum((e.employer for e in self.establishments), 0.0), 2),
+            "pension_balance": round(self.pension_balance, 2),
+            "reported_current_pf_balance": round(self.reported_balance, 2) if self.reported_balance else None,
+            "unexplained_difference": round(self.reported_balance - self.balance, 2) if self.reported_balance else None,
+            "establishments": len(self.establishments),
+            "current_establishment": current[0] if current else None,
+            "service_years": round(service_years, 2),
+            "gap_days": sum(gap[2] for gap in self.gaps()),
+            "eps_pension_service_met": service_years >= EPS_MIN_SERVICE_YEARS,
+            "as_of": str(self.as_of),
+        }
+
+
+def _amount(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _date(value) -> np.datetime64:
+    """DD-MM-YYYY to datetime64[D]; NaT for "NOT AVAILABLE" or anything unparsable."""
+    parts = (value or "").split("-")
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        return np.datetime64("NaT")
+    try:
+        return np.datetime64(f"{parts[2]}-{parts[1]:0>2}-{parts[0]:0>2}", "D")
+    except ValueError:
+        return np.datetime64("NaT")
+
+
+def _share(share: dict) -> float:
+    share = share or {}
+    return _amount(share.get("balance", share.get("credit")))
+
+
+def epf_summary(payload, as_of=None) -> EpfSummary:
+    """EpfSummary of a fetch_epf_details payload; ongoing service counts up to `as_of` (default today)."""
+    as_of = np.datetime64(as_of or "today", "D")
+    establishments, pension, reported = [], 0.0, 0.0
+    for account in (payload or {}).get("uanAccounts") or []:
+        details = account.get("rawDetails") or {}
+        for entry in details.get("est_details") or []:
+            balance = entry.get("pf_balance") or {}
+            employee, employer = _share(balance.get("employee_share")), _share(balance.get("employer_share"))
+            net = _amount(balance.get("net_balance")) if balance.get("net_balance") else employee + employer
+            establishments.append(Establishment(
+                entry.get("est_name", ""), entry.get("member_id", ""), entry.get("office", ""),
+                _date(entry.get("doj_epf")), _date(entry.get("doe_epf")), employee, employer, net,
+            ))
+        overall = details.get("overall_pf_balance") or {}
+        pension += _amount(overall.get("pension_balance"))
+        reported += _amount(overall.get("current_pf_balance"))
+    return EpfSummary(establishments, pension, reported, as_of)
+
+
+def project_corpus(balance, monthly_basic, years, vpf_rate=0.0, rate=EPF_RATE, salary_growth=SALARY_GROWTH,
+                   inflation=INFLATION) -> dict:
+    """EPF corpus after `years`; every argument broadcasts over scenarios.
+
+    Returns arrays: corpus, corpus_today (deflated by `inflation`), employee and
+    employer contributions, interest and the monthly basic pay in the last year.
+    """
+    balance, basic, years, vpf_rate, rate, growth, inflation = np.broadcast_arrays(
+        *(np.asarray(value, dtype=np.float64) for value in
+          (balance, monthly_basic, years, vpf_rate, rate, salary_growth, inflation))
+    )
+    corpus = balance.copy()
+    basic = basic.copy()
+    employee_total = np.zeros_like(corpus)
+    employer_total = np.zeros_like(corpus)
+    interest_total = np.zeros_like(corpus)
+    last_basic = basic.copy()
+    for year in range(int(np.ceil(years.max())) if years.size else 0):
+        months = np.clip(years - year, 0, 1) * 12  # the last year may be partial
+        employee = (EMPLOYEE_RATE + vpf_rate) * basic
+        employer = EMPLOYER_RATE * basic - EPS_RATE * np.minimum(basic, EPS_WAGE_CEILING)
+        monthly = employee + employer
+        # Month-end balances of the year: corpus + monthly * k; interest on the balances before each month
+        interest = rate / 12 * (months * corpus + monthly * months * (months - 1) / 2)
+        corpus += monthly * months + interest
+        employee_total += employee * months
+        employer_total += employer * months
+        interest_total += interest
+        last_basic = np.where(months > 0, basic, last_basic)
+        basic = basic * (1 + growth)
+    return {
+        "corpus": corpus, "corpus_today": corpus / (1 + inflation) ** years,
+        "employee_contributions": employee_total, "employer_contributions": employer_total,
+        "interest": interest_total, "monthly_basic_at_retirement": last_basic,
+    }
+
+
+def estimated_basic(bank_payload) -> tuple:
+    """(monthly basic pay, source) estimated as BASIC_SHARE of the confirmed recurring salary credits."""
+    if bank_payload:
+        salary = [
+            row[10] for row in recurring_payments(bank_payload).rows
+            if row[1] == "salary" and row[2] == "credit" and row[11] == "confirmed"
+        ]
+        if salary:
+            return round(sum(salary) * BASIC_SHARE, 2), f"{BASIC_SHARE:.0%}_of_recurring_salary_credits"
+    return 0.0, "none"
+
+
+def current_age(credit_payload):
+    """Age from the date of birth in the latest credit report, or None."""
+    profiles = credit_profiles(credit_payload)
+    return profiles[0].age if profiles else None
+
+
+def retirement_projection(summary: EpfSummary, monthly_basic: float, age: float, retirement_ages,
+                          vpf_rates, rate: float = EPF_RATE, salary_growth: float = SALARY_GROWTH,
+                          inflation: float = INFLATION) -> list:
+    """PROJECTION_COLUMNS for every combination of retirement age and VPF rate, in one vectorized run."""
+    ages, vpfs = np.meshgrid(np.asarray(retirement_ages, dtype=np.float64), np.asarray(vpf_rates, dtype=np.float64))
+    ages, vpfs = ages.ravel(), vpfs.ravel()
+    years = np.maximum(ages - age, 0)
+    result = project_corpus(summary.balance, monthly_basic, years, vpfs, rate, salary_growth, inflation)
+    return [
+        [round(float(vpfs[i]) * 100, 2), int(ages[i]), round(float(years[i]), 2),
+         *(round(float(result[name][i]), 2) for name in PROJECTION_COLUMNS[3:])]
+        for i in range(len(ages))
+    ]
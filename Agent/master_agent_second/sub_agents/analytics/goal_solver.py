@@ -0,0 +1,156 @@
+"""Goal solver: the monthly SIP, lump sum or yearly step-up needed to reach inflation-adjusted targets.
+
+The deterministic answer compounds at the expected return with closed-form
+annuity factors. The answer at a confidence level uses the simulations of
+monte_carlo.yearly_factors: on every path, wealth at the horizon is
+initial * P + monthly * B(step_up), where P is the growth of 1 rupee held to the
+horizon and B the value of 1 rupee a month stepped up once a year. Wealth is
+linear in the monthly amount and in the lump sum, so the amount reaching the
+target on a given share of paths is exactly that quantile of the per-path
+amounts, and a bisection over the simulated paths is only needed for the
+step-up rate, where B(step_up) is one matrix-vector product per step. Goals with
+the same return and volatility share one simulation (cached), so a batch of
+goals is solved in milliseconds once it is simulated.
+"""
+
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from .monte_carlo import DEFAULT_INFLATION, goal_inputs, percentiles, yearly_factors
+
+SOLVE_FOR = ("monthly", "lump_sum", "step_up")
+SOLVER_PATHS = int(os.getenv("FI_SOLVER_PATHS", "20000"))
+MAX_STEP_UP = 0.5  # step-ups above 50% a year are reported as out of reach
+SOLUTION_COLUMNS = [
+    "goal", "years", "target_today", "target_nominal", "current_amount", "monthly_contribution",
+    "annual_step_up_pct", "expected_return_pct", "volatility_pct", "required", "required_at_confidence",
+]
+
+
+@dataclass
+class Goal:
+    name: str
+    target: float  # today's rupees
+    years: int
+    initial: float = 0.0  # already set aside for the goal
+    monthly: float = 0.0  # invested at the end of every month (fixed when solving for a lump sum or step-up)
+    step_up: float = 0.0  # yearly increase of `monthly` (fixed when solving for a monthly amount or lump sum)
+    mean: float = None
+    volatility: float = None
+
+
+def _round(value, digits: int = 2):
+    return "" if value is None else round(float(value), digits)
+
+
+def annuity_factor(mean: float, step_up: float, years: int) -> float:
+    """Value after `years` of 1 rupee a month, stepped up by `step_up` once a year, at a constant return `mean`."""
+    if years <= 0:
+        return 0.0
+    monthly_rate = (1 + mean) ** (1 / 12) - 1
+    year_end = mean / monthly_rate if monthly_rate else 12.0  # one year of month-end rupees at the year end
+    if abs(mean - step_up) < 1e-12:
+        return year_end * years * (1 + mean) ** (years - 1)
+    return year_end * ((1 + mean) ** years - (1 + step_up) ** years) / (mean - step_up)
+
+
+def _bisect(fits, low: float = 0.0, high: float = MAX_STEP_UP, tolerance: float = 1e-5):
+    """Smallest x in [low, high] with fits(x), for fits monotone in x; None if fits(high) is false."""
+    if fits(low):
+        return low
+    if not fits(high):
+        return None
+    while high - low > tolerance:
+        middle = (low + high) / 2
+        low, high = (low, middle) if fits(middle) else (middle, high)
+    return high
+
+
+def deterministic(goal: Goal, solve_for: str, inflation: float = DEFAULT_INFLATION):
+    """Required monthly amount, lump sum today or step-up rate when every year returns `goal.mean`."""
+    target = goal.target * (1 + inflation) ** goal.years
+    shortfall = target - goal.initial * (1 + goal.mean) ** goal.years
+    if solve_for == "monthly":
+        return max(shortfall, 0.0) / annuity_factor(goal.mean, goal.step_up, goal.years) if goal.years else None
+    if solve_for == "lump_sum":
+        shortfall -= goal.monthly * annuity_factor(goal.mean, goal.step_up, goal.years)
+        return max(shortfall, 0.0) / (1 + goal.mean) ** goal.years
+    return _bisect(lambda step_up: goal.monthly * annuity_factor(goal.mean, step_up, goal.years) >= shortfall)
+
+
+def _path_factors(factors, years: int) -> tuple:
+    """Per path: value at `years` of 1 rupee today, and (years, paths) values of 1 rupee a month in each year."""
+    paths = factors.growth.shape[1]
+    held = np.cumprod(factors.growth[:years][::-1], axis=0, dtype=np.float32)[::-1]  # held[y]: start of y to end
+    today = held[0] if years else np.ones(paths, dtype=np.float32)
+    after = np.vstack([held[1:], np.ones((1, paths), dtype=np.float32)]) if years else held
+    return today, factors.annuity[:years] * after
+
+
+def at_confidence(goal: Goal, solve_for: str, confidence: float, factors,
+                  inflation: float = DEFAULT_INFLATION):
+    """Required monthly amount, lump sum or step-up that reaches the target on `confidence` of the paths."""
+    target = goal.target * (1 + inflation) ** goal.years
+    today, annuities = _path_factors(factors, goal.years)
+    steps = lambda step_up: (1 + step_up) ** np.arange(goal.years, dtype=np.float32)  # noqa: E731
+    if solve_for == "monthly":
+        if not goal.years:
+            return None
+        needed = (target - goal.initial * today) / (steps(goal.step_up) @ annuities)
+        return max(float(percentiles(needed, [confidence * 100])[0]), 0.0)
+    if solve_for == "lump_sum":
+        needed = (target - goal.monthly * (steps(goal.step_up) @ annuities)) / today - goal.initial
+        return max(float(percentiles(needed, [confidence * 100])[0]), 0.0)
+    shortfall = target - goal.initial * today
+    return _bisect(
+        lambda step_up: np.count_nonzero(goal.monthly * (steps(step_up) @ annuities) >= shortfall)
+        >= confidence * len(today)
+    )
+
+
+def solve_goals(goals: list, solve_for: str, confidence: float = 0.9, inflation: float = DEFAULT_INFLATION,
+                paths: int = SOLVER_PATHS, seed: int = 0) -> list:
+    """SOLUTION_COLUMNS row per goal; step-ups are in percent and "" means out of reach.
+
+    Raises ValueError for inputs outside their domain (e.g. a negative horizon).
+    """
+    if solve_for not in SOLVE_FOR:
+        raise ValueError(f"solve_for must be one of {', '.join(SOLVE_FOR)}")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    if inflation <= -1:
+        raise ValueError("inflation must be above -100%")
+    for goal in goals:
+        if goal.years < 0 or goal.target < 0:
+            raise ValueError(f"goal {goal.name}: years and target must not be negative")
+        if goal.mean <= -1 or goal.volatility < 0:
+            raise ValueError(f"goal {goal.name}: expected return must be above -100% and volatility not negative")
+    horizons = {}
+    for goal in goals:
+        key = (goal.mean, goal.volatility)
+        horizons[key] = max(horizons.get(key, 0), goal.years)
+    factors = {key: yearly_factors(*key, years, paths, seed) for key, years in horizons.items()}
+    scale = 100 if solve_for == "step_up" else 1
+    rows = []
+    for goal in goals:
+        required = deterministic(goal, solve_for, inflation)
+        probable = at_confidence(goal, solve_for, confidence, factors[goal.mean, goal.volatility], inflation)
+        rows.append([
+            goal.name, goal.years, _round(goal.target), _round(goal.target * (1 + inflation) ** goal.years),
+            _round(goal.initial), _round(goal.monthly), _round(goal.step_up * 100), _round(goal.mean * 100),
+            _round(goal.volatility * 100), _round(None if required is None else required * scale),
+            _round(None if probable is None else probable * scale),
+        ])
+    return rows
+
+
+def solve_user_goals(net_worth_payload, mf_payload, bank_payload, goals: list, solve_for: str,
+                     confidence: float = 0.9, inflation: float = DEFAULT_INFLATION) -> list:
+    """solve_goals() with the return and volatility of the user's allocation where a goal does not set them."""
+    inputs = goal_inputs(net_worth_payload, mf_payload, bank_payload, monthly=0.0)
+    for goal in goals:
+        goal.mean = inputs["mean"] if goal.mean is None else goal.mean
+        goal.volatility = inputs["volatility"] if goal.volatility is None else goal.volatility
+    return solve_goals(goals, solve_for, confidence, inflation)
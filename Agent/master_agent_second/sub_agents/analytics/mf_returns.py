@@ -0,0 +1,150 @@
+"""Mutual fund returns engine: per-scheme and portfolio XIRR, CAGR, absolute return and holding periods.
+
+Works on the columnar view of `mfTransactions` and values the units still held
+at the latest NAV from `fetch_net_worth`'s `mfSchemeAnalytics`. Every scheme is
+computed in the same NumPy pass; only the output rows are built in Python.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+
+from ..fetchData.columnar import load_columns
+from ..fetchData.compaction import money_to_float
+from .xirr import DAYS_PER_YEAR, xirr_by_group
+
+SCHEME_COLUMNS = [
+    "isin", "scheme", "asset_class", "units", "nav", "nav_source", "invested", "redeemed", "net_invested",
+    "current_value", "absolute_return", "absolute_return_pct", "cagr_pct", "xirr_pct", "first_buy", "holding_days",
+    "avg_holding_days",
+]
+
+
+@dataclass
+class MFReturns:
+    as_of: str
+    schemes: list  # one row per scheme, see SCHEME_COLUMNS
+    portfolio: dict
+
+
+def scheme_navs(net_worth) -> dict:
+    """isin -> (nav, asset_class) from mfSchemeAnalytics."""
+    analytics = ((net_worth or {}).get("mfSchemeAnalytics") or {}).get("schemeAnalytics") or []
+    navs = {}
+    for scheme in analytics:
+        detail = scheme.get("schemeDetail", {})
+        if detail.get("isinNumber") and detail.get("nav"):
+            navs[detail["isinNumber"]] = (money_to_float(detail["nav"]), detail.get("assetClass", ""))
+    return navs
+
+
+def _pct(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.full(len(numerator), np.nan), where=denominator > 0) * 100
+
+
+def _cagr(final, start, years):
+    """(final / start) ** (1 / years) - 1 in percent; NaN when either side is not positive."""
+    ok = (final > 0) & (start > 0) & (years > 0)
+    ratio = np.divide(final, start, out=np.ones(len(final)), where=ok)
+    exponent = np.divide(1.0, years, out=np.zeros(len(final)), where=ok)
+    return np.where(ok, (ratio ** exponent - 1) * 100, np.nan)
+
+
+def _round(value, digits: int = 2):
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def _days(value):
+    value = float(value)
+    return None if np.isnan(value) else int(round(value))
+
+
+def mf_returns(mf_payload, net_worth_payload=None, as_of: date = None) -> MFReturns:
+    """Compute returns for every scheme in the payload and for the portfolio as a whole.
+
+    Units held = units bought - units sold. They are valued at the mfSchemeAnalytics
+    NAV, falling back to the last transaction NAV when the scheme is not listed there.
+    CAGR compares redemptions + current value against total purchases over the time
+    since the first purchase; XIRR accounts for the timing of every flow.
+    """
+    as_of = np.datetime64(as_of or date.today(), "D")
+    cols = load_columns("fetch_mf_transactions", mf_payload)
+    n = len(cols.isins)
+    if not len(cols):
+        return MFReturns(str(as_of), [], {})
+
+    buy = cols.order_type == 1
+    sell = cols.order_type == 2
+    scheme = cols.scheme.astype(np.intp)
+    years = (as_of - cols.date).astype(np.float64) / DAYS_PER_YEAR
+
+    invested = np.bincount(scheme, weights=np.where(buy, cols.amount, 0.0), minlength=n)
+    redeemed = np.bincount(scheme, weights=np.where(sell, cols.amount, 0.0), minlength=n)
+    units = np.bincount(scheme, weights=np.where(buy, cols.units, np.where(sell, -cols.units, 0.0)), minlength=n)
+    units = np.where(np.abs(units) < 1e-9, 0.0, units)
+
+    # Last transaction NAV per scheme (rows are in payload order, so sort by date first)
+    order = np.lexsort((cols.date, scheme))
+    last_row = order[np.r_[np.flatnonzero(np.diff(scheme[order])), len(order) - 1]]
+    last_nav = np.full(n, np.nan)
+    last_nav[scheme[last_row]] = cols.nav[last_row]
+
+    navs = scheme_navs(net_worth_payload)
+    listed = np.array([isin in navs for isin in cols.isins])
+    nav = np.array([navs[isin][0] if isin in navs else last_nav[i] for i, isin in enumerate(cols.isins)])
+    # Schemes without units held (empty histories, or sales of units bought before the history) are worth nothing
+    current = np.where(units > 0, units * nav, 0.0)
+
+    first_buy = np.full(n, np.datetime64("NaT"), dtype="datetime64[D]")
+    buy_dates = np.where(buy, cols.date, np.datetime64("NaT"))
+    np.fmin.at(first_buy, scheme, buy_dates)
+    held_days = np.where(np.isnat(first_buy), np.nan, (as_of - first_buy).astype(np.float64))
+    weighted_days = np.bincount(scheme, weights=np.where(buy, cols.amount * years * DAYS_PER_YEAR, 0.0), minlength=n)
+    avg_days = np.divide(weighted_days, invested, out=np.full(n, np.nan), where=invested > 0)
+
+    flows = np.where(buy, -cols.amount, np.where(sell, cols.amount, 0.0))
+    xirr = xirr_by_group(scheme, flows, years, current)
+    absolute = current + redeemed - invested
+    absolute_pct = _pct(absolute, invested)
+    cagr = _cagr(current + redeemed, invested, held_days / DAYS_PER_YEAR)
+
+    # Portfolio: the same flows as a single series
+    total_current = float(current.sum())
+    total_invested, total_redeemed = float(invested.sum()), float(redeemed.sum())
+    portfolio_xirr = xirr_by_group(np.zeros(len(flows), dtype=np.intp), flows, years, np.array([total_current]))[0]
+    first = np.nanmin(first_buy) if np.isfinite(held_days).any() else np.datetime64("NaT")
+    portfolio_days = np.nan if np.isnat(first) else float((as_of - first).astype(np.float64))
+    totals = np.array([total_current + total_redeemed]), np.array([total_invested])
+
+    asset_classes = [navs[isin][1] if isin in navs else "" for isin in cols.isins]
+    rows = [
+        [
+            cols.isins[i], cols.scheme_names[i], asset_classes[i], _round(units[i], 4), _round(nav[i], 4),
+            "mfSchemeAnalytics" if listed[i] else "last_txn", _round(invested[i]), _round(redeemed[i]),
+            _round(invested[i] - redeemed[i]), _round(current[i]), _round(absolute[i]),
+            _round(absolute_pct[i]), _round(cagr[i]), _round(xirr[i] * 100),
+            "" if np.isnat(first_buy[i]) else str(first_buy[i]), _days(held_days[i]), _days(avg_days[i]),
+        ]
+        for i in range(n)
+    ]
+    by_class = {}
+    for i, asset_class in enumerate(asset_classes):
+        by_class[asset_class or "UNKNOWN"] = by_class.get(asset_class or "UNKNOWN", 0.0) + float(current[i])
+    portfolio = {
+        "schemes": n,
+        "invested": _round(total_invested),
+        "redeemed": _round(total_redeemed),
+        "net_invested": _round(total_invested - total_redeemed),
+        "current_value": _round(total_current),
+        "absolute_return": _round(total_current + total_redeemed - total_invested),
+        "absolute_return_pct": _round(_pct(totals[0] - totals[1], totals[1])[0]),
+        "cagr_pct": _round(_cagr(*totals, np.array([portfolio_days / DAYS_PER_YEAR]))[0]),
+        "xirr_pct": _round(portfolio_xirr * 100),
+        "first_buy": "" if np.isnat(first) else str(first),
+        "holding_days": _days(portfolio_days),
+        "current_value_by_asset_class": {key: _round(value) for key, value in by_class.items()},
+        "schemes_valued_at_last_txn_nav": [cols.isins[i] for i in range(n) if not listed[i]],
+    }
+    return MFReturns(str(as_of), rows, portfolio)
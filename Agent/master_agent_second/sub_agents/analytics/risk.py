@@ -0,0 +1,243 @@
+"""Portfolio risk engine: volatility, correlation, drawdown, concentration and VaR of the mutual fund holdings.
+
+NAV histories are approximate: every mfTransactions row gives a scheme's NAV on
+its date, and mfSchemeAnalytics adds the current NAV at the valuation date.
+Observations are irregular (SIP dates, occasional lump sums), so each scheme's
+volatility is the Brownian-motion estimate over consecutive observations,
+sum((r - mu*dt)^2 / dt) / n with dt in months, which stays unbiased across gaps.
+For correlations the observations are aligned on a month grid (last NAV of each
+month) and monthly log returns are taken where both month ends are observed;
+pairwise-complete covariances of all schemes come out of three matrix products
+over the return and mask matrices. Schemes or pairs with too little history
+fall back to the asset-class assumptions of the goal projection
+(monte_carlo.DEFAULT_VOLATILITY and CORRELATION, hybrids split by MF_CLASSES),
+and the correlation matrix is projected to the nearest positive semi-definite
+one before it is used. The portfolio's historical monthly returns weight the
+schemes observed each month by their current weights (months covering less
+than MIN_COVERAGE of the portfolio are skipped) and drive the drawdown and the
+historical VaR; the parametric VaR is normal with zero drift. VaRs are losses in
+rupees over the horizon (zero when the quantile is a gain), scaled from one
+month by the square root of the horizon.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from statistics import NormalDist
+
+import numpy as np
+
+from ..fetchData.columnar import load_columns
+from ..fetchData.net_worth import ASSET_CLASSES, MF_CLASSES
+from .mf_returns import mf_returns, scheme_navs
+from .monte_carlo import CORRELATION, DEFAULT_VOLATILITY
+
+DAYS_PER_MONTH = 365.25 / 12
+MIN_RETURNS = 3  # observed returns needed for a scheme's own volatility
+MIN_OVERLAP = 6  # common monthly returns needed for a pairwise correlation
+MIN_COVERAGE = 0.5  # share of the portfolio observed in a month for it to count in the history
+MIN_HISTORY = 12  # portfolio months needed for a historical VaR
+
+SCHEME_RISK_COLUMNS = [
+    "isin", "scheme", "asset_class", "value", "weight_pct", "volatility_pct", "volatility_source", "returns_used",
+    "max_drawdown_pct", "risk_contribution_pct",
+]
+
+
+@dataclass
+class PortfolioRisk:
+    schemes: list  # SCHEME_RISK_COLUMNS rows, largest weight first
+    isins: list  # order of the correlation matrix
+    correlation: np.ndarray  # (schemes, schemes), positive semi-definite
+    covariance: np.ndarray  # (schemes, schemes) annual
+    portfolio: dict
+
+
+def _class_weights(asset_classes: list) -> np.ndarray:
+    """(schemes, ASSET_CLASSES) exposure of each scheme; unknown classes count as equity."""
+    weights = np.zeros((len(asset_classes), len(ASSET_CLASSES)))
+    for i, asset_class in enumerate(asset_classes):
+        for name, share in MF_CLASSES.get(asset_class, {"equity": 1.0}).items():
+            weights[i, ASSET_CLASSES.index(name)] = share
+    return weights
+
+
+def nav_observations(mf_payload, net_worth_payload=None, as_of=None) -> tuple:
+    """(isins, names, scheme index, dates, log NAVs) sorted by scheme and date, one observation per scheme-day."""
+    as_of = np.datetime64(as_of or date.today(), "D")
+    cols = load_columns("fetch_mf_transactions", mf_payload)
+    isins, first, group = np.unique(np.array(cols.isins, dtype=object), return_index=True, return_inverse=True)
+    names = [cols.scheme_names[i] for i in first]
+    navs = scheme_navs(net_worth_payload)
+    listed = [i for i, isin in enumerate(isins) if isin in navs and navs[isin][0] > 0]
+    scheme = np.concatenate([group[cols.scheme.astype(np.intp)], np.array(listed, dtype=np.intp)])
+    dates = np.concatenate([cols.date, np.full(len(listed), as_of)])
+    nav = np.concatenate([cols.nav, np.array([navs[isins[i]][0] for i in listed], dtype=np.float64)])
+    keep = nav > 0
+    scheme, dates, nav = scheme[keep], dates[keep], nav[keep]
+    order = np.lexsort((dates, scheme))
+    scheme, dates, log_nav = scheme[order], dates[order], np.log(nav[order])
+    last = np.r_[(scheme[1:] != scheme[:-1]) | (dates[1:] != dates[:-1]), True]  # last row of each scheme-day
+    return list(isins), names, scheme[last], dates[last], log_nav[last]
+
+
+def irregular_volatility(scheme: np.ndarray, dates: np.ndarray, log_nav: np.ndarray, n: int) -> tuple:
+    """(annual volatility, returns used) per scheme from consecutive observations at any spacing."""
+    same = scheme[1:] == scheme[:-1]
+    owner = scheme[1:][same]
+    dt = (dates[1:] - dates[:-1]).astype(np.float64)[same] / DAYS_PER_MONTH
+    step = np.diff(log_nav)[same]
+    count = np.bincount(owner, minlength=n)
+    drift = np.divide(np.bincount(owner, step, n), np.bincount(owner, dt, n), out=np.zeros(n), where=count > 0)
+    squares = np.bincount(owner, (step - drift[owner] * dt) ** 2 / dt, n)
+    variance = np.divide(squares, count, out=np.full(n, np.nan), where=count >= MIN_RETURNS)
+    return np.sqrt(variance * 12), count
+
+
+def monthly_grid(scheme: np.ndarray, dates: np.ndarray, log_nav: np.ndarray, n: int) -> np.ndarray:
+    """(months, schemes) log NAV at the last observation of each month, NaN where unobserved."""
+    months = dates.astype("datetime64[M]")
+    start = months.min()
+    row = (months - start).astype(np.intp)
+    grid = np.full((row.max() + 1, n), np.nan)
+    last = np.r_[(scheme[1:] != scheme[:-1]) | (row[1:] != row[:-1]), True]
+    grid[row[last], scheme[last]] = log_nav[last]
+    return grid
+
+
+def pairwise_correlation(returns: np.ndarray) -> tuple:
+    """(correlation, overlap) over the months both schemes have a return; NaN where overlap < MIN_OVERLAP."""
+    observed = ~np.isnan(returns)
+    mask = observed.astype(np.float64)
+    values = np.where(observed, returns, 0.0)
+    overlap = mask.T @ mask
+    sums = values.T @ mask  # [i, j]: sum of i's returns over the months j is observed
+    squares = (values ** 2).T @ mask
+    products = values.T @ values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = products - sums * sums.T / overlap
+        variance = squares - sums ** 2 / overlap
+        correlation = covariance / np.sqrt(variance * variance.T)
+    correlation[(overlap < MIN_OVERLAP) | ~np.isfinite(correlation)] = np.nan
+    np.fill_diagonal(correlation, 1.0)
+    return np.clip(correlation, -1.0, 1.0), overlap
+
+
+def nearest_correlation(matrix: np.ndarray) -> np.ndarray:
+    """Clip negative eigenvalues and rescale to a unit diagonal."""
+    values, vectors = np.linalg.eigh((matrix + matrix.T) / 2)
+    fixed = (vectors * np.maximum(values, 1e-10)) @ vectors.T
+    scale = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(scale, scale)
+
+
+def drawdowns(grid: np.ndarray) -> np.ndarray:
+    """Max drawdown per column of a log-NAV grid, as a negative fraction (NaN without two observations)."""
+    rows = np.arange(len(grid))[:, None]
+    filled = np.where(~np.isnan(grid), rows, 0)
+    np.maximum.accumulate(filled, axis=0, out=filled)
+    levels = grid[filled, np.arange(grid.shape[1])]  # forward-filled
+    depth = np.fmin.reduce(levels - np.fmax.accumulate(levels, axis=0), axis=0)
+    return np.where(np.count_nonzero(~np.isnan(grid), axis=0) > 1, np.expm1(depth), np.nan)
+
+
+def _round(value, digits: int = 2):
+    return None if value is None or not np.isfinite(value) else round(float(value), digits)
+
+
+def portfolio_risk(mf_payload, net_worth_payload=None, confidence: float = 0.95, horizon_months: int = 1,
+                   as_of=None) -> PortfolioRisk:
+    """Risk of the mutual fund schemes currently held, weighted by current value."""
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    returns = mf_returns(mf_payload, net_worth_payload, as_of)
+    if not returns.schemes:
+        return PortfolioRisk([], [], np.zeros((0, 0)), np.zeros((0, 0)), {})
+    isins, names, scheme, dates, log_nav = nav_observations(mf_payload, net_worth_payload, returns.as_of)
+    n = len(isins)
+    values = np.zeros(n)
+    asset_classes = [""] * n
+    for row in returns.schemes:
+        i = isins.index(row[0])
+        values[i] += row[9] or 0.0
+        asset_classes[i] = asset_classes[i] or row[2]
+    held = np.flatnonzero(values > 0)
+    if not len(held):
+        return PortfolioRisk([], [], np.zeros((0, 0)), np.zeros((0, 0)), {})
+
+    # Per-scheme volatility, with the asset-class model where the history is too short
+    exposure = _class_weights(asset_classes)
+    class_covariance = np.outer(DEFAULT_VOLATILITY, DEFAULT_VOLATILITY) * CORRELATION
+    model_covariance = exposure @ class_covariance @ exposure.T
+    model_volatility = np.sqrt(np.diag(model_covariance))
+    volatility, used = irregular_volatility(scheme, dates, log_nav, n)
+    own = np.isfinite(volatility)
+    volatility = np.where(own, volatility, model_volatility)
+
+    grid = monthly_grid(scheme, dates, log_nav, n)
+    monthly = np.diff(grid, axis=0)
+    correlation, _ = pairwise_correlation(monthly)
+    model_correlation = model_covariance / np.outer(model_volatility, model_volatility)
+    modelled = np.isnan(correlation)
+    correlation = nearest_correlation(np.where(modelled, model_correlation, correlation)[np.ix_(held, held)])
+    covariance = correlation * np.outer(volatility[held], volatility[held])
+
+    weights = values[held] / values[held].sum()
+    total = float(values[held].sum())
+    portfolio_volatility = float(np.sqrt(weights @ covariance @ weights))
+    contribution = weights * (covariance @ weights) / portfolio_volatility ** 2 if portfolio_volatility > 0 else weights
+    scheme_drawdown = drawdowns(grid)
+
+    # Historical portfolio months: current weights over the schemes observed that month
+    simple = np.expm1(monthly[:, held])
+    observed = ~np.isnan(simple)
+    coverage = observed.astype(np.float64) @ weights
+    counted = coverage >= MIN_COVERAGE
+    history = (np.where(observed, simple, 0.0) @ weights)[counted] / coverage[counted]
+    z = NormalDist().inv_cdf(confidence)
+    scale = np.sqrt(horizon_months)
+    parametric = z * portfolio_volatility * np.sqrt(horizon_months / 12) * total
+    historical = shortfall = None
+    if len(history) >= MIN_HISTORY:
+        cutoff = np.quantile(history, 1 - confidence)
+        historical = max(-cutoff, 0.0) * scale * total
+        shortfall = max(-history[history <= cutoff].mean(), 0.0) * scale * total
+    index = np.log1p(history).cumsum()
+    portfolio_drawdown = float(np.expm1((index - np.maximum.accumulate(np.r_[0.0, index])[1:]).min())) if len(index) else None
+    hhi = float((weights ** 2).sum())
+
+    rows = [
+        [
+            isins[i], names[i], asset_classes[i], _round(values[i]), _round(weight * 100), _round(volatility[i] * 100),
+            "nav_history" if own[i] else "asset_class_assumption", int(used[i]), _round(scheme_drawdown[i] * 100),
+            _round(contribution[k] * 100),
+        ]
+        for k, (i, weight) in enumerate(zip(held, weights))
+    ]
+    rows.sort(key=lambda row: -row[3])
+    pairs = modelled[np.ix_(held, held)][np.triu_indices(len(held), 1)]
+    return PortfolioRisk(
+        schemes=rows,
+        isins=[isins[i] for i in held],
+        correlation=correlation,
+        covariance=covariance,
+        portfolio={
+            "as_of": returns.as_of,
+            "value": _round(total),
+            "schemes": len(held),
+            "volatility_pct": _round(portfolio_volatility * 100),
+            "diversification_ratio": _round(weights @ volatility[held] / portfolio_volatility, 3)
+            if portfolio_volatility > 0 else None,
+            "herfindahl_index": _round(hhi, 4),
+            "effective_schemes": _round(1 / hhi, 2),
+            "largest_weight_pct": _round(weights.max() * 100),
+            "max_drawdown_pct": _round(portfolio_drawdown * 100) if portfolio_drawdown is not None else None,
+            "history_months": int(len(history)),
+            "confidence_pct": _round(confidence * 100, 1),
+            "horizon_months": horizon_months,
+            "parametric_var": _round(parametric),
+            "historical_var": _round(historical),
+            "historical_expected_shortfall": _round(shortfall),
+            "correlations_from_asset_class": int(pairs.sum()),
+            "correlation_pairs": int(len(pairs)),
+        },
+    )
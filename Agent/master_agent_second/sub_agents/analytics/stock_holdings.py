@@ -0,0 +1,315 @@
+"""Stock holdings engine: FIFO lots, splits, bonuses, realized and unrealized P&L per ISIN.
+
+Lots are never materialized one by one. Quantities are expressed in "base
+units" (shares before any split of that ISIN), so a split only changes the
+factor between base and actual shares and keeps every open lot's cost. FIFO
+then becomes interval arithmetic: the n-th base unit acquired is the n-th one
+sold, so the cost of a sale is the difference of the cumulative-cost curve at
+the sale's start and end positions, read off with np.interp. All ISINs (and,
+with `stock_holdings_many`, all users) run in the same NumPy pass; only split
+rows and positions that were ever oversold are visited in Python loops.
+
+Row semantics (schemaDescription of fetch_stock_transactions):
+- BUY adds a lot at its nav; a BUY without nav has an unknown cost
+- SELL consumes the oldest lots first; a SELL without nav has unknown proceeds
+- BONUS adds a lot of free shares dated on the allotment
+- SPLIT credits `quantity` extra shares spread over the open lots in proportion
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..fetchData.columnar import load_columns
+from ..fetchData.compaction import money_to_float
+
+BUY, SELL, BONUS, SPLIT = 1, 2, 3, 4
+
+HOLDING_COLUMNS = [
+    "isin", "name", "quantity", "avg_cost", "invested", "unknown_cost_qty", "price", "price_source",
+    "current_value", "unrealized_pnl", "unrealized_pnl_pct", "realized_pnl", "sold_qty", "unknown_pnl_qty",
+    "first_buy", "oldest_open_lot", "reported_qty",
+]
+SALE_COLUMNS = [
+    "isin", "date", "quantity", "price", "proceeds", "cost", "realized_pnl", "unknown_cost_qty",
+    "first_lot_date", "last_lot_date",
+]
+
+
+@dataclass
+class StockHoldings:
+    holdings: list  # HOLDING_COLUMNS, one row per ISIN with transactions
+    sales: list  # SALE_COLUMNS, one row per SELL in date order
+    portfolio: dict
+
+
+def equity_prices(net_worth) -> dict:
+    """isin -> (last traded price, issuer name, units held) from the equity accounts in fetch_net_worth."""
+    accounts = (((net_worth or {}).get("accountDetailsBulkResponse") or {}).get("accountDetailsMap") or {}).values()
+    prices = {}
+    for account in accounts:
+        for holding in ((account.get("equitySummary") or {}).get("holdingsInfo") or []):
+            isin, ltp = holding.get("isin"), holding.get("lastTradedPrice")
+            if isin:
+                price = money_to_float(ltp) if ltp else np.nan
+                name = holding.get("issuerName", "")
+                units = prices[isin][2] + holding.get("units", 0) if isin in prices else holding.get("units", 0)
+                prices[isin] = (price, name, units)
+    return prices
+
+
+def _round(value, digits: int = 2):
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def _values(values: np.ndarray, digits: int = 2) -> list:
+    """Rounded column as a list, NaN as None (+ 0.0 turns -0.0 into 0.0)."""
+    return [None if value != value else value for value in (np.round(values, digits) + 0.0).tolist()]
+
+
+def _dates(values: np.ndarray) -> list:
+    return ["" if value == "NaT" else value for value in np.datetime_as_string(values, unit="D").tolist()]
+
+
+@dataclass
+class FifoLots:
+    """FIFO matching of all groups (ISINs) at once, as arrays over the rows in `order`.
+
+    Positions are on one global acquisition axis in base units: group g's lots occupy
+    [group_offset[g], group_total[g]) in date order, and sales consume them from the left.
+    """
+
+    order: np.ndarray  # row order used (group, date, payload position)
+    factor: np.ndarray  # actual shares per base unit after each row, per row
+    final_factor: np.ndarray  # per group
+    axis: np.ndarray  # 0, then the position after each lot
+    cost_curve: np.ndarray  # known cost of everything acquired up to each axis point
+    unknown_curve: np.ndarray  # base units with unknown cost up to each axis point
+    lot_group: np.ndarray
+    lot_dates: np.ndarray
+    group_offset: np.ndarray
+    group_total: np.ndarray
+    matched_end: np.ndarray  # per group, the position reached by all its sales
+    sale_rows: np.ndarray  # positions in `order` of the SELL rows
+    sale_start: np.ndarray
+    sale_end: np.ndarray
+    tolerance: float  # positions this close to a lot boundary are on it
+
+    def cost(self, start, end) -> np.ndarray:
+        """Known cost of the units between two positions."""
+        return np.interp(end, self.axis, self.cost_curve) - np.interp(start, self.axis, self.cost_curve)
+
+    def unknown(self, start, end) -> np.ndarray:
+        """Base units with unknown cost between two positions."""
+        return np.interp(end, self.axis, self.unknown_curve) - np.interp(start, self.axis, self.unknown_curve)
+
+    def lot_date(self, points, side: str) -> np.ndarray:
+        """Acquisition date of the lot right after ("right") or right before ("left") each position."""
+        if not len(self.lot_dates):
+            return np.full(len(points), np.datetime64("NaT"), dtype="datetime64[D]")
+        shift = self.tolerance if side == "right" else -self.tolerance
+        index = np.searchsorted(self.axis, points + shift, side=side) - 1
+        return self.lot_dates[np.clip(index, 0, len(self.lot_dates) - 1)]
+
+    def position_at(self, groups, dates) -> np.ndarray:
+        """Position after each group's last lot acquired on or before the given date."""
+        groups = np.asarray(groups, dtype=np.int64)
+        if not len(self.lot_dates):
+            return self.group_offset[groups]
+        # Lots are sorted by (group, date), so one key per lot orders them on a single line
+        days = self.lot_dates.astype(np.int64)
+        first, span = days.min(), int(days.max() - days.min()) + 2
+        keys = self.lot_group * span + (days - first)
+        day = np.clip(np.asarray(dates, dtype="datetime64[D]").astype(np.int64) - first, -1, span - 2)
+        index = np.searchsorted(keys, groups * span + day, side="right")
+        return np.maximum(self.axis[index], self.group_offset[groups])
+
+    @property
+    def held(self) -> np.ndarray:
+        """Base units still held, per group."""
+        return self.group_total - self.matched_end
+
+
+def fifo_lots(group, txn_type, dates, quantity, price, n_groups: int) -> FifoLots:
+    """Match SELL rows against BUY/BONUS lots (oldest first) after applying SPLIT rows, for all groups."""
+    n = len(group)
+    # Within a day, sales come after the day's acquisitions (a same-day SELL may be listed before its BUY)
+    order = np.lexsort((np.arange(n), txn_type == SELL, dates, group))
+    group, txn_type, dates = group[order], txn_type[order], dates[order]
+    quantity, price = quantity[order], price[order]
+    starts = np.searchsorted(group, np.arange(n_groups), side="left")
+    ends = np.searchsorted(group, np.arange(n_groups), side="right")
+
+    buy, sell, bonus, split = txn_type == BUY, txn_type == SELL, txn_type == BONUS, txn_type == SPLIT
+    signed = np.where(buy | bonus, quantity, np.where(sell, -quantity, 0.0))
+
+    # Split factors: a split of q extra shares on a holding of H shares multiplies every open lot by (H + q) / H
+    before = np.ones(n)  # actual shares per base unit in effect for each row
+    after = np.ones(n)
+    for s in np.flatnonzero(split):
+        start, end = starts[group[s]], ends[group[s]]
+        running = np.cumsum(signed[start:s] / before[start:s])
+        held = (running[-1] - min(0.0, running.min())) * before[s] if s > start else 0.0
+        ratio = (held + quantity[s]) / held if held > 0 else 1.0
+        after[s] = before[s] * ratio
+        before[s + 1:end] *= ratio
+        after[s + 1:end] *= ratio
+    after = np.where(split, after, before)
+    final_factor = np.where(ends > starts, after[np.maximum(ends - 1, 0)], 1.0)
+
+    base = quantity / before
+    acquired_base = np.where(buy | bonus, base, 0.0)
+    unknown_cost = buy & np.isnan(price)
+    known_cost = np.where(buy & ~unknown_cost, quantity * np.nan_to_num(price), 0.0)
+
+    # Global acquisition axis: groups are contiguous, so one cumulative sum covers all of them
+    acq_cum = np.cumsum(acquired_base)
+    group_offset = np.r_[0.0, acq_cum][starts]  # acquisitions before each group
+    group_total = np.r_[0.0, acq_cum][ends]
+    lots = np.flatnonzero(acquired_base > 0)
+    axis = np.r_[0.0, acq_cum[lots]]
+
+    # Position on the acquisition axis reached by the sales so far. A sale larger than the holding at the
+    # time (shares bought before the history starts) is only matched up to the holding: with unclipped
+    # holdings h, the clipped position is offset + sold + min(0, running min of h) within the group
+    sold_base = np.where(sell, base, 0.0)
+    sold_cum = np.cumsum(sold_base)
+    sold_local = sold_cum - np.r_[0.0, sold_cum][starts][group]
+    holding = acq_cum - group_offset[group] - sold_local
+    shortfall = np.zeros(n)
+    for k in np.unique(group[holding < -1e-9]):
+        shortfall[starts[k]:ends[k]] = np.minimum(np.minimum.accumulate(holding[starts[k]:ends[k]]), 0.0)
+    position = group_offset[group] + sold_local + shortfall
+    sale_rows = np.flatnonzero(sell)
+    previous = np.r_[-1, sale_rows][:-1]
+    same_group = (previous >= 0) & (group[np.maximum(previous, 0)] == group[sale_rows])
+
+    # Positions landing on a lot boundary must not slip into the neighbouring lot through rounding
+    tolerance = 1e-7 + 1e-13 * axis[-1]
+    matched_end = np.where(ends > starts, np.r_[0.0, position][ends], group_offset)
+    matched_end = np.where(group_total - matched_end > tolerance, matched_end, group_total)
+    return FifoLots(
+        order=order,
+        factor=after,
+        final_factor=final_factor,
+        axis=axis,
+        cost_curve=np.r_[0.0, np.cumsum(known_cost[lots])],
+        unknown_curve=np.r_[0.0, np.cumsum(np.where(unknown_cost, base, 0.0)[lots])],
+        lot_group=group[lots],
+        lot_dates=dates[lots],
+        group_offset=group_offset,
+        group_total=group_total,
+        matched_end=matched_end,
+        sale_rows=sale_rows,
+        sale_start=np.where(same_group, position[np.maximum(previous, 0)], group_offset[group[sale_rows]]),
+        sale_end=position[sale_rows],
+        tolerance=tolerance,
+    )
+
+
+def stock_holdings_many(users: list) -> list:
+    """StockHoldings for each (stock payload, net worth payload) pair, computed in one pass."""
+    columns = [load_columns("fetch_stock_transactions", payload) for payload, _ in users]
+    offsets = np.cumsum([0] + [len(cols.isins) for cols in columns])
+    n_groups = int(offsets[-1])
+    if not n_groups or not sum(len(cols) for cols in columns):
+        return [StockHoldings([], [], {}) for _ in users]
+
+    group = np.concatenate([cols.isin.astype(np.intp) + offsets[u] for u, cols in enumerate(columns)])
+    txn_type = np.concatenate([cols.txn_type for cols in columns])
+    dates = np.concatenate([cols.date for cols in columns])
+    quantity = np.concatenate([cols.quantity for cols in columns])
+    price = np.concatenate([cols.nav for cols in columns])
+    fifo = fifo_lots(group, txn_type, dates, quantity, price, n_groups)
+
+    g, txn_type, dates = group[fifo.order], txn_type[fifo.order], dates[fifo.order]
+    quantity, price = quantity[fifo.order], price[fifo.order]
+    buy, sell = txn_type == BUY, txn_type == SELL
+
+    # Per-sale amounts in actual shares at the time of the sale
+    rows = fifo.sale_rows
+    sale_cost = fifo.cost(fifo.sale_start, fifo.sale_end)
+    sale_qty = (fifo.sale_end - fifo.sale_start) * fifo.factor[rows]
+    unknown_qty = fifo.unknown(fifo.sale_start, fifo.sale_end) * fifo.factor[rows]
+    known_qty = sale_qty - unknown_qty
+    proceeds = quantity[rows] * price[rows]  # NaN when the sale price is missing
+    realized = known_qty * price[rows] - sale_cost
+    realized_known = ~np.isnan(realized)
+    sale_first_lot = fifo.lot_date(fifo.sale_start, "right")
+    sale_last_lot = fifo.lot_date(fifo.sale_end, "left")
+    unpriced = np.where(realized_known, unknown_qty, sale_qty) + (quantity[rows] - sale_qty)
+
+    realized_by_group = np.bincount(g[rows], weights=np.where(realized_known, realized, 0.0), minlength=n_groups)
+    sold_by_group = np.bincount(g[rows], weights=quantity[rows] * fifo.final_factor[g[rows]] / fifo.factor[rows],
+                                minlength=n_groups)
+    unknown_pnl = np.bincount(g[rows], weights=unpriced, minlength=n_groups)
+
+    # Last transaction price per group, converted to post-split shares
+    priced = np.flatnonzero(~np.isnan(price) & (buy | sell))
+    last_price = np.full(n_groups, np.nan)
+    last_price[g[priced]] = price[priced] * fifo.factor[priced] / fifo.final_factor[g[priced]]
+    first_buy = np.full(n_groups, np.datetime64("NaT"), dtype="datetime64[D]")
+    np.fmin.at(first_buy, g[buy], dates[buy])
+
+    held_qty = fifo.held * fifo.final_factor
+    held_cost = fifo.cost(fifo.matched_end, fifo.group_total)
+    held_unknown = fifo.unknown(fifo.matched_end, fifo.group_total) * fifo.final_factor
+    held_known = held_qty - held_unknown
+    avg_cost = np.divide(held_cost, held_known, out=np.full(n_groups, np.nan), where=held_known > 1e-9)
+    oldest_open = np.where(fifo.held > 0, fifo.lot_date(fifo.matched_end, "right"), np.datetime64("NaT"))
+
+    results = []
+    sale_group = g[rows]
+    for u, (cols, (_, net_worth)) in enumerate(zip(columns, users)):
+        k = np.arange(offsets[u], offsets[u + 1])
+        prices = equity_prices(net_worth)
+        reported = [prices.get(isin) for isin in cols.isins]
+        market = np.array([r[0] if r else np.nan for r in reported])
+        nav = np.where(~np.isnan(market), market, last_price[k])
+        source = np.where(~np.isnan(market), "holdingsInfo", np.where(~np.isnan(last_price[k]), "last_txn", ""))
+        held = held_qty[k] > 0
+        current = np.where(held, held_qty[k] * nav, 0.0)
+        unrealized = np.where(held, held_known[k] * nav - held_cost[k], 0.0)
+        pct = np.divide(unrealized, held_cost[k], out=np.full(len(k), np.nan), where=held_cost[k] > 0) * 100
+        holdings = [list(row) for row in zip(
+            cols.isins, [r[1] if r else "" for r in reported], _values(held_qty[k], 4), _values(avg_cost[k], 4),
+            _values(held_cost[k]), _values(held_unknown[k], 4), _values(nav, 4), source.tolist(),
+            _values(current), _values(unrealized), _values(pct), _values(realized_by_group[k]),
+            _values(sold_by_group[k], 4), _values(unknown_pnl[k], 4), _dates(first_buy[k]),
+            _dates(oldest_open[k]), [r[2] if r else None for r in reported],
+        )]
+
+        # This user's sales are contiguous (rows are ordered by group); list them by date
+        lo, hi = np.searchsorted(sale_group, [offsets[u], offsets[u + 1]])
+        j = lo + np.lexsort((np.arange(hi - lo), dates[rows[lo:hi]]))
+        sales = [list(row) for row in zip(
+            [cols.isins[i] for i in (sale_group[j] - offsets[u]).tolist()], _dates(dates[rows[j]]),
+            _values(quantity[rows[j]], 4), _values(price[rows[j]], 4), _values(proceeds[j]),
+            _values(sale_cost[j]), _values(realized[j]), _values(unknown_qty[j], 4),
+            _dates(sale_first_lot[j]), _dates(sale_last_lot[j]),
+        )]
+
+        valued = ~np.isnan(current)
+        portfolio = {
+            "positions": int(held.sum()),
+            "invested": _round(held_cost[k].sum()),
+            "current_value": _round(current[valued].sum()),
+            "unrealized_pnl": _round(unrealized[valued].sum()),
+            "realized_pnl": _round(realized_by_group[k].sum()),
+            "isins_without_market_price": [cols.isins[i] for i in np.flatnonzero(held & np.isnan(market))],
+            "isins_with_unknown_cost": [cols.isins[i] for i in np.flatnonzero(held_unknown[k] > 0)],
+        }
+        results.append(StockHoldings(holdings, sales, portfolio))
+    return results
+
+
+def stock_holdings(stock_payload, net_worth_payload=None) -> StockHoldings:
+    """Holdings, sales and portfolio totals for one user.
+
+    Open positions are valued at the holdingsInfo last traded price, falling back
+    to the last transaction price (price_source "last_txn"); with neither, price
+    and value are left empty. Units whose cost or sale price is missing are
+    excluded from P&L and reported in the unknown_* columns instead.
+    """
+    return stock_holdings_many([(stock_payload, net_worth_payload)])[0]
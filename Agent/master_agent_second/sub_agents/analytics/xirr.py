@@ -0,0 +1,72 @@
+"""Vectorized XIRR over many independent cash-flow series at once."""
+
+import numpy as np
+
+DAYS_PER_YEAR = 365.0
+_LOW, _HIGH = -0.9999, 1000.0
+
+
+def _npv(rate, group, amounts, years, terminal, n):
+    """Per-group value at the as-of date of flows compounded at `rate`, plus the terminal value."""
+    growth = (1.0 + rate[group]) ** years
+    value = np.bincount(group, weights=amounts * growth, minlength=n) + terminal
+    slope = np.bincount(group, weights=amounts * years * growth / (1.0 + rate[group]), minlength=n)
+    return value, slope
+
+
+def xirr_by_group(group: np.ndarray, amounts: np.ndarray, years: np.ndarray, terminal: np.ndarray, tol: float = 1e-9) -> np.ndarray:
+    """Annualised internal rate of return for each group.
+
+    Args:
+        group: int index of the series each flow belongs to (0..n-1).
+        amounts: signed flows, negative for money paid in (purchases), positive for money received.
+        years: time from each flow to the as-of date, in years (>= 0).
+        terminal: value still held at the as-of date, one entry per group.
+
+    Returns float64 rates (0.12 == 12%); NaN where no rate exists (e.g. no outflows).
+    Newton steps run on all groups together; groups that do not converge are
+    finished by vectorized bisection on [-99.99%, 100000%].
+    """
+    n = len(terminal)
+    group = np.asarray(group, dtype=np.intp)
+    paid = np.bincount(group, weights=np.where(amounts < 0, -amounts, 0.0), minlength=n)
+    received = np.bincount(group, weights=np.where(amounts > 0, amounts, 0.0), minlength=n) + terminal
+    rate = np.full(n, np.nan)
+    valid = (paid > 0) & (received > 0)
+    if not valid.any():
+        return rate
+
+    # Start from the simple return spread over the amount-weighted holding period
+    held = np.bincount(group, weights=np.where(amounts < 0, -amounts * years, 0.0), minlength=n)
+    span = np.divide(held, paid, out=np.ones(n), where=paid > 0).clip(1 / DAYS_PER_YEAR, None)
+    guess = np.divide(received, paid, out=np.ones(n), where=paid > 0) ** (1.0 / span) - 1.0
+    rate = np.where(valid, guess.clip(_LOW + 1e-6, 10.0), 0.0)
+
+    scale = np.maximum(paid, 1.0)
+    done = ~valid
+    for _ in range(50):
+        value, slope = _npv(rate, group, amounts, years, terminal, n)
+        converged = np.abs(value) <= tol * scale
+        done |= converged
+        if done.all():
+            break
+        step = np.divide(value, slope, out=np.zeros(n), where=(slope != 0) & ~done)
+        rate = np.where(done, rate, (rate - step).clip(_LOW, _HIGH))
+
+    value, _ = _npv(rate, group, amounts, years, terminal, n)
+    stuck = valid & ~(np.abs(value) <= 1e-6 * scale)
+    if stuck.any():
+        low, high = np.full(n, _LOW), np.full(n, _HIGH)
+        v_low, _ = _npv(low, group, amounts, years, terminal, n)
+        for _ in range(200):
+            mid = (low + high) / 2
+            v_mid, _ = _npv(mid, group, amounts, years, terminal, n)
+            same = np.sign(v_mid) == np.sign(v_low)
+            low, v_low = np.where(same, mid, low), np.where(same, v_mid, v_low)
+            high = np.where(same, high, mid)
+        bracketed = np.sign(_npv(np.full(n, _LOW), group, amounts, years, terminal, n)[0]) != np.sign(
+            _npv(np.full(n, _HIGH), group, amounts, years, terminal, n)[0])
+        rate = np.where(stuck, np.where(bracketed, (low + high) / 2, np.nan), rate)
+
+    rate[~valid] = np.nan
+    return rate
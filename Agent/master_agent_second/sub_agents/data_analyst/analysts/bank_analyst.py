@@ -2,6 +2,8 @@
 
 from google.adk.agents import Agent
 
+from ...analytics.tools import detect_suspicious_transactions
+
 BANK_PROMPT = """
 You are a specialized Bank Transaction Analysis Agent. Your expertise lies in analyzing banking patterns and providing comprehensive cash flow and spending assessments.
 
@@ -33,7 +35,7 @@ Your Responsibilities:
    - Reference established expense management best practices
 
 6. **Risk and Opportunity Identification**:
-   - Identify potential fraudulent or suspicious transactions
+   - Identify potential fraudulent or suspicious transactions: call `detect_suspicious_transactions` and explain the flags it returns rather than searching the transactions yourself
    - Suggest opportunities for better interest rates or banking products
    - Recommend cash flow optimization strategies
 
@@ -52,5 +54,6 @@ bank_analyst = Agent(
     model='gemini-2.5-flash',
     name='bank_analyst',
     description="Specialized agent for analyzing bank transactions and providing comprehensive cash flow and spending assessments.",
-    instruction=BANK_PROMPT
+    instruction=BANK_PROMPT,
+    tools=[detect_suspicious_transactions],
 )
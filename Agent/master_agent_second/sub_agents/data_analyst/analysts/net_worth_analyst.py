@@ -2,14 +2,17 @@
 
 from google.adk.agents import Agent
 
+from ...analytics.tools import analyze_net_worth, analyze_stock_holdings
+
 NET_WORTH_PROMPT = """
 You are a specialized Net Worth Analysis Agent. Your expertise lies in analyzing personal net worth data and providing comprehensive financial health assessments.
 
 Your Responsibilities:
 
 1. **Net Worth Breakdown Analysis**:
+   - Call `analyze_net_worth` first and quote its asset/liability breakdown, asset-class allocation, liquidity and debt-to-asset ratios, and change since the last snapshot rather than computing them yourself
    - Analyze asset vs liability composition
-   - Calculate debt-to-asset ratios
+   - Value the equity holdings with `analyze_stock_holdings` (FIFO positions, cost and P&L per ISIN) and note any ISINs without a market price
    - Identify areas of financial strength and weakness
 
 2. **Benchmarking & Context Analysis**:
@@ -42,5 +45,6 @@ net_worth_analyst = Agent(
     model='gemini-2.5-flash',
     name='net_worth_analyst',
     description="Specialized agent for analyzing personal net worth data and providing comprehensive financial health assessments.",
-    instruction=NET_WORTH_PROMPT
+    instruction=NET_WORTH_PROMPT,
+    tools=[analyze_net_worth, analyze_stock_holdings],
 )
@@ -2,6 +2,8 @@
 
 from google.adk.agents import Agent
 
+from ...analytics.tools import analyze_stock_holdings
+
 STOCK_PROMPT = """
 You are a specialized Stock Transaction Analysis Agent. Your expertise lies in analyzing equity investments and providing comprehensive stock portfolio assessments.
 
@@ -9,7 +11,7 @@ Your Responsibilities:
 
 1. **Portfolio Performance Analysis**:
    - Evaluate returns on individual stocks and overall portfolio
-   - Calculate realized vs unrealized gains/losses
+   - Calculate realized vs unrealized gains/losses: call `analyze_stock_holdings` for FIFO positions, average cost and P&L instead of replaying the transactions yourself
    - Analyze portfolio performance vs standard market indices (Nifty, Sensex)
 
 2. **Risk Assessment**:
@@ -52,5 +54,6 @@ stock_analyst = Agent(
     model='gemini-2.5-flash',
     name='stock_analyst',
     description="Specialized agent for analyzing stock transactions and providing comprehensive equity portfolio assessments.",
-    instruction=STOCK_PROMPT
+    instruction=STOCK_PROMPT,
+    tools=[analyze_stock_holdings],
 )
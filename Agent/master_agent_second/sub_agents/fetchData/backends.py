@@ -0,0 +1,135 @@
+"""Data backends behind the fetch tools: the Fi MCP server over HTTP, or test_data_dir read in-process."""
+
+import itertools
+import json
+import os
+import threading
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# "http" talks to the Go server (default); "local" reads test_data_dir directly with no network hop
+DATA_BACKEND = os.getenv("FI_DATA_BACKEND", "http")
+# Repository-level test_data_dir, the same directory the Go server serves from
+TEST_DATA_DIR = os.getenv("FI_TEST_DATA_DIR", str(Path(__file__).resolve().parents[4] / "test_data_dir"))
+# Phone number used by the local backend when the session id is not itself a phone number
+LOCAL_PHONE_NUMBER = os.getenv("FI_LOCAL_PHONE_NUMBER", "2222222222")
+# Read size for streamed payloads (see streaming.py)
+STREAM_CHUNK_BYTES = 64 * 1024
+# Bodies above this size go to the caller's `large` handler instead of being parsed whole
+STREAM_ABOVE_BYTES = int(os.getenv("FI_STREAM_ABOVE_BYTES", str(16 * 2**20)))
+
+
+def read_payload(byte_chunks, large=None, limit: int = STREAM_ABOVE_BYTES):
+    """Parse a body given as byte chunks, or hand it to `large` once it grows past `limit` bytes.
+
+    Up to `limit` bytes are buffered; a longer body goes to `large` (the buffered
+    chunks first, then the rest of the stream) and its return value is the payload.
+    """
+    chunks = iter(byte_chunks)
+    buffered, size = [], 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
+        if large is not None and size > limit:
+            return large(itertools.chain(buffered, chunks))
+    return json.loads(b"".join(buffered))
+
+
+class HttpBackend:
+    """Keep-alive HTTP access to the Fi MCP `/tool` endpoint with a bounded connection pool."""
+
+    name = "http"
+
+    def __init__(self, base_url: str, pool_size: int, connect_timeout: float, read_timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        # pool_block keeps the number of open sockets at pool_size under bursts
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self._http = requests.Session()
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+
+    def load(self, tool_name: str, session_id: str, large=None):
+        """Parsed payload; with `large`, a body over STREAM_ABOVE_BYTES is streamed to it instead."""
+        if large is None:
+            response = self._http.get(
+                f"{self.base_url}/tool",
+                params={"sessionId": session_id, "tool": tool_name},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            return response.json()
+        # The server sends large bodies chunked, so the size is only known by reading
+        return read_payload(self.stream(tool_name, session_id), large)
+
+    def stream(self, tool_name: str, session_id: str):
+        """Yield the raw response body in chunks without buffering the whole payload."""
+        with self._http.get(
+            f"{self.base_url}/tool",
+            params={"sessionId": session_id, "tool": tool_name},
+            timeout=self.timeout,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            yield from response.iter_content(STREAM_CHUNK_BYTES)
+
+    def close(self) -> None:
+        self._http.close()
+
+
+class LocalBackend:
+    """Reads `<data_dir>/<phone>/<tool>.json` directly, parsing each file once and keeping it in memory.
+
+    The Go server maps session ids to phone numbers at login. Locally a session id that
+    names a directory under data_dir is used as the phone number; anything else (such
+    as the default "temp1") falls back to `phone_number`.
+    """
+
+    name = "local"
+
+    def __init__(self, data_dir: str = TEST_DATA_DIR, phone_number: str = LOCAL_PHONE_NUMBER):
+        self.data_dir = Path(data_dir)
+        self.phone_number = phone_number
+        self._payloads = {}
+        self._lock = threading.Lock()
+
+    def _phone_for(self, session_id: str) -> str:
+        if session_id and session_id.isdigit() and (self.data_dir / session_id).is_dir():
+            return session_id
+        return self.phone_number
+
+    def load(self, tool_name: str, session_id: str, large=None):
+        """Parsed payload; with `large`, a file over STREAM_ABOVE_BYTES is streamed to it instead (not memoized)."""
+        path = self.data_dir / self._phone_for(session_id) / f"{tool_name}.json"
+        if large is not None and path.stat().st_size > STREAM_ABOVE_BYTES:
+            return large(self.stream(tool_name, session_id))
+        payload = self._payloads.get(path)
+        if payload is None:
+            with self._lock:
+                payload = self._payloads.get(path)
+                if payload is None:
+                    with open(path, "rb") as f:
+                        payload = json.loads(f.read())
+                    self._payloads[path] = payload
+        return payload
+
+    def stream(self, tool_name: str, session_id: str):
+        """Yield the file in chunks; streamed reads bypass the parsed-payload memo."""
+        path = self.data_dir / self._phone_for(session_id) / f"{tool_name}.json"
+        with open(path, "rb") as f:
+            yield from iter(lambda: f.read(STREAM_CHUNK_BYTES), b"")
+
+    def close(self) -> None:
+        with self._lock:
+            self._payloads.clear()
+
+
+def make_backend(kind: str, base_url: str, pool_size: int, connect_timeout: float, read_timeout: float):
+    """Build the backend selected by FI_DATA_BACKEND."""
+    if kind == "local":
+        return LocalBackend()
+    if kind == "http":
+        return HttpBackend(base_url, pool_size, connect_timeout, read_timeout)
+    raise ValueError(f"Unknown FI_DATA_BACKEND '{kind}', expected 'http' or 'local'")
@@ -0,0 +1,217 @@
+"""Shared client for the Fi MCP tools: pooled HTTP by default, or an in-process local backend."""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .backends import DATA_BACKEND, make_backend
+from .cache import TTLCache
+from .resilience import CircuitOpenError, ResilientCaller
+
+# Connection settings, overridable through the environment (.env is loaded by the runners)
+BASE_URL = os.getenv("FI_MCP_BASE_URL", "http://localhost:8080")
+SESSION_ID = os.getenv("FI_MCP_SESSION_ID", "temp1")
+POOL_SIZE = int(os.getenv("FI_MCP_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("FI_MCP_CONNECT_TIMEOUT", "2"))
+READ_TIMEOUT = float(os.getenv("FI_MCP_READ_TIMEOUT", "5"))
+# Fetched payloads only change when the user relinks accounts; 0 disables caching
+CACHE_TTL = float(os.getenv("FI_MCP_CACHE_TTL", "900"))
+CACHE_SIZE = int(os.getenv("FI_MCP_CACHE_SIZE", "256"))
+# Transient failures (connection errors, timeouts, 429/5xx) are retried with jittered backoff
+MAX_ATTEMPTS = int(os.getenv("FI_MCP_MAX_ATTEMPTS", "3"))
+BACKOFF_BASE = float(os.getenv("FI_MCP_BACKOFF_BASE", "0.1"))
+BACKOFF_MAX = float(os.getenv("FI_MCP_BACKOFF_MAX", "1"))
+# A duplicate request is sent once a call outlives this delay (or the tool's p95); 0 disables hedging
+HEDGE_DELAY = float(os.getenv("FI_MCP_HEDGE_DELAY", "0.5"))
+# Consecutive transient failures before a tool fails fast, and how long it stays open; 0 disables
+BREAKER_THRESHOLD = int(os.getenv("FI_MCP_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.getenv("FI_MCP_BREAKER_RESET", "30"))
+
+# Tools whose bodies above FI_STREAM_ABOVE_BYTES are streamed into columns instead of parsed (see streaming.py)
+STREAMED_TOOLS = ("fetch_bank_transactions",)
+
+# Tools served by the Fi MCP server (see pkg/tool_info.go)
+TOOL_NAMES = (
+    "fetch_net_worth",
+    "fetch_credit_report",
+    "fetch_epf_details",
+    "fetch_mf_transactions",
+    "fetch_bank_transactions",
+    "fetch_stock_transactions",
+)
+
+
+def _streamed_payload_handler(session_id: str):
+    # Imported here because streaming builds on columnar, which imports this module
+    from .streaming import streamed_bank_payload
+    return lambda byte_chunks: streamed_bank_payload(session_id, byte_chunks)
+
+
+class ToolClient:
+    """Fetch client with a pluggable backend, a payload cache, retry/hedging/circuit
+    breaking (see resilience.py) and per-tool timing counters."""
+
+    def __init__(
+        self,
+        backend=None,
+        base_url: str = BASE_URL,
+        session_id: str = SESSION_ID,
+        pool_size: int = POOL_SIZE,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        cache_ttl: float = CACHE_TTL,
+        cache_size: int = CACHE_SIZE,
+        max_attempts: int = MAX_ATTEMPTS,
+        hedge_delay: float = HEDGE_DELAY,
+        breaker_threshold: int = BREAKER_THRESHOLD,
+        breaker_reset: float = BREAKER_RESET,
+    ):
+        self.session_id = session_id
+        self.backend = backend or make_backend(DATA_BACKEND, base_url, pool_size, connect_timeout, read_timeout)
+
+        self.cache = TTLCache(cache_ttl, cache_size)
+        self.resilience = ResilientCaller(
+            max_attempts, BACKOFF_BASE, BACKOFF_MAX, hedge_delay, breaker_threshold, breaker_reset, hedge_workers=2 * pool_size
+        )
+        self._lock = threading.Lock()
+        self._stats = {}
+        # One worker per pooled connection, so a batch never queues behind the pool
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="fi-fetch")
+
+    def fetch(self, tool_name: str, session_id: str = None, use_cache: bool = True) -> dict:
+        """Call one tool and wrap the result in the agents' status envelope.
+
+        Successful payloads are cached per (session, tool); errors are never cached.
+        Large bank histories come back as a small stand-in whose columns were
+        streamed into the columnar cache (see streaming.streamed_bank_payload).
+        While a tool's circuit is open the error comes back immediately with
+        `circuit_open: True`, so the caller can skip it instead of waiting.
+        """
+        session_id = session_id or self.session_id
+        if use_cache:
+            report = self.cache.get(session_id, tool_name)
+            if report is not None:
+                return {"status": "success", "report": report, "cached": True}
+
+        large = _streamed_payload_handler(session_id) if tool_name in STREAMED_TOOLS else None
+        start = time.perf_counter()
+        try:
+            report = self.resilience.call(tool_name, lambda: self.backend.load(tool_name, session_id, large))
+            result = {"status": "success", "report": report}
+        except CircuitOpenError as e:
+            # Counted as a failure (at its near-zero latency) so a tripped breaker shows up in stats()
+            self._record(tool_name, (time.perf_counter() - start) * 1000, False, short_circuited=True)
+            return {"status": "error", "error_message": str(e), "circuit_open": True}
+        except (requests.RequestException, OSError, ValueError) as e:
+            result = {"status": "error", "error_message": str(e)}
+        self._record(tool_name, (time.perf_counter() - start) * 1000, result["status"] == "success")
+        if result["status"] == "success":
+            self.cache.put(session_id, tool_name, result["report"])
+        return result
+
+    def stream(self, tool_name: str, session_id: str = None):
+        """Raw payload bytes in chunks, for histories too long to parse in one go.
+
+        Streams are neither cached nor counted in stats(); see streaming.py.
+        """
+        return self.backend.stream(tool_name, session_id or self.session_id)
+
+    def invalidate(self, session_id: str = None, tool_name: str = None) -> int:
+        """Forget cached payloads, e.g. after the user links or refreshes an account."""
+        return self.cache.invalidate(session_id, tool_name)
+
+    def fetch_many(self, tool_names: list, session_id: str = None) -> dict:
+        """Fetch several tools concurrently; wall time is that of the slowest tool."""
+        start = time.perf_counter()
+        names = list(dict.fromkeys(tool_names))  # de-duplicate, keep plan order
+
+        def timed(name):
+            call_start = time.perf_counter()
+            result = self.fetch(name, session_id)
+            result["latency_ms"] = round((time.perf_counter() - call_start) * 1000, 2)
+            return name, result
+
+        results = dict(self._executor.map(timed, names))
+        failed = [name for name, result in results.items() if result["status"] != "success"]
+        if not failed:
+            status = "success"
+        elif len(failed) < len(results):
+            status = "partial"
+        else:
+            status = "error"
+        return {
+            "status": status,
+            "results": results,
+            "failed_tools": failed,
+            "wall_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    def _record(self, tool_name: str, elapsed_ms: float, ok: bool, short_circuited: bool = False) -> None:
+        with self._lock:
+            entry = self._stats.setdefault(
+                tool_name,
+                {"calls": 0, "errors": 0, "short_circuited": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0},
+            )
+            entry["calls"] += 1
+            entry["errors"] += 0 if ok else 1
+            entry["short_circuited"] += 1 if short_circuited else 0
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["last_ms"] = elapsed_ms
+
+    def stats(self) -> dict:
+        """Snapshot of the backend timing counters, keyed by tool name (cache hits excluded).
+
+        Calls refused by an open circuit count as errors and in "short_circuited".
+        """
+        with self._lock:
+            return {
+                name: dict(entry, avg_ms=entry["total_ms"] / entry["calls"])
+                for name, entry in self._stats.items()
+            }
+
+    def health(self) -> dict:
+        """Retry/hedge counters and per-tool circuit breaker states and transitions."""
+        return self.resilience.stats()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self.resilience.close()
+        self.backend.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> ToolClient:
+    """Process-wide client, created on first use so every agent shares one pool."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ToolClient()
+    return _client
+
+
+def fetch_tool_data(tool_name: str) -> dict:
+    """Fetch one tool's payload through the shared client."""
+    return get_client().fetch(tool_name)
+
+
+def fetch_tools_data(tool_names: list, session_id: str = None) -> dict:
+    """Fetch a whole plan of tools in parallel through the shared client."""
+    unknown = [name for name in tool_names if name not in TOOL_NAMES]
+    if unknown:
+        return {
+            "status": "error",
+            "error_message": f"Unknown tools: {', '.join(unknown)}. Valid tools: {', '.join(TOOL_NAMES)}",
+        }
+    return get_client().fetch_many(tool_names, session_id)
@@ -0,0 +1,356 @@
+"""Token-budgeted compaction of fetched payloads before they reach the LLM.
+
+Each payload becomes a few dense sections: money objects collapse to plain
+numbers, lists of records become CSV tables with the header written once,
+schema descriptions are dropped, and transaction histories get monthly
+aggregates. Summary sections are always kept; tables are added in order
+until the token budget is spent and the rest is truncated row-wise.
+Transaction tables are built lazily, one row at a time, so a long history
+costs only the rows that fit in the budget.
+"""
+
+import csv
+import io
+import json
+import os
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from .columnar import (
+    BANK_CREDIT_TYPES, BANK_DEBIT_TYPES, BANK_TXN_TYPES, MF_ORDER_TYPES, STREAMED_KEY, STOCK_TXN_TYPES,
+    load_columns,
+)
+from .credit import PROFILE_ACCOUNT_COLUMNS, account_rows, credit_profiles, profile_lines
+from .net_worth import net_worth_lines, net_worth_snapshot
+
+# Prompt-token budget for one load_financial_data call across all requested tools
+TOKEN_BUDGET = int(os.getenv("FI_PROMPT_TOKEN_BUDGET", "6000"))
+# Rough characters-per-token ratio for Gemini on mixed numeric/English text
+CHARS_PER_TOKEN = 4
+
+SUMMARY, TABLE = 0, 1
+
+
+@dataclass
+class Section:
+    title: str
+    text: str
+    priority: int = TABLE
+    # A lazy table instead of `text`: CSV header, then row(i) for i < count, built only while they fit
+    header: list = None
+    row: Callable = None
+    count: int = 0
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def is_money(value) -> bool:
+    return isinstance(value, dict) and "currencyCode" in value and set(value) <= {"currencyCode", "units", "nanos"}
+
+
+def money_to_float(value) -> float:
+    """Collapse a {currencyCode, units, nanos} object to a number (missing parts are zero)."""
+    return int(value.get("units", 0) or 0) + (value.get("nanos", 0) or 0) / 1e9
+
+
+def _number(value):
+    """Render floats compactly: whole numbers without a decimal point, others to 4 places."""
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else round(value, 4)
+    return value
+
+
+def to_csv(header: list, rows: list) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def _flatten(value, prefix: str, scalars: dict, tables: list) -> None:
+    """Walk generic JSON: scalars become dotted keys, lists of objects become tables."""
+    if is_money(value):
+        scalars[prefix] = _number(money_to_float(value))
+    elif isinstance(value, dict):
+        for key, child in value.items():
+            if key != "schemaDescription":
+                _flatten(child, f"{prefix}.{key}" if prefix else key, scalars, tables)
+    elif isinstance(value, list):
+        if len(value) == 1 and isinstance(value[0], dict):
+            _flatten(value[0], prefix, scalars, tables)
+        elif value and all(isinstance(item, dict) for item in value):
+            records = []
+            for item in value:
+                flat = {}
+                _flatten(item, "", flat, tables)
+                records.append(flat)
+            header = list(dict.fromkeys(key for record in records for key in record))
+            if header:
+                rows = [[record.get(key, "") for key in header] for record in records]
+                tables.append(Section(prefix.rsplit(".", 1)[-1], to_csv(_short_keys(header), rows)))
+        elif value:
+            scalars[prefix] = ";".join(str(_number(item)) for item in value)
+    elif value not in (None, ""):
+        scalars[prefix] = _number(value)
+
+
+def _short_keys(paths: list) -> list:
+    """Drop leading path segments while the shortened keys stay unique."""
+    for depth in range(1, max((path.count(".") + 1 for path in paths), default=1) + 1):
+        short = [".".join(path.split(".")[-depth:]) for path in paths]
+        if len(set(short)) == len(short):
+            return short
+    return paths
+
+
+def compact_generic(payload, title: str) -> list:
+    scalars, tables = {}, []
+    _flatten(payload, "", scalars, tables)
+    sections = []
+    if scalars:
+        lines = (f"{key}: {value}" for key, value in zip(_short_keys(list(scalars)), scalars.values()))
+        sections.append(Section(title, "\n".join(lines), SUMMARY))
+    for table in tables:
+        table.title = f"{title} {table.title}"
+    return sections + tables
+
+
+def _month_keys(dates: np.ndarray) -> tuple:
+    months, inverse = np.unique(dates.astype("datetime64[M]"), return_inverse=True)
+    return [str(month) for month in months], inverse
+
+
+def compact_bank(payload) -> list:
+    cols = load_columns("fetch_bank_transactions", payload)
+    if not len(cols):
+        return [Section("bank_transactions", "no transactions", SUMMARY)]
+    months, inverse = _month_keys(cols.date)
+    credit = np.isin(cols.txn_type, BANK_CREDIT_TYPES)
+    debit = np.isin(cols.txn_type, BANK_DEBIT_TYPES)
+    rows = []
+    for account, bank in enumerate(cols.accounts):
+        mask = cols.account == account
+        n = len(months)
+        credits = np.bincount(inverse[mask & credit], weights=cols.amount[mask & credit], minlength=n)
+        debits = np.bincount(inverse[mask & debit], weights=cols.amount[mask & debit], minlength=n)
+        counts = np.bincount(inverse[mask], minlength=n)
+        rows.extend(
+            [account, bank, months[m], round(credits[m], 2), round(debits[m], 2), int(counts[m])]
+            for m in range(n) if counts[m]
+        )
+    sections = [Section("bank_monthly", to_csv(["account", "bank", "month", "credits", "debits", "txns"], rows), SUMMARY)]
+
+    def txn_row(i):
+        return [int(cols.account[i]), str(cols.date[i]), _number(cols.amount[i]),
+                BANK_TXN_TYPES.get(int(cols.txn_type[i]), cols.txn_type[i]), cols.modes[cols.mode[i]],
+                _number(cols.balance[i]), cols.narrations[cols.narration[i]]]
+
+    header = ["account", "date", "amount", "type", "mode", "balance", "narration"]
+    sections.append(Section("bank_txns", "", header=header, row=txn_row, count=len(cols)))
+    return sections
+
+
+def compact_mf(payload) -> list:
+    cols = load_columns("fetch_mf_transactions", payload)
+    if not len(cols):
+        return [Section("mf_transactions", "no transactions", SUMMARY)]
+    months, inverse = _month_keys(cols.date)
+    buy = cols.order_type == 1
+    bought = np.bincount(inverse[buy], weights=cols.amount[buy], minlength=len(months))
+    sold = np.bincount(inverse[~buy], weights=cols.amount[~buy], minlength=len(months))
+    monthly = [[months[m], round(bought[m], 2), round(sold[m], 2)] for m in range(len(months))]
+    schemes = [[i, isin, name] for i, (isin, name) in enumerate(zip(cols.isins, cols.scheme_names))]
+
+    def txn_row(i):
+        return [int(cols.scheme[i]), MF_ORDER_TYPES.get(int(cols.order_type[i]), cols.order_type[i]), str(cols.date[i]),
+                _number(cols.nav[i]), _number(cols.units[i]), _number(cols.amount[i])]
+
+    return [
+        Section("mf_schemes", to_csv(["scheme", "isin", "name"], schemes), SUMMARY),
+        Section("mf_monthly", to_csv(["month", "invested", "redeemed"], monthly), SUMMARY),
+        Section("mf_txns", "", header=["scheme", "type", "date", "nav", "units", "amount"], row=txn_row, count=len(cols)),
+    ]
+
+
+def compact_stock(payload) -> list:
+    cols = load_columns("fetch_stock_transactions", payload)
+    if not len(cols):
+        return [Section("stock_transactions", "no transactions", SUMMARY)]
+
+    def txn_row(i):
+        return [cols.isins[cols.isin[i]], STOCK_TXN_TYPES.get(int(cols.txn_type[i]), cols.txn_type[i]), str(cols.date[i]),
+                _number(cols.quantity[i]), "" if np.isnan(cols.nav[i]) else _number(cols.nav[i])]
+
+    n = len(cols.isins)
+    signed = np.where(cols.txn_type == 2, -cols.quantity, np.where(cols.txn_type == 1, cols.quantity, 0.0))
+    bought = np.bincount(cols.isin[cols.txn_type == 1], weights=cols.quantity[cols.txn_type == 1], minlength=n)
+    sold = np.bincount(cols.isin[cols.txn_type == 2], weights=cols.quantity[cols.txn_type == 2], minlength=n)
+    net = np.bincount(cols.isin, weights=signed, minlength=n)
+    counts = np.bincount(cols.isin, minlength=n)
+    summary = [[isin, _number(bought[i]), _number(sold[i]), _number(net[i]), int(counts[i])] for i, isin in enumerate(cols.isins)]
+    return [
+        Section("stock_by_isin", to_csv(["isin", "bought_qty", "sold_qty", "net_qty_ex_corporate_actions", "txns"], summary), SUMMARY),
+        Section("stock_txns", "", header=["isin", "type", "date", "qty", "nav"], row=txn_row, count=len(cols)),
+    ]
+
+
+def _strip_prefix(attribute: str) -> str:
+    return attribute.split("_TYPE_", 1)[-1]
+
+
+def compact_net_worth(payload_in) -> list:
+    payload = dict(payload_in or {})
+    sections = []
+    if payload.pop("netWorthResponse", None):
+        sections.append(Section("net_worth", "\n".join(net_worth_lines(net_worth_snapshot(payload_in))), SUMMARY))
+
+    analytics = (payload.pop("mfSchemeAnalytics", None) or {}).get("schemeAnalytics") or []
+    if analytics:
+        rows = []
+        for scheme in analytics:
+            detail = scheme.get("schemeDetail", {})
+            stats = scheme.get("enrichedAnalytics", {}).get("analytics", {}).get("schemeDetails", {})
+            rows.append([
+                detail.get("isinNumber", ""), detail.get("nameData", {}).get("longName", ""), detail.get("assetClass", ""),
+                detail.get("categoryName", ""), _number(money_to_float(detail.get("nav", {}))), _number(stats.get("units", "")),
+                _number(money_to_float(stats.get("investedValue", {}))), _number(money_to_float(stats.get("currentValue", {}))),
+                _number(stats.get("XIRR", "")),
+            ])
+        header = ["isin", "name", "asset_class", "category", "nav", "units", "invested", "current", "xirr"]
+        sections.append(Section("mf_holdings", to_csv(header, rows), SUMMARY))
+
+    accounts = (payload.pop("accountDetailsBulkResponse", None) or {}).get("accountDetailsMap") or {}
+    if accounts:
+        accounts_table, holding_rows = [], []
+        for account_id, account in accounts.items():
+            details = account.get("accountDetails", {})
+            kind = _strip_prefix(details.get("accInstrumentType", ""))
+            provider = details.get("fipMeta", {}).get("displayName", "")
+            summaries = [value for key, value in account.items() if key.endswith("Summary")]
+            summary = summaries[0] if summaries else {}
+            value = summary.get("currentValue") or summary.get("currentBalance") or {}
+            accounts_table.append([kind, provider, details.get("maskedAccountNumber", ""), _number(money_to_float(value)) if value else ""])
+            for holding in summary.get("holdingsInfo", []):
+                price = holding.get("lastTradedPrice") or holding.get("nav") or holding.get("lastClosingRate") or {}
+                units = holding.get("units", holding.get("totalNumberUnits", ""))
+                holding_rows.append([kind, holding.get("isin", ""), holding.get("isinDescription", "").strip(), units,
+                                     _number(money_to_float(price)) if price else ""])
+        sections.append(Section("accounts", to_csv(["type", "provider", "account", "value"], accounts_table)))
+        if holding_rows:
+            sections.append(Section("holdings", to_csv(["type", "isin", "description", "units", "price"], holding_rows)))
+
+    if payload:
+        sections.extend(compact_generic(payload, "net_worth_other"))
+    return sections
+
+
+def compact_credit(payload) -> list:
+    sections = []
+    for number, profile in enumerate(credit_profiles(payload)):
+        suffix = f" {number + 1}" if number else ""
+        sections.append(Section(f"credit_profile{suffix}", "\n".join(profile_lines(profile)), SUMMARY))
+        if profile.accounts:
+            rows = [[_number(value) for value in row] for row in account_rows(profile)]
+            sections.append(Section(f"credit_accounts{suffix}", to_csv(PROFILE_ACCOUNT_COLUMNS, rows)))
+    return sections or compact_generic(payload, "credit_report")
+
+
+COMPACTORS = {
+    "fetch_net_worth": compact_net_worth,
+    "fetch_credit_report": compact_credit,
+    "fetch_bank_transactions": compact_bank,
+    "fetch_mf_transactions": compact_mf,
+    "fetch_stock_transactions": compact_stock,
+}
+
+
+def _truncate_table(text: str, max_chars: int) -> str:
+    """Keep the header and as many rows as fit, then note how many were dropped."""
+    lines = text.rstrip("\n").split("\n")
+    kept, used = [lines[0]], len(lines[0]) + 1
+    for line in lines[1:]:
+        if used + len(line) + 1 > max_chars:
+            break
+        kept.append(line)
+        used += len(line) + 1
+    omitted = len(lines) - len(kept)
+    return "\n".join(kept) + (f"\n... {omitted} more rows omitted" if omitted else "")
+
+
+def _lazy_table(section: Section, max_chars: int = None) -> str:
+    """CSV of a lazy table, building rows only while they fit in max_chars, then how many were dropped."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(section.header)
+    kept = 0
+    for i in range(section.count):
+        mark = buffer.tell()
+        writer.writerow(section.row(i))
+        if max_chars is not None and buffer.tell() > max_chars:
+            buffer.seek(mark)
+            buffer.truncate()
+            break
+        kept += 1
+    omitted = section.count - kept
+    return buffer.getvalue().rstrip("\n") + (f"\n... {omitted} more rows omitted" if omitted else "")
+
+
+def _raw_chars(payload) -> int:
+    """Size of the payload as fetched; a streamed history's stand-in records the size of its body."""
+    if isinstance(payload, dict) and STREAMED_KEY in payload:
+        return int(payload.get("bytes", 0))
+    return len(json.dumps(payload, separators=(",", ":")))
+
+
+def compact_payloads(payloads: dict, token_budget: int = TOKEN_BUDGET) -> tuple:
+    """Compact several tools' payloads into one text within token_budget.
+
+    Returns (text, size_report).
+    """
+    sections = []
+    for tool_name, payload in payloads.items():
+        if not payload:
+            sections.append(Section(tool_name, "no data connected", SUMMARY))
+            continue
+        compactor = COMPACTORS.get(tool_name)
+        sections.extend(compactor(payload) if compactor else compact_generic(payload, tool_name.removeprefix("fetch_")))
+
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    blocks = {id(section): None for section in sections}
+    used = 0
+    for priority in (SUMMARY, TABLE):
+        for section in sections:
+            if section.priority != priority:
+                continue
+            remaining = budget_chars - used - len(section.title) - 4
+            if section.row is not None:
+                text = _lazy_table(section, max(remaining, 0))
+                block = f"## {section.title}\n{text}\n"
+                if remaining <= 80 and text.endswith("rows omitted"):
+                    block = f"## {section.title}\n(omitted, token budget reached)\n"
+            else:
+                block = f"## {section.title}\n{section.text.rstrip()}\n"
+                if priority == TABLE and used + len(block) > budget_chars:
+                    if remaining <= 80:
+                        block = f"## {section.title}\n(omitted, token budget reached)\n"
+                    else:
+                        block = f"## {section.title}\n{_truncate_table(section.text, remaining)}\n"
+            blocks[id(section)] = block
+            used += len(block)
+    text = "\n".join(blocks[id(section)] for section in sections)
+
+    raw_chars = sum(_raw_chars(payload) for payload in payloads.values())
+    report = {
+        "raw_chars": raw_chars,
+        "compact_chars": len(text),
+        "raw_tokens_est": -(-raw_chars // CHARS_PER_TOKEN),
+        "compact_tokens_est": estimate_tokens(text),
+        "token_budget": token_budget,
+        "reduction_pct": round(100 * (1 - len(text) / raw_chars), 1) if raw_chars else 0.0,
+    }
+    return text, report
@@ -0,0 +1,286 @@
+"""Typed feature record of a fetch_credit_report payload.
+
+Bureau reports are nested JSON with every number a string and dates as
+YYYYMMDD. Each report is parsed once per distinct payload into a CreditProfile:
+score, age, account counts, secured and unsecured outstanding, card
+utilization overall and per card, enquiry counts and per-account payment
+history. The 36-month paymentHistoryProfile (latest month first, one DPD bucket
+per character, "?" when not reported) becomes two bitmasks per account, bit i
+for i months before the account's reporting date; shifted to the report date
+they OR together into the user's history across accounts.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .cache import TTLCache
+from .client import CACHE_TTL
+from .columnar import recent_digest
+
+# Credit bureau account type codes
+ACCOUNT_TYPES = {
+    "01": "auto_loan", "02": "housing_loan", "03": "property_loan", "04": "loan_against_securities",
+    "05": "personal_loan", "06": "consumer_loan", "07": "gold_loan", "08": "education_loan",
+    "09": "professional_loan", "10": "credit_card", "11": "leasing", "12": "overdraft", "13": "two_wheeler_loan",
+    "15": "loan_against_deposits", "17": "commercial_vehicle_loan", "51": "business_loan",
+    "52": "business_loan_priority_sector", "53": "business_loan_agriculture",
+}
+CARD_TYPES = {"10"}
+REVOLVING_TYPES = {"10", "12"}  # no fixed EMI schedule
+CLOSED_STATUSES = {"13"}
+HISTORY_MONTHS = 36
+# paymentHistoryProfile characters -> days-past-due bucket (asset classifications for the letters)
+DPD_BUCKETS = {str(bucket): bucket for bucket in range(8)} | {"S": 0, "M": 1, "B": 4, "D": 6, "L": 7}
+DPD_LABELS = ["0", "1-30", "31-60", "61-90", "91-120", "121-150", "151-180", "180+"]
+ENQUIRY_WINDOWS = (7, 30, 90, 180)
+
+PROFILE_ACCOUNT_COLUMNS = [
+    "lender", "type", "status", "opened", "balance", "limit_or_amount", "utilization_pct", "past_due", "rate_pct",
+    "tenure_months", "late_months_36", "late_months_12", "worst_dpd",
+]
+
+
+def _amount(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _date(value) -> np.datetime64:
+    """YYYYMMDD string to datetime64[D]; NaT when missing or malformed."""
+    try:
+        return np.datetime64(f"{value[:4]}-{value[4:6]}-{value[6:8]}", "D") if value and len(value) == 8 else np.datetime64("NaT")
+    except ValueError:
+        return np.datetime64("NaT")
+
+
+def _months_between(earlier: np.datetime64, later: np.datetime64) -> int:
+    if np.isnat(earlier) or np.isnat(later):
+        return 0
+    return int((later.astype("datetime64[M]") - earlier.astype("datetime64[M]")).astype(int))
+
+
+def payment_history(profile: str) -> tuple:
+    """(reported, late, worst bucket) of a paymentHistoryProfile: bitmasks with bit i = i months back."""
+    reported = late = worst = 0
+    for month, char in enumerate((profile or "")[:HISTORY_MONTHS]):
+        bucket = DPD_BUCKETS.get(char.upper())
+        if bucket is None:
+            continue
+        reported |= 1 << month
+        if bucket:
+            late |= 1 << month
+            worst = max(worst, bucket)
+    return reported, late, worst
+
+
+@dataclass
+class CreditAccount:
+    lender: str
+    kind: str  # ACCOUNT_TYPES code
+    status: str
+    opened: np.datetime64
+    reported: np.datetime64
+    original: float  # highest credit or original loan amount
+    limit: float  # credit limit (cards); 0 if not reported
+    balance: float
+    past_due: float
+    rate: float  # annual, 0 if not reported
+    tenure: int  # months, 0 if not reported
+    history_reported: int  # bitmask, bit i = i months before `reported`
+    history_late: int
+    worst_dpd: int  # DPD_BUCKETS value
+
+    @property
+    def type_name(self) -> str:
+        return ACCOUNT_TYPES.get(self.kind, self.kind)
+
+    @property
+    def is_open(self) -> bool:
+        return self.status not in CLOSED_STATUSES and self.balance > 0
+
+    @property
+    def utilization(self):
+        """Balance / limit for cards with a reported limit, else None."""
+        return self.balance / self.limit if self.kind in CARD_TYPES and self.limit > 0 else None
+
+    def late_months(self, months: int = HISTORY_MONTHS) -> int:
+        return bin(self.history_late & ((1 << months) - 1)).count("1")
+
+
+@dataclass
+class CreditProfile:
+    vendor: str
+    report_date: np.datetime64
+    score: int  # 0 if not reported
+    score_confidence: str
+    birth_date: np.datetime64
+    accounts_total: int
+    accounts_active: int
+    accounts_default: int
+    accounts_closed: int
+    outstanding: float
+    outstanding_secured: float
+    outstanding_unsecured: float
+    enquiries: dict  # days -> credit enquiries in the last `days` days
+    accounts: list = field(default_factory=list)  # CreditAccount
+
+    @property
+    def age(self):
+        """Completed years at the report date."""
+        if np.isnat(self.birth_date) or np.isnat(self.report_date):
+            return None
+        months = _months_between(self.birth_date, self.report_date)
+        if self.report_date.astype(object).day < self.birth_date.astype(object).day:
+            months -= 1
+        return months // 12
+
+    @property
+    def cards(self) -> list:
+        return [account for account in self.accounts if account.kind in CARD_TYPES and account.is_open]
+
+    @property
+    def card_limit(self) -> float:
+        return sum(card.limit for card in self.cards if card.limit > 0)
+
+    @property
+    def card_balance(self) -> float:
+        return sum(card.balance for card in self.cards if card.limit > 0)
+
+    @property
+    def utilization(self):
+        """Card balances / card limits over open cards with a reported limit, else None."""
+        return self.card_balance / self.card_limit if self.card_limit else None
+
+    @property
+    def past_due(self) -> float:
+        return sum(account.past_due for account in self.accounts)
+
+    @property
+    def history_late(self) -> int:
+        """Months (bit i = i months before the report) with a late payment on any account."""
+        late = 0
+        for account in self.accounts:
+            late |= account.history_late << _months_between(account.reported, self.report_date)
+        return late & ((1 << HISTORY_MONTHS) - 1)
+
+    @property
+    def oldest_account_months(self):
+        opened = [account.opened for account in self.accounts if not np.isnat(account.opened)]
+        return _months_between(min(opened), self.report_date) if opened else None
+
+
+def _account(details: dict) -> CreditAccount:
+    reported, late, worst = payment_history(details.get("paymentHistoryProfile", ""))
+    return CreditAccount(
+        lender=details.get("subscriberName", ""),
+        kind=details.get("accountType", ""),
+        status=details.get("accountStatus", ""),
+        opened=_date(details.get("openDate")),
+        reported=_date(details.get("dateReported")),
+        original=_amount(details.get("highestCreditOrOriginalLoanAmount")),
+        limit=_amount(details.get("creditLimitAmount")),
+        balance=_amount(details.get("currentBalance")),
+        past_due=_amount(details.get("amountPastDue")),
+        rate=_amount(details.get("rateOfInterest")) / 100,
+        tenure=int(_amount(details.get("repaymentTenure"))),
+        history_reported=reported,
+        history_late=late,
+        worst_dpd=worst,
+    )
+
+
+def parse_report(report: dict) -> CreditProfile:
+    data = report.get("creditReportData") or {}
+    credit_account = data.get("creditAccount") or {}
+    summary = credit_account.get("creditAccountSummary") or {}
+    counts = summary.get("account") or {}
+    outstanding = summary.get("totalOutstandingBalance") or {}
+    applicant = ((data.get("currentApplication") or {}).get("currentApplicationDetails") or {}).get(
+        "currentApplicantDetails") or {}
+    score = data.get("score") or {}
+    enquiries = (data.get("totalCapsSummary") or {})
+    prefix = "totalCapsLast"
+    if not enquiries:
+        enquiries, prefix = (data.get("caps") or {}).get("capsSummary") or {}, "capsLast"
+    return CreditProfile(
+        vendor=report.get("vendor", ""),
+        report_date=_date((data.get("creditProfileHeader") or {}).get("reportDate")),
+        score=int(_amount(score.get("bureauScore"))),
+        score_confidence=score.get("bureauScoreConfidenceLevel", ""),
+        birth_date=_date(applicant.get("dateOfBirthApplicant")),
+        accounts_total=int(_amount(counts.get("creditAccountTotal"))),
+        accounts_active=int(_amount(counts.get("creditAccountActive"))),
+        accounts_default=int(_amount(counts.get("creditAccountDefault"))),
+        accounts_closed=int(_amount(counts.get("creditAccountClosed"))),
+        outstanding=_amount(outstanding.get("outstandingBalanceAll")),
+        outstanding_secured=_amount(outstanding.get("outstandingBalanceSecured")),
+        outstanding_unsecured=_amount(outstanding.get("outstandingBalanceUnSecured")),
+        enquiries={days: int(_amount(enquiries.get(f"{prefix}{days}Days"))) for days in ENQUIRY_WINDOWS},
+        accounts=[_account(details) for details in credit_account.get("creditAccountDetails") or []],
+    )
+
+
+_profiles = TTLCache(CACHE_TTL, max_entries=64)
+
+
+def credit_profiles(payload) -> list:
+    """CreditProfile per report in a fetch_credit_report payload, latest first; parsed once per distinct payload."""
+    if not payload:
+        return []
+    digest = recent_digest(payload)
+    profiles = _profiles.get(digest, "fetch_credit_report")
+    if profiles is None:
+        profiles = [parse_report(report) for report in payload.get("creditReports") or []]
+        profiles.sort(key=lambda profile: str(profile.report_date), reverse=True)
+        _profiles.put(digest, "fetch_credit_report", profiles)
+    return profiles
+
+
+def _pct(value):
+    return "" if value is None else round(value * 100, 1)
+
+
+def profile_lines(profile: CreditProfile) -> list:
+    """The profile as a few `key: value` lines for the LLM."""
+    late = profile.history_late
+    late_accounts = [account for account in profile.accounts if account.history_late]
+    worst = max((account.worst_dpd for account in profile.accounts), default=0)
+    oldest = profile.oldest_account_months
+    lines = [
+        f"report_date: {profile.report_date} ({profile.vendor})",
+        f"bureau_score: {profile.score or 'not reported'}"
+        + (f" (confidence {profile.score_confidence})" if profile.score_confidence else ""),
+        f"age: {profile.age if profile.age is not None else 'unknown'}",
+        f"accounts: {profile.accounts_total} total, {profile.accounts_active} active, "
+        f"{profile.accounts_default} default, {profile.accounts_closed} closed"
+        + (f"; oldest opened {oldest // 12}y {oldest % 12}m ago" if oldest is not None else ""),
+        f"outstanding: {profile.outstanding:.0f} (secured {profile.outstanding_secured:.0f}, "
+        f"unsecured {profile.outstanding_unsecured:.0f}); past_due {profile.past_due:.0f}",
+    ]
+    if profile.card_limit:
+        lines.append(
+            f"card_utilization_pct: {_pct(profile.utilization)} ({profile.card_balance:.0f} of "
+            f"{profile.card_limit:.0f} limit over {sum(card.limit > 0 for card in profile.cards)} open cards)"
+        )
+    lines.append(
+        f"late_payments: {len(late_accounts)} accounts, {bin(late).count('1')} of the last {HISTORY_MONTHS} months "
+        f"({bin(late & 0xFFF).count('1')} in the last 12), worst {DPD_LABELS[worst]} days past due"
+    )
+    lines.append("enquiries: " + ", ".join(f"{count} in {days} days" for days, count in profile.enquiries.items()))
+    return lines
+
+
+def account_rows(profile: CreditProfile) -> list:
+    """PROFILE_ACCOUNT_COLUMNS per account, open accounts first."""
+    rows = []
+    for account in sorted(profile.accounts, key=lambda account: (not account.is_open, -account.balance)):
+        rows.append([
+            account.lender, account.type_name, account.status, str(account.opened), account.balance,
+            account.limit or account.original, _pct(account.utilization), account.past_due,
+            round(account.rate * 100, 3) if account.rate else "", account.tenure or "", account.late_months(),
+            account.late_months(12), DPD_LABELS[account.worst_dpd],
+        ])
+    return rows
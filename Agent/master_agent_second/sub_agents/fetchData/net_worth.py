@@ -0,0 +1,277 @@
+"""Fixed-size decoded record of a fetch_net_worth payload.
+
+netWorthResponse lists values keyed by netWorthAttribute with money as
+{currencyCode, units, nanos}: units a decimal string, nanos billionths of the
+same sign. Money is decoded exactly into Decimal, so totals and differences
+between snapshots carry no float error. Liabilities come either positive under
+liabilityValues or negative under assetValues (LIABILITY_TYPE_* attributes), and
+are kept as positive amounts. Every snapshot has the same slots: one per known
+attribute plus an "other" slot each for assets and liabilities, and one per
+asset class, with mutual funds split across classes by the current value of
+each scheme in mfSchemeAnalytics. A payload is decoded once; later calls with
+the same payload get the cached snapshot.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+
+from .cache import TTLCache
+from .client import CACHE_TTL
+from .columnar import recent_digest
+
+ASSET_CLASSES = ("equity", "debt", "gold", "cash")
+ASSET_TYPES = (
+    "ASSET_TYPE_MUTUAL_FUND", "ASSET_TYPE_INDIAN_SECURITIES", "ASSET_TYPE_US_SECURITIES", "ASSET_TYPE_ETF",
+    "ASSET_TYPE_SGB", "ASSET_TYPE_DEPOSITS", "ASSET_TYPE_SAVINGS_ACCOUNTS", "ASSET_TYPE_EPF", "ASSET_TYPE_NPS",
+    "ASSET_TYPE_OTHER",
+)
+LIABILITY_TYPES = (
+    "LIABILITY_TYPE_HOME_LOAN", "LIABILITY_TYPE_VEHICLE_LOAN", "LIABILITY_TYPE_PERSONAL_LOAN",
+    "LIABILITY_TYPE_EDUCATION_LOAN", "LIABILITY_TYPE_CREDIT_CARD", "LIABILITY_TYPE_LOAN", "LIABILITY_TYPE_OTHER_LOAN",
+    "LIABILITY_TYPE_OTHER",
+)
+# netWorthResponse asset types -> share of each asset class (mutual funds are split per scheme instead;
+# anything else counts as cash)
+NET_WORTH_CLASSES = {
+    "ASSET_TYPE_INDIAN_SECURITIES": {"equity": 1.0},
+    "ASSET_TYPE_US_SECURITIES": {"equity": 1.0},
+    "ASSET_TYPE_ETF": {"equity": 1.0},
+    "ASSET_TYPE_SGB": {"gold": 1.0},
+    "ASSET_TYPE_DEPOSITS": {"debt": 1.0},
+    "ASSET_TYPE_SAVINGS_ACCOUNTS": {"cash": 1.0},
+    "ASSET_TYPE_EPF": {"debt": 1.0},
+    "ASSET_TYPE_NPS": {"equity": 0.5, "debt": 0.5},
+}
+# Locked until retirement, so left out of other goals unless asked for
+RETIREMENT_ASSETS = {"ASSET_TYPE_EPF", "ASSET_TYPE_NPS"}
+# Available within days: bank balances, deposits and the cash share of mutual funds (liquid and overnight funds)
+LIQUID_ASSETS = {"ASSET_TYPE_SAVINGS_ACCOUNTS", "ASSET_TYPE_DEPOSITS"}
+# mfSchemeAnalytics assetClass -> share of each asset class
+MF_CLASSES = {
+    "EQUITY": {"equity": 1.0},
+    "HYBRID": {"equity": 0.65, "debt": 0.35},
+    "DEBT": {"debt": 1.0},
+    "CASH": {"cash": 1.0},
+    "COMMODITY": {"gold": 1.0},
+}
+
+ALLOCATION_COLUMNS = ["item", "kind", "value", "share_of_assets_pct"]
+DIFF_COLUMNS = ["item", "kind", "before", "after", "change", "change_pct"]
+
+ZERO = Decimal(0)
+PAISE = Decimal("0.01")
+
+
+def money_to_decimal(value) -> Decimal:
+    """Exact value of a {currencyCode, units, nanos} object (missing parts are zero)."""
+    value = value or {}
+    return Decimal(str(value.get("units", 0) or 0)) + Decimal(int(value.get("nanos", 0) or 0)).scaleb(-9)
+
+
+def _text(value: Decimal) -> str:
+    """Rupees to the paisa without trailing zeros."""
+    return f"{value.quantize(PAISE).normalize():f}"
+
+
+def _ratio(numerator: Decimal, denominator: Decimal):
+    return float(numerator / denominator) if denominator > 0 else None
+
+
+@dataclass(frozen=True)
+class NetWorthSnapshot:
+    assets: tuple  # Decimal per ASSET_TYPES
+    liabilities: tuple  # Decimal per LIABILITY_TYPES, positive
+    classes: tuple  # Decimal per ASSET_CLASSES, without RETIREMENT_ASSETS
+    retirement_classes: tuple  # Decimal per ASSET_CLASSES, RETIREMENT_ASSETS only
+    liquid: Decimal
+    reported_total: Decimal = None  # totalNetWorthValue, None if not reported
+
+    @property
+    def total_assets(self) -> Decimal:
+        return sum(self.assets, ZERO)
+
+    @property
+    def total_liabilities(self) -> Decimal:
+        return sum(self.liabilities, ZERO)
+
+    @property
+    def net_worth(self) -> Decimal:
+        return self.total_assets - self.total_liabilities
+
+    @property
+    def retirement(self) -> Decimal:
+        return sum(self.retirement_classes, ZERO)
+
+    def asset_classes(self, include_retirement: bool = True) -> dict:
+        """Asset class -> value."""
+        if not include_retirement:
+            return dict(zip(ASSET_CLASSES, self.classes))
+        return {name: a + b for name, a, b in zip(ASSET_CLASSES, self.classes, self.retirement_classes)}
+
+    @property
+    def liquidity_ratio(self):
+        """Liquid assets / net worth; None when the net worth is not positive."""
+        return _ratio(self.liquid, self.net_worth)
+
+    @property
+    def debt_to_asset(self):
+        return _ratio(self.total_liabilities, self.total_assets)
+
+    def items(self) -> list:
+        """(item, kind, value) for every slot, in a fixed order."""
+        return [
+            *((name.removeprefix("ASSET_TYPE_").lower(), "asset", value) for name, value in zip(ASSET_TYPES, self.assets)),
+            *((name.removeprefix("LIABILITY_TYPE_").lower(), "liability", value)
+              for name, value in zip(LIABILITY_TYPES, self.liabilities)),
+            *((name, "asset_class", value) for name, value in self.asset_classes().items()),
+            ("liquid_assets", "total", self.liquid), ("retirement_assets", "total", self.retirement),
+            ("total_assets", "total", self.total_assets), ("total_liabilities", "total", self.total_liabilities),
+            ("net_worth", "total", self.net_worth),
+        ]
+
+    def rows(self) -> list:
+        """ALLOCATION_COLUMNS for the non-zero slots."""
+        total = self.total_assets
+        return [
+            [item, kind, float(value.quantize(PAISE)), round(float(value / total) * 100, 2) if total > 0 else ""]
+            for item, kind, value in self.items() if value
+        ]
+
+    def summary(self) -> dict:
+        total = self.total_assets
+        difference = self.reported_total - self.net_worth if self.reported_total is not None else None
+        return {
+            "net_worth": float(self.net_worth.quantize(PAISE)),
+            "total_assets": float(total.quantize(PAISE)),
+            "total_liabilities": float(self.total_liabilities.quantize(PAISE)),
+            "reported_net_worth": float(self.reported_total.quantize(PAISE)) if self.reported_total is not None else None,
+            "unexplained_difference": float(difference.quantize(PAISE)) if difference else None,
+            "liquid_assets": float(self.liquid.quantize(PAISE)),
+            "retirement_assets": float(self.retirement.quantize(PAISE)),
+            "liquidity_ratio": None if self.liquidity_ratio is None else round(self.liquidity_ratio, 4),
+            "debt_to_asset_ratio": None if self.debt_to_asset is None else round(self.debt_to_asset, 4),
+            "allocation_pct": {
+                name: round(float(value / total) * 100, 2) if total > 0 else None
+                for name, value in self.asset_classes().items()
+            },
+        }
+
+    def to_record(self) -> dict:
+        """JSON-safe form (amounts as decimal strings) for session state."""
+        return {
+            "assets": [str(value) for value in self.assets],
+            "liabilities": [str(value) for value in self.liabilities],
+            "classes": [str(value) for value in self.classes],
+            "retirement_classes": [str(value) for value in self.retirement_classes],
+            "liquid": str(self.liquid),
+            "reported_total": None if self.reported_total is None else str(self.reported_total),
+        }
+
+    @classmethod
+    def from_record(cls, record: dict) -> "NetWorthSnapshot":
+        return cls(
+            assets=tuple(Decimal(value) for value in record["assets"]),
+            liabilities=tuple(Decimal(value) for value in record["liabilities"]),
+            classes=tuple(Decimal(value) for value in record["classes"]),
+            retirement_classes=tuple(Decimal(value) for value in record["retirement_classes"]),
+            liquid=Decimal(record["liquid"]),
+            reported_total=None if record.get("reported_total") is None else Decimal(record["reported_total"]),
+        )
+
+
+def _mf_split(payload) -> dict:
+    """Asset class -> share of the mutual fund value, by scheme current value (all equity if unknown)."""
+    analytics = ((payload or {}).get("mfSchemeAnalytics") or {}).get("schemeAnalytics") or []
+    split = dict.fromkeys(ASSET_CLASSES, ZERO)
+    for scheme in analytics:
+        details = ((scheme.get("enrichedAnalytics") or {}).get("analytics") or {}).get("schemeDetails") or {}
+        value = money_to_decimal(details.get("currentValue"))
+        asset_class = (scheme.get("schemeDetail") or {}).get("assetClass", "")
+        for name, share in MF_CLASSES.get(asset_class, {"equity": 1.0}).items():
+            split[name] += value * Decimal(str(share))
+    total = sum(split.values(), ZERO)
+    return {name: value / total for name, value in split.items()} if total > 0 else {"equity": Decimal(1)}
+
+
+def parse_net_worth(payload) -> NetWorthSnapshot:
+    response = (payload or {}).get("netWorthResponse") or {}
+    assets = dict.fromkeys(ASSET_TYPES, ZERO)
+    liabilities = dict.fromkeys(LIABILITY_TYPES, ZERO)
+    for key in ("assetValues", "liabilityValues"):
+        for item in response.get(key) or []:
+            attribute = item.get("netWorthAttribute", "")
+            value = money_to_decimal(item.get("value"))
+            if key == "liabilityValues" or attribute.startswith("LIABILITY_TYPE_"):
+                liabilities[attribute if attribute in liabilities else "LIABILITY_TYPE_OTHER"] += abs(value)
+            else:
+                assets[attribute if attribute in assets else "ASSET_TYPE_OTHER"] += value
+    classes = dict.fromkeys(ASSET_CLASSES, ZERO)
+    retirement = dict.fromkeys(ASSET_CLASSES, ZERO)
+    liquid = sum((assets[name] for name in LIQUID_ASSETS), ZERO)
+    mf_split = _mf_split(payload)
+    for attribute, value in assets.items():
+        target = retirement if attribute in RETIREMENT_ASSETS else classes
+        if attribute == "ASSET_TYPE_MUTUAL_FUND":
+            shares = mf_split
+            liquid += value * mf_split.get("cash", ZERO)
+        else:
+            shares = {name: Decimal(str(share)) for name, share in NET_WORTH_CLASSES.get(attribute, {"cash": 1.0}).items()}
+        for name, share in shares.items():
+            target[name] += value * share
+    total = response.get("totalNetWorthValue")
+    return NetWorthSnapshot(
+        assets=tuple(assets.values()),
+        liabilities=tuple(liabilities.values()),
+        classes=tuple(classes.values()),
+        retirement_classes=tuple(retirement.values()),
+        liquid=liquid,
+        reported_total=money_to_decimal(total) if total else None,
+    )
+
+
+_snapshots = TTLCache(CACHE_TTL, max_entries=64)
+
+
+def net_worth_snapshot(payload) -> NetWorthSnapshot:
+    """NetWorthSnapshot of a fetch_net_worth payload, decoded once per distinct payload."""
+    if not payload:
+        return parse_net_worth(payload)
+    digest = recent_digest(payload)
+    snapshot = _snapshots.get(digest, "fetch_net_worth")
+    if snapshot is None:
+        snapshot = parse_net_worth(payload)
+        _snapshots.put(digest, "fetch_net_worth", snapshot)
+    return snapshot
+
+
+def diff_rows(before: NetWorthSnapshot, after: NetWorthSnapshot) -> list:
+    """DIFF_COLUMNS for every slot that is non-zero in either snapshot."""
+    rows = []
+    for (item, kind, old), (_, _, new) in zip(before.items(), after.items()):
+        if not old and not new:
+            continue
+        change = new - old
+        rows.append([
+            item, kind, float(old.quantize(PAISE)), float(new.quantize(PAISE)), float(change.quantize(PAISE)),
+            round(float(change / abs(old)) * 100, 2) if old else "",
+        ])
+    return rows
+
+
+def net_worth_lines(snapshot: NetWorthSnapshot) -> list:
+    """The snapshot as a few `key: value` lines for the LLM."""
+    summary = snapshot.summary()
+    lines = [
+        f"net_worth: {_text(snapshot.net_worth)} (assets {_text(snapshot.total_assets)}, "
+        f"liabilities {_text(snapshot.total_liabilities)})"
+        + (f"; reported {_text(snapshot.reported_total)}" if summary["unexplained_difference"] else ""),
+    ]
+    lines.extend(f"{kind}.{item}: {_text(value)}" for item, kind, value in snapshot.items()
+                 if value and kind in ("asset", "liability"))
+    if summary["total_assets"] > 0:
+        lines.append("allocation_pct: " + ", ".join(f"{name} {share}" for name, share in summary["allocation_pct"].items()))
+    lines.append(
+        f"liquid_assets: {_text(snapshot.liquid)}; liquidity_ratio: {summary['liquidity_ratio']}; "
+        f"debt_to_asset_ratio: {summary['debt_to_asset_ratio']}"
+    )
+    return lines
@@ -0,0 +1,230 @@
+"""Retry, hedging and circuit breaking around backend calls.
+
+`ResilientCaller.call(endpoint, fn)` runs `fn` with:
+- bounded retries with full-jitter exponential backoff for transient failures
+  (connection errors, timeouts, HTTP 429/5xx);
+- a hedged second request when the first one is slower than the endpoint's
+  recent p95 latency, keeping whichever finishes first;
+- a per-endpoint circuit breaker that fails fast while the endpoint keeps failing.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an endpoint whose breaker is open."""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"{endpoint} is failing; circuit open, not retrying for another {retry_in:.1f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failure is worth retrying (and counts against the endpoint's health)."""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng=random) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive transient failures;
+    open -> half-open after `reset_timeout`; one successful probe closes it again."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.transitions = {}  # "closed->open" -> count
+
+    def _move(self, state: str) -> None:
+        key = f"{self.state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        self.state = state
+
+    def before_call(self, endpoint: str) -> None:
+        """Raise CircuitOpenError unless a call may go through now."""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self._opened_at + self.reset_timeout - self._clock()
+                if remaining > 0:
+                    raise CircuitOpenError(endpoint, remaining)
+                self._move(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenError(endpoint, 0.0)
+                self._probing = True
+
+    def on_success(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                self._move(CLOSED)
+
+    def on_failure(self, transient: bool) -> None:
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._probing = False
+            if not transient:
+                # The endpoint answered; a bad request says nothing about its health
+                if self.state == HALF_OPEN:
+                    self._move(CLOSED)
+                return
+            self._failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                self._move(OPEN)
+                self._opened_at = self._clock()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self._failures, "transitions": dict(self.transitions)}
+
+
+class ResilientCaller:
+    """Applies retries, hedging and a circuit breaker per endpoint (one endpoint per tool)."""
+
+    def __init__(
+        self,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        hedge_delay: float,
+        breaker_threshold: int,
+        breaker_reset: float,
+        hedge_workers: int,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_delay = hedge_delay
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._latencies = {}  # endpoint -> recent successful latencies in seconds
+        self._metrics = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "short_circuits": 0, "failures": 0}
+        # Separate from the client's batch executor so hedges never wait behind a batch
+        self._executor = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix="fi-hedge") if hedge_delay > 0 else None
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._metrics[name] += n
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker(self.breaker_threshold, self.breaker_reset, self._clock)
+            return breaker
+
+    def _hedge_after(self, endpoint: str) -> float:
+        """p95 of recent latencies once there are enough samples, else the configured delay."""
+        with self._lock:
+            samples = sorted(self._latencies.get(endpoint, ()))
+        if len(samples) < 20:
+            return self.hedge_delay
+        return max(samples[int(len(samples) * 0.95) - 1], self.hedge_delay / 10)
+
+    def _observe(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(endpoint, deque(maxlen=200)).append(seconds)
+
+    def _timed(self, fn):
+        start = self._clock()
+        value = fn()
+        return value, self._clock() - start
+
+    def _attempt(self, endpoint: str, fn):
+        """One logical attempt, hedged with a duplicate request if the first one runs long."""
+        if self._executor is None:
+            value, elapsed = self._timed(fn)
+            self._observe(endpoint, elapsed)
+            return value
+
+        first = self._executor.submit(self._timed, fn)
+        done, _ = wait([first], timeout=self._hedge_after(endpoint))
+        if done:
+            value, elapsed = first.result()
+            self._observe(endpoint, elapsed)
+            return value
+
+        self._count("hedges")
+        second = self._executor.submit(self._timed, fn)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._count("hedge_wins")
+                    value, elapsed = future.result()
+                    self._observe(endpoint, elapsed)
+                    return value
+                error = future.exception()
+        raise error
+
+    def call(self, endpoint: str, fn):
+        """Run `fn()` for `endpoint`; raises CircuitOpenError or the last failure."""
+        breaker = self.breaker(endpoint)
+        self._count("calls")
+        for attempt in range(self.max_attempts):
+            try:
+                breaker.before_call(endpoint)
+            except CircuitOpenError:
+                self._count("short_circuits")
+                raise
+            try:
+                value = self._attempt(endpoint, fn)
+            except Exception as e:
+                transient = is_transient(e)
+                breaker.on_failure(transient)
+                if not transient or attempt == self.max_attempts - 1:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                self._sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+                continue
+            breaker.on_success()
+            return value
+
+    def stats(self) -> dict:
+        """Counters plus each endpoint's breaker state and transition counts."""
+        with self._lock:
+            metrics = dict(self._metrics)
+            breakers = dict(self._breakers)
+        return dict(metrics, breakers={name: breaker.snapshot() for name, breaker in breakers.items()})
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
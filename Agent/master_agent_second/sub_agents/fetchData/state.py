@@ -0,0 +1,111 @@
+"""Session-state data store shared by every agent that needs the fetched payloads.
+
+fetchData_agent writes each payload once under a well-known key; the analysis,
+prediction and planning agents read it back from state instead of calling the
+tool server again or copying raw JSON out of the chat history.
+"""
+
+from google.adk.tools import ToolContext
+
+from .client import SESSION_ID, TOOL_NAMES, fetch_tools_data, get_client
+from .compaction import compact_payloads
+
+# State key holding the Fi MCP session id of the signed-in user (defaults to FI_MCP_SESSION_ID)
+SESSION_ID_KEY = "fi_session_id"
+# State key listing the tools whose payloads are currently stored
+FETCHED_TOOLS_KEY = "fi_fetched_tools"
+STATE_KEY_PREFIX = "fi_data_"
+# State key holding earlier net worth snapshots (NetWorthSnapshot.to_record()) for analyze_net_worth
+NET_WORTH_SNAPSHOTS_KEY = "fi_net_worth_snapshots"
+
+# Well-known keys, e.g. STATE_KEYS["fetch_net_worth"] == "fi_data_fetch_net_worth"
+STATE_KEYS = {tool_name: STATE_KEY_PREFIX + tool_name for tool_name in TOOL_NAMES}
+
+
+def session_id_for(state) -> str:
+    return state.get(SESSION_ID_KEY) or SESSION_ID
+
+
+def store_payload(state, tool_name: str, report) -> None:
+    state[STATE_KEYS[tool_name]] = report
+    fetched = list(state.get(FETCHED_TOOLS_KEY) or [])
+    if tool_name not in fetched:
+        fetched.append(tool_name)
+        # Reassign rather than mutate so the change is recorded in the state delta
+        state[FETCHED_TOOLS_KEY] = fetched
+
+
+def get_payload(state, tool_name: str, fetch_missing: bool = True):
+    """Return a tool's payload from state, fetching (through the cache) only if absent."""
+    report = state.get(STATE_KEYS[tool_name])
+    if report is None and fetch_missing:
+        result = get_client().fetch(tool_name, session_id_for(state))
+        if result["status"] == "success":
+            report = result["report"]
+            store_payload(state, tool_name, report)
+    return report
+
+
+def _receipt(tool_name: str, result: dict) -> dict:
+    """Short acknowledgement returned to the model in place of the payload."""
+    if result["status"] != "success":
+        return {key: value for key, value in result.items() if key != "report"}
+    receipt = {
+        "status": "success",
+        "state_key": STATE_KEYS[tool_name],
+        "sections": sorted(result["report"]) if isinstance(result["report"], dict) else [],
+    }
+    for key in ("cached", "latency_ms"):
+        if key in result:
+            receipt[key] = result[key]
+    return receipt
+
+
+def fetch_into_state(state, tool_name: str) -> dict:
+    """Fetch one tool, store its payload in state and return a receipt."""
+    result = get_client().fetch(tool_name, session_id_for(state))
+    if result["status"] == "success":
+        store_payload(state, tool_name, result["report"])
+    return _receipt(tool_name, result)
+
+
+def fetch_plan_into_state(state, tool_names: list) -> dict:
+    """Fetch a whole plan concurrently, store every payload and return receipts."""
+    batch = fetch_tools_data(tool_names, session_id_for(state))
+    if "results" not in batch:
+        return batch
+    for tool_name, result in batch["results"].items():
+        if result["status"] == "success":
+            store_payload(state, tool_name, result["report"])
+    return dict(batch, results={name: _receipt(name, result) for name, result in batch["results"].items()})
+
+
+def load_financial_data(tools: list[str], tool_context: ToolContext) -> dict:
+    """Read the user's fetched financial data from the shared session state.
+
+    Args:
+        tools: Tool names whose data is needed, e.g. ["fetch_net_worth", "fetch_mf_transactions"].
+            Pass an empty list to load everything fetchData_agent stored this session.
+
+    Returns:
+        A compact text rendering of the data under "data" (CSV tables, money as plain numbers,
+        monthly aggregates), its "size_report", and any tools that could not be loaded under "missing".
+    """
+    state = tool_context.state
+    unknown = [name for name in tools if name not in STATE_KEYS]
+    if unknown:
+        return {
+            "status": "error",
+            "error_message": f"Unknown tools: {', '.join(unknown)}. Valid tools: {', '.join(TOOL_NAMES)}",
+        }
+    tool_names = tools or list(state.get(FETCHED_TOOLS_KEY) or [])
+    payloads, missing = {}, []
+    for tool_name in tool_names:
+        report = get_payload(state, tool_name)
+        if report is None:
+            missing.append(tool_name)
+        else:
+            payloads[tool_name] = report
+    status = "success" if not missing else ("partial" if payloads else "error")
+    text, size_report = compact_payloads(payloads)
+    return {"status": status, "data": text, "size_report": size_report, "missing": missing}
@@ -0,0 +1,36 @@
+import copy
+import json
+
+import numpy as np
+
+from sub_agents.analytics.anomalies import detect_anomalies
+from sub_agents.analytics.cash_flow import cash_flow, chronological_order
+from sub_agents.fetchData.backends import TEST_DATA_DIR
+
+
+def _bank_payload(phone: str = "2222222222") -> dict:
+    with open(f"{TEST_DATA_DIR}/{phone}/fetch_bank_transactions.json") as f:
+        return json.load(f)
+
+
+def test_chronological_order_reverses_newest_first_accounts():
+    account = np.array([0, 0, 0, 1, 1])
+    dates = np.array(["2024-03-01", "2024-02-01", "2024-01-01", "2024-01-01", "2024-02-01"], dtype="datetime64[D]")
+    assert chronological_order(account, dates).tolist() == [2, 1, 0, 3, 4]
+
+
+def test_chronological_order_skips_accounts_without_rows():
+    # Account 1 had an empty txns list, so no row carries its index
+    account = np.array([0, 0, 2, 2])
+    dates = np.array(["2024-02-01", "2024-01-01", "2024-01-01", "2024-02-01"], dtype="datetime64[D]")
+    assert chronological_order(account, dates).tolist() == [1, 0, 2, 3]
+
+
+def test_empty_account_does_not_change_cash_flow():
+    payload = _bank_payload()
+    with_empty = copy.deepcopy(payload)
+    with_empty["bankTransactions"].insert(0, {"bank": "Empty", "txns": []})
+
+    # Rows lead with the account index, which the empty account shifts by one
+    assert [row[1:] for row in cash_flow(with_empty).monthly] == [row[1:] for row in cash_flow(payload).monthly]
+    assert detect_anomalies(with_empty).flags() == detect_anomalies(payload).flags()
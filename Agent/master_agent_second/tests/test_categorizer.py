@@ -0,0 +1,22 @@
+import pytest
+
+from sub_agents.analytics.categorizer import Categorizer
+
+
+@pytest.mark.parametrize("narration, category", [
+    # PREMIUM PAY (insurance) overlaps the higher-priority PAYTM POSTPAID
+    ("PREMIUM PAYTM POSTPAID", "credit_card"),
+    ("UPI-SIMPL-PAYMENT", "credit_card"),
+    ("SIMPLE LIVING STORE", "other"),
+    ("SHELL PETROL PUMP", "fuel"),
+    ("SHELLEY TRADERS", "other"),
+    ("UPI-SWIGGY-SWIGGY8@YBL", "food_delivery"),
+    ("CURRENT ACCOUNT TRANSFER", "other"),
+])
+def test_default_rules(narration, category):
+    assert Categorizer().categorize(narration) == category
+
+
+def test_prefix_keyword_keeps_its_priority():
+    categorizer = Categorizer({"first": ["PAYTM"], "second": ["PAYTM POSTPAID"]})
+    assert categorizer.categorize("PAYTM POSTPAID BILL") == "first"